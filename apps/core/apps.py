@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from utils.core.fuzzy_search import register_sqlite_functions
+
+        # trigram similarity functions for SQLite, Postgres has pg_trgm
+        connection_created.connect(register_sqlite_functions)
@@ -0,0 +1,144 @@
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from utils.command_helpers.core import print_info, print_success
+from utils.political_figure.core import PoliticalFigureAutocompleteIndex
+
+FIRST_NAMES = [
+    "Sher",
+    "Pushpa",
+    "Ram",
+    "Sita",
+    "Krishna",
+    "Bidya",
+    "Gagan",
+    "Bishnu",
+    "Madhav",
+    "Baburam",
+    "Rabi",
+    "Balen",
+    "Hari",
+    "Kamala",
+    "Shekhar",
+]
+MIDDLE_NAMES = ["Bahadur", "Kamal", "Prasad", "Kumar", "Devi", "Raj", "Lal", ""]
+LAST_NAMES = [
+    "Deuba",
+    "Dahal",
+    "Oli",
+    "Thapa",
+    "Bhandari",
+    "Thapa Magar",
+    "Koirala",
+    "Nepal",
+    "Bhattarai",
+    "Lamichhane",
+    "Shah",
+    "Adhikari",
+    "Gurung",
+    "Yadav",
+]
+PARTIES = [
+    ("Nepali Congress", "NC"),
+    ("Communist Party of Nepal (Unified Marxist-Leninist)", "CPN-UML"),
+    ("Communist Party of Nepal (Maoist Centre)", "CPN-MC"),
+    ("Rastriya Swatantra Party", "RSP"),
+    ("Rastriya Prajatantra Party", "RPP"),
+    ("Janata Samajwadi Party", "JSP"),
+]
+
+
+class SyntheticAutocompleteIndex(PoliticalFigureAutocompleteIndex):
+    """
+    Same index as the one used by the autocomplete endpoint, loaded with generated names instead of database rows.
+    """
+
+    def __init__(self, count, seed):
+        self.count = count
+        self.seed = seed
+        super().__init__()
+
+    def get_generations(self):
+        return (1, 1)
+
+    def fetch_documents(self, since):
+        rng = random.Random(self.seed)
+        documents = {}
+        party_keys = [self.get_party_keys(*party) for party in PARTIES]
+        for pk in range(1, self.count + 1):
+            full_name = " ".join(
+                filter(
+                    None,
+                    [
+                        rng.choice(FIRST_NAMES),
+                        rng.choice(MIDDLE_NAMES),
+                        rng.choice(LAST_NAMES),
+                    ],
+                )
+            )
+            slug = f"{full_name.lower().replace(' ', '-')}-{pk}"
+            party_id = rng.randrange(len(PARTIES))
+            party_name = PARTIES[party_id][0]
+            keys = self.get_keys(full_name, slug, party_keys[party_id])
+            documents[pk] = (keys, (slug, full_name, party_name, party_id))
+        return documents, None
+
+
+class Command(BaseCommand):
+    """
+    Measures memory and lookup time of the in-process autocomplete index (see utils/core/autocomplete.py) with generated names. Does not touch the database.
+    """
+
+    help = "Benchmarks memory per 100k names and lookup time of the autocomplete index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--names", type=int, default=100_000)
+        parser.add_argument("--lookups", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        count = options["names"]
+        print_info(f"Building autocomplete index of {count} names...")
+
+        gc.collect()
+        # NOTE: tracemalloc makes the build a few times slower than it is without it
+        tracemalloc.start()
+        started = time.perf_counter()
+        index = SyntheticAutocompleteIndex(count, seed=options["seed"])
+        index.refresh()
+        build_time = time.perf_counter() - started
+        gc.collect()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        entries = sum(len(index) for index in index._indexes)
+        print_success(
+            f"built in {build_time:.2f}s, {entries} keys, "
+            f"{memory / 1024 / 1024:.1f} MiB "
+            f"({memory / count * 100_000 / 1024 / 1024:.1f} MiB per 100k names, "
+            f"{memory / count:.0f} bytes per name)"
+        )
+
+        rng = random.Random(options["seed"])
+        queries = []
+        for _ in range(options["lookups"]):
+            name = rng.choice(FIRST_NAMES + LAST_NAMES + [p[0] for p in PARTIES])
+            queries.append(name[: rng.randint(1, len(name))])
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        quantiles = statistics.quantiles(timings, n=100)
+        print_success(
+            f"{len(queries)} lookups: p50 {quantiles[49]:.3f} ms, "
+            f"p95 {quantiles[94]:.3f} ms, p99 {quantiles[98]:.3f} ms, "
+            f"max {max(timings):.3f} ms"
+        )
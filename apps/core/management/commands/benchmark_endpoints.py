@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import platform
+import subprocess
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from utils.command_helpers.core import (
+    print_error,
+    print_info,
+    print_success,
+    print_warning,
+)
+from utils.political_figure.core import political_figure_autocomplete_index
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_stats(name, stats):
+    latency = stats["latency_ms"]
+    return (
+        f"{name}: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+        f"p99 {latency['p99']:.1f} ms, {stats['queries']['mean']:.1f} queries, "
+        f"{stats['db_time_ms']['mean']:.1f} ms in DB, peak RSS {stats['peak_rss_mb']} MiB"
+    )
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks every API endpoint (see utils/command_helpers/endpoint_benchmark.py) against generated datasets of each size.
+    Runs in a test database that is created for the run and destroyed at the end, so the development database is left as is.
+    """
+
+    help = "Benchmarks latency, queries, DB time and memory of every API endpoint against generated datasets, written as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1_000, 100_000, 1_000_000],
+            help="Political figures of each dataset",
+        )
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--response-cache",
+            action="store_true",
+            help="Keep the response cache enabled, repeated reads are cache hits",
+        )
+        parser.add_argument("--output", default="benchmark_endpoints.json")
+
+    def handle(self, *args, **options):
+        try:
+            from utils.command_helpers.endpoint_benchmark import benchmark_dataset
+        except ImportError as e:
+            # factory_boy and Faker are dev dependencies
+            print_error(f"Error: {e}. Install requirements/dev.txt.")
+            return
+
+        def print_stats(name, stats):
+            if stats["errors"]:
+                print_warning(f"{format_stats(name, stats)}, {stats['status_codes']}")
+            else:
+                print_info(format_stats(name, stats))
+
+        # NOTE: responses with errors are counted, don't log each of them
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            datasets = {}
+            for size in options["sizes"]:
+                call_command("flush", interactive=False, verbosity=0)
+                cache.clear()
+                political_figure_autocomplete_index.reset()
+
+                print_info(f"Benchmarking with {size} political figures...")
+                datasets[str(size)] = benchmark_dataset(
+                    figures=size,
+                    parties=max(size // 200, 10),
+                    requests=options["requests"],
+                    warmup=options["warmup"],
+                    seed=options["seed"],
+                    response_cache=options["response_cache"],
+                    on_endpoint=print_stats,
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {
+            "meta": {
+                "commit": get_git_commit(),
+                "created_at": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "cpus": os.cpu_count(),
+                "requests": options["requests"],
+                "warmup": options["warmup"],
+                "response_cache": options["response_cache"],
+            },
+            "datasets": datasets,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print_success(f"Results written to {options['output']}")
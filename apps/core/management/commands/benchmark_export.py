@@ -0,0 +1,62 @@
+import os
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.management.commands.export_dataset import write_export
+from utils.command_helpers.core import (
+    create_benchmark_political_figures,
+    print_info,
+    print_success,
+)
+from utils.core.export import EXPORT_FORMATS
+from utils.political_figure.core import PoliticalFigureUtil
+
+
+class Command(BaseCommand):
+    """
+    Measures the throughput (rows per second), output size and peak memory of exporting political figures in every format (see utils/core/export.py).
+
+    Rows are created in a transaction that is rolled back at the end, and exports are written to /dev/null.
+    """
+
+    help = "Benchmarks political figure exports in every format."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+
+    def handle(self, *args, **options):
+        rows = sorted(options["rows"])
+
+        with transaction.atomic():
+            created = 0
+            for count in rows:
+                print_info(f"Creating {count - created} political figures...")
+                create_benchmark_political_figures(count - created, offset=created)
+                created = count
+
+                for export_format in EXPORT_FORMATS.values():
+                    self.benchmark(count, export_format)
+
+            transaction.set_rollback(True)
+
+    def benchmark(self, count, export_format):
+        with open(os.devnull, "wb") as file:
+            started = time.perf_counter()
+            exported, size = write_export(
+                PoliticalFigureUtil.export_dataset, export_format, file
+            )
+            elapsed = time.perf_counter() - started
+
+            # NOTE: again with tracemalloc, it slows the export down
+            tracemalloc.start()
+            write_export(PoliticalFigureUtil.export_dataset, export_format, file)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        print_success(
+            f"{count} rows {export_format.name}: {exported / elapsed:.0f} rows/s, "
+            f"{size / 1024 / 1024:.1f} MiB, peak memory {peak / 1024 / 1024:.1f} MiB"
+        )
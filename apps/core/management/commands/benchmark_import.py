@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from utils.command_helpers.core import print_info, print_success, print_warning
+from utils.command_helpers.importer import DEFAULT_BATCH_SIZE, import_seed_file
+
+
+def write_benchmark_seed_file(file, rows, figures_per_party=100):
+    """
+    Writes a seed file of about `rows` records (parties of `figures_per_party` figures) to `file`.
+    """
+    address = {
+        "street_address": "Benchmark Street",
+        "street_address_2": "",
+        "city": "Kathmandu",
+        "region": "Bagmati",
+        "postal_code": "44600",
+        "country": "NP",
+        "latitude": "27.717200",
+        "longitude": "85.324000",
+    }
+    parties = []
+    for i in range(max(rows // (figures_per_party + 1), 1)):
+        parties.append(
+            {
+                "name": f"Benchmark Party {i}",
+                "description": "Benchmark party",
+                "abbreviation": f"BP{i}",
+                "founded_date": "1990-01-01",
+                "ideology": "Benchmark",
+                "hq_location": "Kathmandu",
+                "website": "https://example.com",
+                "logo_url": "https://example.com/logo.png",
+                "political_figures": [
+                    {
+                        "full_name": f"Benchmark Figure {j}",
+                        "date_of_birth": f"19{50 + j % 50}-01-01",
+                        "gender": "m",
+                        "biography": "Benchmark biography " * 10,
+                        "photo": None,
+                        "home_address": address,
+                        "current_address": address,
+                        "contact_number": "9800000000",
+                        "website": "https://example.com",
+                        "facebook_url": "https://facebook.com/benchmark",
+                        "twitter_url": "https://twitter.com/benchmark",
+                        "instagram_url": "https://instagram.com/benchmark",
+                        "is_active": True,
+                    }
+                    for j in range(figures_per_party)
+                ],
+            }
+        )
+    json.dump({"users": [], "political_parties": parties}, file)
+
+
+class Command(BaseCommand):
+    """
+    Measures the throughput (records per second) of the seed file import (see utils/command_helpers/importer.py) with different numbers of workers.
+
+    Every import runs in a transaction that is rolled back, so that each of them creates the same rows (figure names repeat in every party, so slugs get suffixes).
+    """
+
+    help = "Benchmarks the seed file import with different numbers of workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20_000)
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        cpu_count = os.cpu_count()
+        if max(options["workers"]) > cpu_count:
+            print_warning(
+                f"Only {cpu_count} CPUs are available, more workers can't be faster"
+            )
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            write_benchmark_seed_file(file, options["rows"])
+        try:
+            baseline = None
+            for workers in options["workers"]:
+                print_info(f"Importing with {workers} workers...")
+                with transaction.atomic():
+                    # NOTE: progress of every batch is printed, hide it
+                    with redirect_stdout(io.StringIO()):
+                        stats = import_seed_file(
+                            file.name,
+                            batch_size=options["batch_size"],
+                            workers=workers,
+                        )
+                    elapsed = stats.elapsed
+                    transaction.set_rollback(True)
+
+                rate = stats.records / elapsed
+                baseline = baseline or rate
+                print_success(
+                    f"{workers} workers: {stats.records} records in {elapsed:.2f}s, "
+                    f"{rate:.0f} records/s ({rate / baseline:.2f}x)"
+                )
+        finally:
+            os.remove(file.name)
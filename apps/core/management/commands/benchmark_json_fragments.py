@@ -0,0 +1,97 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from apps.political_figure.views import GetPoliticalFigureListAPI
+from utils.command_helpers.core import (
+    create_benchmark_political_figures,
+    print_info,
+    print_success,
+)
+from utils.core.response_wrappers import (
+    FastOKResponse,
+    OKResponse,
+    PreRenderedOKResponse,
+)
+from utils.political_figure.core import PoliticalFigureUtil
+
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark-json-fragments",
+        "OPTIONS": {"MAX_ENTRIES": 10_000_000},
+    }
+}
+
+
+class Command(BaseCommand):
+    """
+    Compares building a political figure list response with the serializer against the compiled serializer (see utils/core/compiled_serializers.py) and against assembling it from pre-rendered JSON fragments (see utils/core/json_fragments.py).
+
+    Rows are created in a transaction that is rolled back at the end, and a dedicated in-memory cache is used, so neither the database nor the configured cache is changed.
+    """
+
+    help = "Benchmarks pre-rendered JSON fragments against the serializer for political figure lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+        )
+
+    def handle(self, *args, **options):
+        rows = sorted(options["rows"])
+
+        with override_settings(CACHES=BENCHMARK_CACHES), transaction.atomic():
+            print_info(f"Creating {rows[-1]} political figures...")
+            create_benchmark_political_figures(rows[-1])
+
+            for count in rows:
+                serializer_time = self.time_serializer(count)
+                compiled_time = self.time_compiled(count)
+                cold_time = self.time_fragments(count)
+                warm_time = self.time_fragments(count)
+                print_success(
+                    f"{count} rows: serializer {serializer_time:.3f}s, "
+                    f"compiled {compiled_time:.3f}s, "
+                    f"fragments cold {cold_time:.3f}s, "
+                    f"fragments warm {warm_time:.3f}s "
+                    f"({serializer_time / warm_time:.1f}x faster)"
+                )
+
+            transaction.set_rollback(True)
+
+    def time_serializer(self, count):
+        started = time.perf_counter()
+        page = PoliticalFigureUtil.get_read_queryset().order_by("-created_at", "-id")[
+            :count
+        ]
+        serializer = GetPoliticalFigureListAPI.output_serializer(page, many=True)
+        JSONRenderer().render(OKResponse(data=serializer.data).data)
+        return time.perf_counter() - started
+
+    def time_compiled(self, count):
+        started = time.perf_counter()
+        page = PoliticalFigureUtil.get_read_queryset().order_by("-created_at", "-id")[
+            :count
+        ]
+        FastOKResponse(
+            data=GetPoliticalFigureListAPI.compiled_output_serializer.serialize(page)
+        )
+        return time.perf_counter() - started
+
+    def time_fragments(self, count):
+        view = GetPoliticalFigureListAPI()
+        started = time.perf_counter()
+        page = list(
+            PoliticalFigureUtil.get_version_queryset().order_by("-created_at", "-id")[
+                :count
+            ]
+        )
+        data_fragments = PoliticalFigureUtil.fragment_cache.get_many(
+            page, render_missing=view.serialize_political_figures
+        )
+        PreRenderedOKResponse(data_fragments=data_fragments)
+        return time.perf_counter() - started
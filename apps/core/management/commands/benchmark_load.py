@@ -0,0 +1,102 @@
+import datetime
+import time
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+
+from utils.command_helpers.core import print_info, print_success
+from utils.political_figure.core import PoliticalFigureUtil
+from utils.political_party.core import PoliticalPartyUtil
+
+
+def get_benchmark_political_figures(start, stop, party_ids):
+    """
+    Returns validated data (like the create serializer's) of political figures numbered from start to stop.
+    """
+    address = {
+        "street_address": "Benchmark Street",
+        "street_address_2": "",
+        "city": "Kathmandu",
+        "region": "Bagmati",
+        "postal_code": "44600",
+        "country": "NP",
+        "latitude": Decimal("27.717200"),
+        "longitude": Decimal("85.324000"),
+    }
+    return [
+        {
+            "full_name": f"Benchmark Figure {i}",
+            "date_of_birth": datetime.date(1950 + i % 50, 1, 1),
+            "gender": "m",
+            "biography": "Benchmark biography " * 10,
+            "photo": None,
+            "home_address": address,
+            "current_address": address,
+            "political_party_id": party_ids[i % len(party_ids)],
+            "contact_number": "9800000000",
+            "website": "https://example.com",
+            "facebook_url": "",
+            "twitter_url": "",
+            "instagram_url": "",
+            "is_active": True,
+        }
+        for i in range(start, stop)
+    ]
+
+
+class Command(BaseCommand):
+    """
+    Measures the throughput (rows per second) of the bulk loader (see utils/core/bulk_load.py) for a cold load of political figures, with their addresses and parties.
+
+    Rows are loaded in a transaction that is rolled back at the end. Foreign keys are checked before it, since their checks are deferred to the commit on Postgres.
+    """
+
+    help = "Benchmarks loading political figures with the bulk loader."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--figures", type=int, default=1_000_000)
+        parser.add_argument("--parties", type=int, default=1_000)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50_000,
+            help="Figures built and loaded at a time",
+        )
+
+    def handle(self, *args, **options):
+        count = options["figures"]
+        chunk_size = options["chunk_size"]
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            party_ids = PoliticalPartyUtil.load_political_parties(
+                [
+                    {
+                        "name": f"Benchmark Party {i}",
+                        "abbreviation": f"BP{i}",
+                        "founded_date": datetime.date(1990, 1, 1),
+                        "hq_location": "Kathmandu",
+                    }
+                    for i in range(options["parties"])
+                ]
+            )
+
+            for start in range(0, count, chunk_size):
+                stop = min(start + chunk_size, count)
+                PoliticalFigureUtil.load_political_figures(
+                    get_benchmark_political_figures(start, stop, party_ids)
+                )
+                elapsed = time.perf_counter() - started
+                print_info(f"{stop} political figures in {elapsed:.1f}s")
+
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        print_success(
+            f"{count} political figures ({count * 2} addresses, {len(party_ids)} parties) "
+            f"in {elapsed:.1f}s, {count / elapsed:.0f} figures/s"
+        )
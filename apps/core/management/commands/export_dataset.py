@@ -0,0 +1,86 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from utils.command_helpers.core import print_info, print_success
+from utils.core.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, get_export_filename
+from utils.political_figure.core import PoliticalFigureUtil
+from utils.political_party.core import PoliticalPartyUtil
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in [
+        PoliticalFigureUtil.export_dataset,
+        PoliticalPartyUtil.export_dataset,
+    ]
+}
+
+
+def write_export(dataset, export_format, file, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Writes the export of the dataset to the binary file, returns (rows, bytes) written.
+    """
+    rows = 0
+
+    def count_rows(chunks):
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    size = 0
+    for data in export_format.export(
+        dataset.columns, count_rows(dataset.iter_chunks(chunk_size=chunk_size))
+    ):
+        file.write(data)
+        size += len(data)
+    return rows, size
+
+
+class Command(BaseCommand):
+    """
+    Exports a whole dataset to a file (see utils/core/export.py), reading rows with a server-side cursor so memory doesn't grow with the number of rows, and reports the throughput.
+    """
+
+    help = (
+        "Exports political figures or parties as NDJSON, CSV or gzipped columnar JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=list(DATASETS))
+        parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument(
+            "--output",
+            help="File to write to, '-' for stdout. Defaults to <dataset>.<extension> in the current directory",
+        )
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        dataset = DATASETS[options["dataset"]]
+        export_format = EXPORT_FORMATS[options["format"]]
+        output = options["output"] or get_export_filename(dataset, export_format)
+
+        started = time.perf_counter()
+        if output == "-":
+            rows, size = write_export(
+                dataset, export_format, sys.stdout.buffer, options["chunk_size"]
+            )
+            # keep stdout clean for the export
+            print_success(self.format_stats(rows, size, started), file=sys.stderr)
+            return
+
+        print_info(f"Exporting {dataset.name} to {output}...")
+        with open(output, "wb") as file:
+            rows, size = write_export(
+                dataset, export_format, file, options["chunk_size"]
+            )
+        print_success(self.format_stats(rows, size, started))
+
+    @staticmethod
+    def format_stats(rows, size, started):
+        elapsed = time.perf_counter() - started
+        return (
+            f"{rows} rows, {size / 1024 / 1024:.1f} MiB in {elapsed:.2f}s "
+            f"({rows / elapsed:.0f} rows/s)"
+        )
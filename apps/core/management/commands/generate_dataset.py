@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from utils.command_helpers.core import print_error, print_info, print_success
+
+
+class Command(BaseCommand):
+    """
+    Generates a synthetic dataset of political parties and figures (see utils/command_helpers/dataset.py) for load and scale testing, written to the database with the bulk loader or to a seed file.
+    The same seed generates the same dataset.
+    """
+
+    help = "Generates a synthetic dataset of political parties and figures."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--parties", type=int, default=1_000)
+        parser.add_argument("--figures", type=int, default=100_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            help="Seed file (see seed_data) to write to instead of the database",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50_000,
+            help="Figures written to the database per transaction",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from utils.command_helpers.dataset import (
+                iter_dataset,
+                write_dataset,
+                write_seed_file,
+            )
+        except ImportError as e:
+            # factory_boy and Faker are dev dependencies
+            print_error(f"Error: {e}. Install requirements/dev.txt.")
+            return
+
+        dataset = iter_dataset(options["parties"], options["figures"], options["seed"])
+        started = time.perf_counter()
+
+        def print_progress(parties, figures):
+            elapsed = time.perf_counter() - started
+            print_info(f"{parties} parties, {figures} figures in {elapsed:.1f}s")
+
+        if options["output"]:
+            print_info(f"Writing dataset to {options['output']}...")
+            with open(options["output"], "w", encoding="utf-8") as file:
+                parties, figures = write_seed_file(dataset, file)
+        else:
+            parties, figures = write_dataset(
+                dataset, options["chunk_size"], on_progress=print_progress
+            )
+
+        elapsed = time.perf_counter() - started
+        print_success(
+            f"{parties} parties, {figures} figures in {elapsed:.1f}s "
+            f"({figures / elapsed:.0f} figures/s)"
+        )
@@ -0,0 +1,92 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from utils.command_helpers.core import (
+    print_error,
+    print_info,
+    print_success,
+    print_warning,
+)
+from utils.command_helpers.profiles import (
+    get_profile_path,
+    list_profiles,
+    read_collapsed,
+    render_flamegraph,
+    render_profile,
+)
+from utils.core.profiling import PROFILE_HEADER, PROFILERS, get_profile_token
+
+
+class Command(BaseCommand):
+    """
+    Lists and renders the request profiles captured by utils/core/profiling.py, and creates the signed header to profile a request with.
+    """
+
+    help = "Lists, shows and renders as flamegraphs the profiles of requests, or creates a signed X-Profile header."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "action",
+            choices=["list", "show", "flamegraph", "token"],
+            help="list profiles, show one as text, render one as an SVG flamegraph, or print an X-Profile header",
+        )
+        parser.add_argument(
+            "name", nargs="?", default="latest", help="Profile name, or latest"
+        )
+        parser.add_argument(
+            "--sort",
+            default="cumulative",
+            help="pstats sort key of cProfile profiles (cumulative, tottime, calls, ...)",
+        )
+        parser.add_argument("--limit", type=int, default=30)
+        parser.add_argument(
+            "--output", help="SVG file of the flamegraph, <name>.svg by default"
+        )
+        parser.add_argument("--profiler", choices=list(PROFILERS), default="sampling")
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        if action == "list":
+            self.list_profiles()
+        elif action == "token":
+            token = get_profile_token(options["profiler"])
+            print_info(f"{PROFILE_HEADER}: {token}")
+        else:
+            try:
+                path = get_profile_path(options["name"])
+            except FileNotFoundError as e:
+                print_error(f"Error: {e}")
+                return
+
+            if action == "show":
+                self.stdout.write(
+                    render_profile(path, sort=options["sort"], limit=options["limit"])
+                )
+            else:
+                self.write_flamegraph(path, options["output"])
+
+    def list_profiles(self):
+        profiles = list_profiles()
+        if not profiles:
+            print_warning("No profiles yet")
+            return
+        for profile in profiles:
+            print_info(
+                f"{profile['name']}  {profile['method']} {profile['url_name']} "
+                f"{profile['duration_ms']} ms, {profile['size'] / 1024:.0f} KiB"
+            )
+
+    def write_flamegraph(self, path, output):
+        if not path.endswith(".collapsed"):
+            # cProfile keeps callers of each function, not whole stacks
+            print_error(
+                "Error: flamegraphs need a sampling profile, use show for cProfile profiles"
+            )
+            return
+
+        name = os.path.basename(path)
+        output = output or f"{os.path.splitext(name)[0]}.svg"
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(render_flamegraph(read_collapsed(path), title=name))
+        print_success(f"Flamegraph written to {output}")
@@ -9,6 +9,7 @@ from django.db import transaction
 from apps.users.models import User
 from apps.political_party.models import PoliticalParty
 from utils.command_helpers.core import seed_data
+from utils.command_helpers.importer import DEFAULT_BATCH_SIZE
 
 
 class Command(BaseCommand):
@@ -18,5 +19,26 @@ class Command(BaseCommand):
 
     help = "Seeds the database with initial data from a JSON file."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file", help="Seed file to import, defaults to data/seed_data.json"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Records imported (and committed) at a time",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes validating batches, batches are still written in the order of the file",
+        )
+
     def handle(self, *args, **options):
-        seed_data()
+        seed_data(
+            file_path=options["file"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(
+                fields=["country", "region", "city"],
+                name="addr_country_region_city_idx",
+            ),
+        ),
+    ]
@@ -31,3 +31,10 @@ class Address(BaseModel):
         verbose_name_plural = "Addresses"
         ordering = ["-created_at"]
         constraints = []
+        indexes = [
+            # faceted filtering of political figures by address, see utils/core/facets.py
+            models.Index(
+                fields=["country", "region", "city"],
+                name="addr_country_region_city_idx",
+            ),
+        ]
@@ -3,6 +3,35 @@ from rest_framework import serializers
 from apps.core.models import Address
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that looks up the related row in `{pk: instance}` of the serializer context (for example from in_bulk()) instead of querying it, so that many items can be validated with one query for all of their related rows.
+    `queryset` is still required, but only used for the schema.
+
+    Usage:
+        political_party = PrefetchedPrimaryKeyRelatedField(context_key="political_parties", queryset=PoliticalParty.objects.all(), allow_null=True)
+
+        serializer = ItemSerializer(data=item, context={"political_parties": PoliticalParty.objects.in_bulk(ids)})
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        instance = self.context[self.context_key].get(pk)
+        if instance is None:
+            self.fail("does_not_exist", pk_value=data)
+        return instance
+
+
 class GetAddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
@@ -57,3 +86,21 @@ class UpdateAddressSerializer(serializers.ModelSerializer):
             "latitude",
             "longitude",
         ]
+
+
+class BulkUpdateItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    # fields to change, same as the update API's (partial) input
+    changes = serializers.DictField()
+
+
+class BulkUpdateSerializer(serializers.Serializer):
+    items = BulkUpdateItemSerializer(many=True, allow_empty=False, max_length=1000)
+    # update the valid items and return the errors of the others, instead of updating nothing if any item is invalid
+    allow_partial = serializers.BooleanField(default=False)
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
@@ -1,3 +1,500 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import path
+from prometheus_client import REGISTRY
+from rest_framework.response import Response
+
+from apps.political_figure.models import PoliticalFigure
+from apps.political_party.models import PoliticalParty
+from utils.command_helpers.dataset import iter_dataset, write_dataset, write_seed_file
+from utils.command_helpers.endpoint_benchmark import ENDPOINTS, benchmark_dataset
+from utils.command_helpers.importer import import_seed_file
+from utils.command_helpers.profiles import (
+    get_profile_path,
+    list_profiles,
+    read_collapsed,
+    render_flamegraph,
+    render_profile,
+)
+from utils.core.base_views import PublicAPIView
+from utils.core.full_text_search import POLITICAL_FIGURE_DOCUMENT, search
+from utils.core.json_stream import iter_object_items
+from utils.core.profiling import ProfilingMiddleware, get_profile_token
+from utils.core.query_budget import QueryBudgetExceeded, get_query_shape
+from utils.political_figure.core import PoliticalFigureUtil
+from utils.political_party.core import PoliticalPartyUtil
 
 # Create your tests here.
+
+
+class PartyCountAPI(PublicAPIView):
+    query_budget = 1
+
+    def get(self, request):
+        # one query for each party asked for
+        ids = [int(pk) for pk in request.GET.get("ids", "").split(",") if pk]
+        count = sum(PoliticalParty.objects.filter(pk=pk).count() for pk in ids)
+        return Response({"count": count})
+
+
+class PartyNamesAPI(PublicAPIView):
+    def get(self, request):
+        # N+1: the party of each figure is queried separately
+        figures = PoliticalFigure.objects.all()
+        return Response([figure.political_party.name for figure in figures])
+
+
+# see QueryBudgetTests
+urlpatterns = [
+    path("party-count/", PartyCountAPI.as_view()),
+    path("party-names/", PartyNamesAPI.as_view()),
+]
+
+
+class JSONStreamTests(TestCase):
+    def test_items_are_the_same_as_json_load(self):
+        file_path = os.path.join(settings.BASE_DIR, "data", "seed_data.json")
+        with open(file_path, encoding="utf-8") as file:
+            data = json.load(file)
+
+        # values cut at every possible position
+        for read_size in (1, 7, 4096):
+            with open(file_path, encoding="utf-8") as file:
+                items = list(iter_object_items(file, read_size=read_size))
+            self.assertEqual(
+                items, [(key, item) for key, value in data.items() for item in value]
+            )
+
+        items = iter_object_items(io.StringIO('{"a": [1, 2.5e3], "b": 4.5}'), 1)
+        self.assertEqual(list(items), [("a", 1), ("a", 2500.0), ("b", 4.5)])
+
+    def test_malformed(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_object_items(io.StringIO('{"a": [1, 2'), 2))
+
+
+class BulkLoadTests(TestCase):
+    def test_load_political_figures(self):
+        [party_id] = PoliticalPartyUtil.load_political_parties(
+            [
+                {
+                    "name": "Janata Party",
+                    "abbreviation": "JP",
+                    "founded_date": datetime.date(1990, 1, 1),
+                    "hq_location": "Kathmandu",
+                }
+            ]
+        )
+        address = {
+            "street_address": "Test Street",
+            "city": "Kathmandu",
+            "country": "NP",
+            "latitude": Decimal("27.717200"),
+            "longitude": None,
+        }
+        figure = {
+            "full_name": "Ram Bahadur",
+            "gender": "m",
+            # escaped in COPY's text format
+            "biography": "Line\tone\nLine\\two",
+            "home_address": address,
+            "current_address": {**address, "city": "Pokhara"},
+            "political_party_id": party_id,
+        }
+        ids = PoliticalFigureUtil.load_political_figures([figure, figure])
+
+        political_figures = PoliticalFigure.objects.select_related(
+            "home_address", "current_address", "political_party"
+        ).filter(pk__in=ids)
+        self.assertEqual(
+            sorted(
+                (
+                    political_figure.slug,
+                    political_figure.search_key,
+                    political_figure.biography,
+                    political_figure.political_party.slug,
+                    political_figure.home_address.city,
+                    political_figure.home_address.latitude,
+                    political_figure.current_address.city,
+                    political_figure.date_of_birth,
+                    political_figure.is_active,
+                    political_figure.created_at is not None,
+                )
+                for political_figure in political_figures
+            ),
+            [
+                (slug, "rambahadur", "Line\tone\nLine\\two", "janata-party")
+                + ("Kathmandu", Decimal("27.717200"), "Pokhara", None, True, True)
+                for slug in ("ram-bahadur", "ram-bahadur-2")
+            ],
+        )
+        # search documents include the party
+        self.assertEqual(
+            sorted(search(POLITICAL_FIGURE_DOCUMENT, "ram janata", limit=10)),
+            sorted(ids),
+        )
+
+
+class ImportSeedFileTests(TestCase):
+    def get_party(self, name, figure_names, **kwargs):
+        address = {
+            "street_address": "Test Street",
+            "street_address_2": "",
+            "city": "Kathmandu",
+            "region": "Bagmati",
+            "postal_code": "",
+            "country": "NP",
+            "latitude": None,
+            "longitude": None,
+        }
+        return {
+            "name": name,
+            "description": "Test description",
+            "abbreviation": "TP",
+            "founded_date": "1990-01-01",
+            "ideology": "Test ideology",
+            "hq_location": "Kathmandu",
+            "website": "",
+            "logo_url": "https://example.com/logo.png",
+            "political_figures": [
+                {
+                    "full_name": full_name,
+                    "date_of_birth": "1970-01-01",
+                    "gender": "m",
+                    "biography": "",
+                    "photo": None,
+                    "home_address": address,
+                    "current_address": address,
+                    "contact_number": "",
+                    "website": "",
+                    "facebook_url": "",
+                    "twitter_url": "",
+                    "instagram_url": "",
+                    "is_active": True,
+                }
+                for full_name in figure_names
+            ],
+            **kwargs,
+        }
+
+    def import_parties(self, parties, workers=1):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"users": [], "political_parties": parties}, file)
+        self.addCleanup(os.remove, file.name)
+        with redirect_stdout(io.StringIO()):
+            return import_seed_file(file.name, batch_size=3, workers=workers)
+
+    def get_parties(self):
+        return [
+            self.get_party("First Party", ["Ram Bahadur", "Sita Kumari"]),
+            self.get_party("Second Party", ["Ram Bahadur", "Ram Bahadur"]),
+            self.get_party("Invalid Party", ["Hari Prasad"], founded_date="invalid"),
+            self.get_party("Third Party", ["Gita Devi", ""]),
+        ]
+
+    def get_figures(self):
+        return sorted(
+            PoliticalFigure.objects.values_list(
+                "political_party__name", "full_name", "slug"
+            )
+        )
+
+    def test_import_and_resume(self):
+        parties = self.get_parties()
+
+        stats = self.import_parties(parties[:2])
+        self.assertEqual((stats.records, stats.created, stats.existing), (6, 5, 1))
+
+        # first two parties were committed, they are skipped
+        stats = self.import_parties(parties)
+        self.assertEqual(
+            (stats.records, stats.created, stats.existing, stats.invalid),
+            (11, 2, 6, 3),
+        )
+        self.assertEqual(PoliticalParty.objects.count(), 3)
+        self.assertEqual(
+            self.get_figures(),
+            [
+                ("First Party", "Ram Bahadur", "ram-bahadur"),
+                ("First Party", "Sita Kumari", "sita-kumari"),
+                ("Second Party", "Ram Bahadur", "ram-bahadur-2"),
+                ("Third Party", "Gita Devi", "gita-devi"),
+            ],
+        )
+
+    def test_workers(self):
+        # same rows and slugs as a single process import, whatever batch is validated first
+        parties = self.get_parties() * 2
+        with transaction.atomic():
+            stats = self.import_parties(parties)
+            figures = self.get_figures()
+            transaction.set_rollback(True)
+        self.assertEqual(
+            (stats.records, stats.created, stats.existing, stats.invalid),
+            (22, 7, 9, 6),
+        )
+
+        stats = self.import_parties(parties, workers=2)
+        self.assertEqual(
+            (stats.records, stats.created, stats.existing, stats.invalid),
+            (22, 7, 9, 6),
+        )
+        self.assertEqual(self.get_figures(), figures)
+
+
+class GenerateDatasetTests(TestCase):
+    def test_seed_file(self):
+        files = [io.StringIO() for _ in range(3)]
+        for file, seed in zip(files, [1, 1, 2]):
+            write_seed_file(iter_dataset(10, 100, seed=seed), file)
+        self.assertEqual(files[0].getvalue(), files[1].getvalue())
+        self.assertNotEqual(files[0].getvalue(), files[2].getvalue())
+
+        # generated items are valid
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            file.write(files[0].getvalue())
+        self.addCleanup(os.remove, file.name)
+        with redirect_stdout(io.StringIO()):
+            stats = import_seed_file(file.name)
+        self.assertEqual(stats.invalid, 0)
+        self.assertEqual(stats.created + stats.existing, stats.records)
+
+    def test_write_dataset(self):
+        dataset = list(iter_dataset(50, 500, seed=1))
+        self.assertEqual(write_dataset(dataset, chunk_size=100), (50, 500))
+
+        parties = [party for party, _ in dataset]
+        figures = [figure for _, figures in dataset for figure in figures]
+        self.assertEqual(
+            (
+                PoliticalParty.all_objects.count(),
+                PoliticalParty.deleted_objects.count(),
+                PoliticalParty.all_objects.filter(dissolved_date__isnull=False).count(),
+                PoliticalFigure.all_objects.count(),
+                PoliticalFigure.deleted_objects.count(),
+            ),
+            (
+                50,
+                sum(1 for party in parties if party["deleted"]),
+                sum(1 for party in parties if party["dissolved_date"]),
+                500,
+                sum(1 for figure in figures if figure["deleted"]),
+            ),
+        )
+        # figures of deleted parties have none
+        self.assertFalse(
+            PoliticalFigure.all_objects.filter(political_party__deleted__isnull=False)
+        )
+
+
+class EndpointBenchmarkTests(TestCase):
+    def test_every_endpoint_succeeds(self):
+        with redirect_stdout(io.StringIO()):
+            results = benchmark_dataset(figures=50, parties=5, requests=2, warmup=0)
+
+        self.assertEqual(results["dataset"]["figures"], 50)
+        self.assertEqual(
+            list(results["endpoints"]), [endpoint.name for endpoint in ENDPOINTS]
+        )
+        for name, stats in results["endpoints"].items():
+            with self.subTest(name):
+                self.assertEqual(stats["errors"], 0, stats["status_codes"])
+                self.assertGreater(stats["latency_ms"]["p99"], 0)
+
+
+@override_settings(ROOT_URLCONF="apps.core.tests")
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parties = [
+            PoliticalParty.objects.create(
+                name=f"Party {i}",
+                abbreviation=f"P{i}",
+                founded_date=datetime.date(1990, 1, 1),
+                hq_location="Kathmandu",
+            )
+            for i in range(3)
+        ]
+        for party in cls.parties:
+            PoliticalFigure.objects.create(
+                full_name=f"Figure of {party.name}", political_party=party
+            )
+
+    def test_within_budget(self):
+        response = self.client.get(f"/party-count/?ids={self.parties[0].pk}")
+        self.assertEqual(response.json(), {"count": 1})
+
+    def test_over_budget(self):
+        ids = ",".join(str(party.pk) for party in self.parties[:2])
+        with self.assertRaisesMessage(QueryBudgetExceeded, "over the budget of 1"):
+            self.client.get(f"/party-count/?ids={ids}")
+
+    def test_repeated_queries(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "Same query made 3 times"):
+            self.client.get("/party-names/")
+
+        # outside of tests it's a warning, with where the query was made
+        with override_settings(QUERY_BUDGET_RAISE=False):
+            with self.assertLogs("utils.core.query_budget", "WARNING") as logs:
+                response = self.client.get("/party-names/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(os.path.join("apps", "core", "tests.py"), logs.output[0])
+        self.assertIn("in get", logs.output[0])
+
+    def test_query_shape(self):
+        self.assertEqual(
+            get_query_shape('SELECT * FROM "a" WHERE "a"."id" IN (%s, %s, %s)'),
+            get_query_shape('SELECT * FROM "a" WHERE "a"."id" IN (%s)'),
+        )
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def get_response(self, request):
+        time.sleep(0.02)
+        return HttpResponse("ok")
+
+    def profile(self, headers=None, **overrides):
+        with override_settings(
+            PROFILING_ENABLED=True, PROFILING_DIR=self.directory, **overrides
+        ):
+            middleware = ProfilingMiddleware(self.get_response)
+            return middleware(RequestFactory().get("/", headers=headers))
+
+    def test_signed_header(self):
+        for profiler in ("sampling", "cprofile"):
+            response = self.profile({"X-Profile": get_profile_token(profiler)})
+            self.assertEqual(response.content, b"ok")
+            path = get_profile_path(response["X-Profile-Name"], self.directory)
+            self.assertIn("get_response", render_profile(path))
+
+        profiles = list_profiles(self.directory)
+        self.assertEqual(
+            [profile["format"] for profile in profiles], ["collapsed", "pstats"]
+        )
+        self.assertEqual(profiles[0]["url_name"], "unresolved")
+        self.assertGreaterEqual(profiles[0]["duration_ms"], 20)
+
+        stacks = read_collapsed(get_profile_path(profiles[0]["name"], self.directory))
+        self.assertIn("<rect", render_flamegraph(stacks))
+
+    def test_not_profiled(self):
+        with self.assertLogs("utils.core.profiling", "WARNING"):
+            response = self.profile({"X-Profile": "sampling:forged"})
+        self.assertNotIn("X-Profile-Name", response)
+        self.assertNotIn("X-Profile-Name", self.profile())
+        self.assertEqual(list_profiles(self.directory), [])
+
+        # unless sampled
+        self.assertIn("X-Profile-Name", self.profile(PROFILING_SAMPLE_RATE=1))
+
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(self.get_response)
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        party = PoliticalParty.objects.create(
+            name="Janata Party",
+            abbreviation="JP",
+            founded_date=datetime.date(1990, 1, 1),
+            hq_location="Kathmandu",
+        )
+        PoliticalFigure.objects.create(full_name="Ram Bahadur", political_party=party)
+
+    def setUp(self):
+        # pre-rendered rows of other tests would be hits
+        cache.clear()
+
+    def get_value(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_request_metrics(self):
+        labels = {"method": "GET", "url_name": "get-political-figure-list"}
+        before = {
+            name: self.get_value(name, **labels)
+            for name in (
+                "http_request_duration_seconds_count",
+                "http_request_db_queries_sum",
+                "http_request_serialization_seconds_sum",
+            )
+        }
+        responses = self.get_value("http_responses_total", status="200", **labels)
+        misses = self.get_value(
+            "cache_lookups_total", cache="json_fragment", result="miss"
+        )
+
+        self.client.get("/api/v1/political-figures/get/list/")
+
+        self.assertEqual(
+            self.get_value("http_request_duration_seconds_count", **labels),
+            before["http_request_duration_seconds_count"] + 1,
+        )
+        # millisecond buckets
+        self.assertIsNotNone(
+            REGISTRY.get_sample_value(
+                "http_request_duration_seconds_bucket", {"le": "0.001", **labels}
+            )
+        )
+        self.assertGreater(
+            self.get_value("http_request_db_queries_sum", **labels),
+            before["http_request_db_queries_sum"],
+        )
+        self.assertGreater(
+            self.get_value("http_request_serialization_seconds_sum", **labels),
+            before["http_request_serialization_seconds_sum"],
+        )
+        self.assertEqual(
+            self.get_value("http_responses_total", status="200", **labels),
+            responses + 1,
+        )
+        self.assertEqual(
+            self.get_value("cache_lookups_total", cache="json_fragment", result="miss"),
+            misses + 1,
+        )
+
+    def test_metrics_are_internal(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_request_duration_seconds", response.content)
+
+        self.assertEqual(
+            self.client.get("/metrics", REMOTE_ADDR="203.0.113.1").status_code, 404
+        )
+        # through the reverse proxy
+        self.assertEqual(
+            self.client.get("/metrics", HTTP_X_FORWARDED_FOR="203.0.113.1").status_code,
+            404,
+        )
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        labels = {"method": "GET", "url_name": "get-political-figure-list"}
+        count = self.get_value("http_request_duration_seconds_count", **labels)
+
+        self.client.get("/api/v1/political-figures/get/list/")
+
+        self.assertEqual(
+            self.get_value("http_request_duration_seconds_count", **labels), count
+        )
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
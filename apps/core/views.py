@@ -11,6 +11,8 @@ from drf_spectacular.utils import extend_schema
 
 class GetCountryListAPI(PublicAPIView):
 
+    query_budget = 0
+
     class OutputSerializer(serializers.Serializer):
         code = serializers.CharField()
         name = serializers.CharField()
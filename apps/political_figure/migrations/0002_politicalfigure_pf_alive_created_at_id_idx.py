@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        ("political_figure", "0001_initial"),
+        ("political_party", "0004_alter_politicalparty_uuid"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="politicalfigure",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="pf_alive_created_at_id_idx",
+            ),
+        ),
+    ]
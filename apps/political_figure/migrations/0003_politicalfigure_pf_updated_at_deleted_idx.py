@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        ("political_figure", "0002_politicalfigure_pf_alive_created_at_id_idx"),
+        ("political_party", "0005_politicalparty_pp_updated_at_deleted_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="politicalfigure",
+            index=models.Index(
+                fields=["updated_at", "deleted"], name="pf_updated_at_deleted_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Full text search structures are vendor specific (tsvector + GIN index on Postgres, FTS5 on SQLite) and not model fields, see utils/core/full_text_search.py
+
+from django.db import migrations
+
+from utils.core.full_text_search import (
+    POLITICAL_FIGURE_DOCUMENT,
+    POLITICAL_PARTY_DOCUMENT,
+    create_search_structures,
+    drop_search_structures,
+)
+
+
+def create(apps, schema_editor):
+    create_search_structures(schema_editor, POLITICAL_PARTY_DOCUMENT)
+    create_search_structures(schema_editor, POLITICAL_FIGURE_DOCUMENT)
+
+
+def drop(apps, schema_editor):
+    drop_search_structures(schema_editor, POLITICAL_FIGURE_DOCUMENT)
+    drop_search_structures(schema_editor, POLITICAL_PARTY_DOCUMENT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("political_figure", "0003_politicalfigure_pf_updated_at_deleted_idx"),
+        ("political_party", "0005_politicalparty_pp_updated_at_deleted_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create, drop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_address_addr_country_region_city_idx"),
+        ("political_figure", "0005_politicalfigure_search_key"),
+        ("political_party", "0006_politicalparty_search_key"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="politicalfigure",
+            index=models.Index(
+                fields=["political_party", "gender", "is_active"],
+                name="pf_party_gender_active_idx",
+            ),
+        ),
+    ]
@@ -1,9 +1,16 @@
+import functools
+
 from django.db import models
 
 from apps.core.models import Address
 from apps.political_party.models import PoliticalParty
 from utils.core.base_models import BaseModel
-from utils.core.general import check_and_generate_slug
+from utils.core.fuzzy_search import SEARCH_KEY_MAX_LENGTH, normalize_name
+from utils.core.full_text_search import (
+    POLITICAL_FIGURE_DOCUMENT,
+    refresh_search_documents,
+)
+from utils.core.slugs import get_base_slug, save_with_unique_slug
 from utils.core.validation import nepal_phone_number_validator
 
 # Create your models here.
@@ -16,6 +23,10 @@ class PoliticalFigure(BaseModel):
 
     full_name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
+    # normalized full_name for typo tolerant lookup, set in save(), see utils/core/fuzzy_search.py
+    search_key = models.CharField(
+        max_length=SEARCH_KEY_MAX_LENGTH, blank=True, editable=False
+    )
 
     date_of_birth = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=1, choices=Gender.choices)
@@ -55,11 +66,19 @@ class PoliticalFigure(BaseModel):
     is_active = models.BooleanField(default=True)
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = check_and_generate_slug(
-                self, "full_name", "slug", fail_silently=False
+        self.search_key = normalize_name(self.full_name)
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            # see utils/core/slugs.py
+            save_with_unique_slug(
+                self,
+                get_base_slug(self.full_name, PoliticalFigure),
+                functools.partial(super().save, *args, **kwargs),
             )
-        super().save(*args, **kwargs)
+
+        # keep full text search document in sync, see utils/core/full_text_search.py
+        refresh_search_documents(POLITICAL_FIGURE_DOCUMENT, ids=[self.pk])
 
     def __str__(self):
         return self.full_name
@@ -70,3 +89,22 @@ class PoliticalFigure(BaseModel):
         verbose_name_plural = "Political Figures"
         ordering = ["-created_at"]
         constraints = []
+        indexes = [
+            # keyset pagination of the list API, see utils/core/pagination.py
+            # partial index so it only covers rows that safedelete's default manager can return (deleted IS NULL)
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(deleted__isnull=True),
+                name="pf_alive_created_at_id_idx",
+            ),
+            # conditional GET validators (max(updated_at) and count of non deleted rows), see utils/core/general.py:get_model_validators
+            models.Index(
+                fields=["updated_at", "deleted"],
+                name="pf_updated_at_deleted_idx",
+            ),
+            # faceted filtering and facet counts of the list API, see utils/core/facets.py
+            models.Index(
+                fields=["political_party", "gender", "is_active"],
+                name="pf_party_gender_active_idx",
+            ),
+        ]
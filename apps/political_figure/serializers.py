@@ -1,7 +1,12 @@
 from rest_framework import serializers
 from apps.core.models import Address
-from apps.core.serializers import CreateAddressSerializer, UpdateAddressSerializer
+from apps.core.serializers import (
+    CreateAddressSerializer,
+    PrefetchedPrimaryKeyRelatedField,
+    UpdateAddressSerializer,
+)
 from apps.political_figure.models import PoliticalFigure
+from apps.political_party.models import PoliticalParty
 
 
 class CreatePoliticalFigureSerializer(serializers.ModelSerializer):
@@ -77,3 +82,54 @@ class UpdatePoliticalFigureSerializer(serializers.ModelSerializer):
             "instagram_url",
             "is_active",
         ]
+
+
+class BulkCreatePoliticalFigureItemSerializer(CreatePoliticalFigureSerializer):
+    """
+    CreatePoliticalFigureSerializer whose political party is looked up in the `political_parties` context ({pk: party}) instead of one query per item, see PoliticalFigureUtil.bulk_create_political_figures()
+    """
+
+    political_party = PrefetchedPrimaryKeyRelatedField(
+        context_key="political_parties",
+        queryset=PoliticalParty.objects.all(),
+        required=True,
+        allow_null=True,
+        error_messages={"does_not_exist": "Political party does not exist"},
+    )
+
+    class Meta(CreatePoliticalFigureSerializer.Meta):
+        # photos can't be uploaded in bulk
+        extra_kwargs = {
+            **CreatePoliticalFigureSerializer.Meta.extra_kwargs,
+            "photo": {"required": False, "allow_null": True},
+        }
+
+
+class BulkCreatePoliticalFigureSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=1000
+    )
+    # create the valid items and return the errors of the others, instead of creating nothing if any item is invalid
+    allow_partial = serializers.BooleanField(default=False)
+
+
+class BulkUpdatePoliticalFigureItemSerializer(UpdatePoliticalFigureSerializer):
+    """
+    UpdatePoliticalFigureSerializer whose political party is looked up in the `political_parties` context, see PoliticalFigureUtil.bulk_update_political_figures()
+    """
+
+    political_party = PrefetchedPrimaryKeyRelatedField(
+        context_key="political_parties",
+        queryset=PoliticalParty.objects.all(),
+        required=False,
+        allow_null=True,
+        error_messages={"does_not_exist": "Political party does not exist"},
+    )
+
+    class Meta(UpdatePoliticalFigureSerializer.Meta):
+        # photos can't be uploaded in bulk
+        fields = [
+            field
+            for field in UpdatePoliticalFigureSerializer.Meta.fields
+            if field != "photo"
+        ]
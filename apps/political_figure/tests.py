@@ -1,3 +1,1119 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from apps.core.models import Address
+from apps.political_figure.models import PoliticalFigure
+from apps.political_party.models import PoliticalParty
+from utils.core.cache import bump_model_generation
+from utils.core.full_text_search import tokenize_query
+from utils.core.pagination import KeysetPagination
 
 # Create your tests here.
+
+
+def create_political_party(name="Test Party", abbreviation="TP"):
+    return PoliticalParty.objects.create(
+        name=name,
+        description="Test description",
+        abbreviation=abbreviation,
+        founded_date=datetime.date(1990, 1, 1),
+        ideology="Test ideology",
+        hq_location="Kathmandu",
+        logo_url="https://example.com/logo.png",
+    )
+
+
+def create_address(city="Kathmandu"):
+    return Address.objects.create(
+        street_address="Test Street",
+        city=city,
+        region="Bagmati",
+        country="NP",
+    )
+
+
+def create_political_figure(political_party, full_name="Test Figure", **kwargs):
+    kwargs.setdefault("gender", PoliticalFigure.Gender.MALE)
+    return PoliticalFigure.objects.create(
+        full_name=full_name,
+        political_party=political_party,
+        home_address=create_address(),
+        current_address=create_address(),
+        **kwargs,
+    )
+
+
+class PoliticalFigureReadQueryCountTests(TestCase):
+    """
+    Read views should use a fixed number of queries regardless of the number of rows
+    """
+
+    def setUp(self):
+        # rows are created directly (not through PoliticalFigureUtil), so the response cache is not invalidated
+        cache.clear()
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        url = "/api/v1/political-figures/get/list/"
+
+        for number_of_rows in (1, 10):
+            for i in range(number_of_rows):
+                political_party = create_political_party(
+                    name=f"Party {number_of_rows}-{i}", abbreviation=f"P{i}"
+                )
+                create_political_figure(
+                    political_party, full_name=f"Figure {number_of_rows}-{i}"
+                )
+
+            cache.clear()
+            # figure and party validators for conditional GET, versions of the page, and the rows that are not pre-rendered yet
+            with self.assertNumQueries(4):
+                response = self.client.get(url, {"page_size": 100})
+
+            # rows are pre-rendered now, see utils/core/json_fragments.py
+            bump_model_generation(PoliticalFigure)
+            with self.assertNumQueries(3):
+                response = self.client.get(url, {"page_size": 100})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.json()["data"][0]["political_party_name"],
+                f"Party {number_of_rows}-{number_of_rows - 1}",
+            )
+
+    def test_detail_query_count(self):
+        political_figure = create_political_figure(create_political_party())
+        url = f"/api/v1/political-figures/get/detail/{political_figure.pk}/"
+
+        # validators for conditional GET, and the row
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        data = response.json()["data"]
+        self.assertEqual(
+            data["political_party_slug"], political_figure.political_party.slug
+        )
+        self.assertEqual(data["home_address"]["city"], "Kathmandu")
+
+    def test_detail_of_figure_without_party(self):
+        # for example of a deleted party
+        political_figure = create_political_figure(None)
+        url = f"/api/v1/political-figures/get/detail/{political_figure.pk}/"
+
+        # compiled serializer for JSON, the output serializer for the browsable API
+        for accept in ("application/json", "text/html"):
+            with self.subTest(accept=accept):
+                response = self.client.get(url, HTTP_ACCEPT=accept)
+                self.assertEqual(response.status_code, 200)
+
+        data = self.client.get(url).json()["data"]
+        self.assertIsNone(data["political_party_name"])
+        self.assertIsNone(data["political_party_slug"])
+
+
+class KeysetPaginationTests(TestCase):
+    url = "/api/v1/political-figures/get/list/"
+
+    def setUp(self):
+        cache.clear()
+        political_party = create_political_party()
+        self.political_figures = [
+            create_political_figure(political_party, full_name=f"Figure {i}")
+            for i in range(5)
+        ]
+
+    def get_page(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return [row["id"] for row in body["data"]], body["pagination"]
+
+    def walk(self, page_size, **params):
+        """
+        Returns the ids of every page, going forward, and then the ids of the same pages going back from the last one
+        """
+        forward = []
+        ids, pagination = self.get_page(page_size=page_size, **params)
+        forward.append(ids)
+        self.assertIsNone(pagination["previous"])
+        while pagination["next"]:
+            ids, pagination = self.get_page(
+                page_size=page_size, cursor=pagination["next"], **params
+            )
+            forward.append(ids)
+
+        backward = [forward[-1]]
+        while pagination["previous"]:
+            ids, pagination = self.get_page(
+                page_size=page_size, cursor=pagination["previous"], **params
+            )
+            backward.insert(0, ids)
+        return forward, backward
+
+    def test_next_and_previous_round_trip(self):
+        forward, backward = self.walk(page_size=2)
+
+        # newest first
+        expected = [political_figure.pk for political_figure in self.political_figures]
+        expected.reverse()
+        self.assertEqual(forward, [expected[0:2], expected[2:4], expected[4:5]])
+        self.assertEqual(backward, forward)
+        # with only some fields, see utils/core/sparse_fieldsets.py
+        self.assertEqual(self.walk(page_size=2, fields="id"), (forward, backward))
+
+    def test_ties_on_created_at_are_broken_by_id(self):
+        PoliticalFigure.objects.update(created_at=self.political_figures[0].created_at)
+
+        forward, backward = self.walk(page_size=2)
+
+        ids = [pk for page in forward for pk in page]
+        self.assertEqual(
+            ids,
+            sorted(
+                (political_figure.pk for political_figure in self.political_figures),
+                reverse=True,
+            ),
+        )
+        self.assertEqual(backward, forward)
+
+    def test_invalid_cursor(self):
+        _, pagination = self.get_page(page_size=2)
+        valid = pagination["next"]
+        # valid base64 of something else than a cursor, or a cursor whose values were changed
+        tampered = [
+            base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            for payload in (
+                ["c", "i"],
+                {"c": "yesterday", "i": 1},
+                {"c": "2024-01-01T00:00:00+00:00", "i": "one"},
+                {"c": "2024-01-01T00:00:00+00:00", "i": None},
+                {"i": 1},
+            )
+        ]
+
+        not_utf8 = base64.urlsafe_b64encode(b"\xff\xfe").decode()
+
+        for cursor in ["not a cursor", valid[:-3], "%%%", not_utf8, *tampered]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("cursor", response.json()["extra"])
+
+    def test_page_size_is_clamped(self):
+        ids, pagination = self.get_page(page_size=KeysetPagination.max_page_size + 1)
+        self.assertEqual(pagination["page_size"], KeysetPagination.max_page_size)
+        self.assertEqual(len(ids), 5)
+
+        for page_size in (0, "two"):
+            with self.subTest(page_size=page_size):
+                response = self.client.get(self.url, {"page_size": page_size})
+                self.assertEqual(response.status_code, 400)
+
+    def test_rows_deleted_between_pages(self):
+        expected = [political_figure.pk for political_figure in self.political_figures]
+        expected.reverse()
+        first_page, pagination = self.get_page(page_size=2)
+
+        # the last row of the page (the cursor's row) and a row of the next page
+        for pk in (expected[1], expected[2]):
+            PoliticalFigure.objects.get(pk=pk).delete()
+
+        ids, pagination = self.get_page(page_size=2, cursor=pagination["next"])
+        self.assertEqual(ids, expected[3:5])
+        self.assertIsNone(pagination["next"])
+
+        ids, _ = self.get_page(page_size=2, cursor=pagination["previous"])
+        self.assertEqual(ids, expected[0:1])
+
+
+class SparseFieldsetTests(TestCase):
+    url = "/api/v1/political-figures/get/list/"
+
+    def setUp(self):
+        cache.clear()
+        self.political_figure = create_political_figure(
+            create_political_party(), full_name="Ram Bahadur", biography="Biography"
+        )
+
+    def get_row_sql(self, params):
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        # the rows, not the conditional GET validators (aggregates)
+        (sql,) = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "political_figure"."id"')
+        ]
+        return response.json()["data"], sql
+
+    def test_unknown_fields(self):
+        for param in ("fields", "exclude"):
+            with self.subTest(param=param):
+                response = self.client.get(self.url, {param: "id,password"})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json()["extra"], {param: "Unknown field(s): password"}
+                )
+
+    def test_fields_and_exclude_together(self):
+        response = self.client.get(self.url, {"fields": "id,slug", "exclude": "slug"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("exclude", response.json()["extra"])
+
+    def test_only_requested_fields(self):
+        from apps.political_figure.views import GetPoliticalFigureDetailAPI
+
+        data, _ = self.get_row_sql({"fields": "slug,id,full_name"})
+        # in the order of the serializer
+        self.assertEqual(list(data[0]), ["id", "slug", "full_name"])
+
+        excluded = {"home_address", "current_address", "biography"}
+        data, _ = self.get_row_sql({"exclude": ",".join(excluded)})
+        self.assertEqual(
+            list(data[0]),
+            [
+                field
+                for field in GetPoliticalFigureDetailAPI.OutputSerializer.Meta.fields
+                if field not in excluded
+            ],
+        )
+
+        detail_url = f"/api/v1/political-figures/get/detail/{self.political_figure.pk}/"
+        response = self.client.get(detail_url, {"fields": "id,political_party_slug"})
+        self.assertEqual(
+            response.json()["data"],
+            {
+                "id": self.political_figure.pk,
+                "political_party_slug": self.political_figure.political_party.slug,
+            },
+        )
+
+    def test_unrequested_relations_and_columns_are_not_queried(self):
+        from utils.political_figure.core import PoliticalFigureUtil
+
+        _, sql = self.get_row_sql({"fields": "id,slug,full_name"})
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn('"biography"', sql)
+
+        _, sql = self.get_row_sql({"fields": "id,political_party_name"})
+        self.assertIn('JOIN "political_party"', sql)
+        self.assertNotIn('JOIN "address"', sql)
+
+        _, sql = self.get_row_sql({"exclude": "biography"})
+        self.assertIn('JOIN "address"', sql)
+        self.assertNotIn('"biography"', sql)
+
+        # model instances of the other renderers
+        sql = str(PoliticalFigureUtil.get_read_queryset(fields=["id", "slug"]).query)
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn('"biography"', sql)
+        self.assertIn("JOIN", str(PoliticalFigureUtil.get_read_queryset().query))
+
+
+class SearchPoliticalFigureTests(TestCase):
+    url = "/api/v1/political-figures/search/"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_search_ranks_name_over_biography_and_uses_prefix(self):
+        congress = create_political_party(name="Nepali Congress", abbreviation="NC")
+        other = create_political_party(name="Other Party", abbreviation="OP")
+        by_party = create_political_figure(congress, full_name="Sher Bahadur Deuba")
+        by_biography = create_political_figure(
+            other, full_name="Ram Bahadur Thapa", biography="Former congress member"
+        )
+
+        response = self.client.get(self.url, {"q": "congress"})
+        ids = [row["id"] for row in response.json()["data"]]
+        self.assertEqual(ids, [by_party.id, by_biography.id])
+
+        response = self.client.get(self.url, {"q": "sher deu"})
+        ids = [row["id"] for row in response.json()["data"]]
+        self.assertEqual(ids, [by_party.id])
+
+    def test_search_requires_query(self):
+        response = self.client.get(self.url, {"q": "  "})
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_figure_without_party(self):
+        political_figure = create_political_figure(None, full_name="Ram Bahadur")
+
+        response = self.client.get(self.url, {"q": "ram"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data[0]["id"], political_figure.id)
+        self.assertIsNone(data[0]["political_party_name"])
+
+    def test_search_devanagari(self):
+        # vowel signs and viramas are combining marks, not word characters of \w
+        self.assertEqual(tokenize_query("नेपाली कांग्रेस!"), ["नेपाली", "कांग्रेस"])
+
+        congress = create_political_party(name="नेपाली कांग्रेस", abbreviation="NC")
+        political_figure = create_political_figure(
+            congress, full_name="शेरबहादुर देउवा"
+        )
+        create_political_figure(congress, full_name="देवराज घिमिरे")
+
+        for query in ("शेरबहादुर", "देउवा", "कांग्रेस देउ"):
+            response = self.client.get(self.url, {"q": query})
+            ids = [row["id"] for row in response.json()["data"]]
+            self.assertEqual(ids, [political_figure.id], query)
+
+
+class FuzzySearchPoliticalFigureTests(TestCase):
+    url = "/api/v1/political-figures/fuzzy-search/"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_normalize_name_folds_spelling_variations(self):
+        from utils.core.fuzzy_search import normalize_name
+
+        self.assertEqual(normalize_name("Prachanda"), normalize_name("Prachand"))
+        self.assertEqual(normalize_name("Sher Bahadur"), normalize_name("Sherbahadur"))
+        self.assertEqual(normalize_name("शेर बहादुर देउवा"), "serbahadurdeub")
+        self.assertEqual(
+            normalize_name("Sher Bahadur Deuba"), normalize_name("Sher Bahadur Deuwa")
+        )
+
+    def test_fuzzy_search_tolerates_typos_and_devanagari(self):
+        political_party = create_political_party()
+        deuba = create_political_figure(political_party, full_name="Sher Bahadur Deuba")
+        create_political_figure(political_party, full_name="Pushpa Kamal Dahal")
+
+        for query in ("Sherbahadur Deuwa", "sher bhadur", "शेर बहादुर देउवा"):
+            response = self.client.get(self.url, {"q": query})
+            data = response.json()["data"]
+            self.assertEqual(data[0]["id"], deuba.id, query)
+            self.assertGreater(data[0]["similarity"], 0)
+
+    def test_fuzzy_search_requires_query(self):
+        response = self.client.get(self.url, {"q": "--"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AutocompletePoliticalFigureTests(TestCase):
+    url = "/api/v1/political-figures/autocomplete/"
+
+    def setUp(self):
+        from utils.political_figure.core import political_figure_autocomplete_index
+
+        cache.clear()
+        # the index lives in memory and would otherwise keep rows of previous tests
+        political_figure_autocomplete_index.reset()
+
+    def get_names(self, query):
+        response = self.client.get(self.url, {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return [row["full_name"] for row in response.json()["data"]]
+
+    def test_autocomplete_by_name_later_word_and_party(self):
+        congress = create_political_party(name="Nepali Congress", abbreviation="NC")
+        create_political_figure(congress, full_name="Sher Bahadur Deuba")
+        create_political_figure(
+            create_political_party(name="Other Party", abbreviation="OP"),
+            full_name="Shekhar Koirala",
+        )
+
+        self.assertEqual(
+            self.get_names("she"), ["Shekhar Koirala", "Sher Bahadur Deuba"]
+        )
+        self.assertEqual(self.get_names("sherbah"), ["Sher Bahadur Deuba"])
+        self.assertEqual(self.get_names("शेर ब"), ["Sher Bahadur Deuba"])
+        self.assertEqual(self.get_names("deu"), ["Sher Bahadur Deuba"])
+        self.assertEqual(self.get_names("congr"), ["Sher Bahadur Deuba"])
+        self.assertEqual(self.get_names(""), [])
+
+        # one query to load the index, then none
+        with self.assertNumQueries(0):
+            self.get_names("koi")
+
+    def test_autocomplete_is_refreshed_when_generation_changes(self):
+        from utils.political_figure.core import PoliticalFigureUtil
+
+        political_party = create_political_party()
+        political_figure = create_political_figure(
+            political_party, full_name="Pushpa Kamal Dahal"
+        )
+        self.assertEqual(self.get_names("push"), ["Pushpa Kamal Dahal"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PoliticalFigureUtil.update_political_figure(
+                political_figure, {"full_name": "Prachanda"}
+            )
+        # slug is not changed on update, so only the later words are gone
+        self.assertEqual(self.get_names("kamal"), [])
+        self.assertEqual(self.get_names("prachan"), ["Prachanda"])
+
+        political_party.name = "Renamed Party"
+        political_party.save()
+        bump_model_generation(PoliticalParty)
+        response = self.client.get(self.url, {"q": "prachan"})
+        self.assertEqual(response.json()["data"][0]["party"], "Renamed Party")
+
+        political_figure.delete()
+        bump_model_generation(PoliticalFigure)
+        self.assertEqual(self.get_names("prachan"), [])
+
+    def test_autocomplete_is_refreshed_when_database_watermark_moves(self):
+        from utils.political_figure.core import political_figure_autocomplete_index
+
+        political_figure = create_political_figure(
+            create_political_party(), full_name="Pushpa Kamal Dahal"
+        )
+        self.assertEqual(self.get_names("push"), ["Pushpa Kamal Dahal"])
+
+        # written by another process: the generation bump goes to its own locmem cache
+        political_figure.full_name = "Prachanda"
+        political_figure.save()
+
+        # not checked again within the interval
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_names("prachan"), [])
+
+        with mock.patch.object(
+            political_figure_autocomplete_index, "db_check_interval", 0
+        ):
+            self.assertEqual(self.get_names("prachan"), ["Prachanda"])
+            # nothing changed since
+            with self.assertNumQueries(2):
+                self.assertEqual(self.get_names("prachan"), ["Prachanda"])
+
+
+class PoliticalFigureFacetTests(TestCase):
+    url = "/api/v1/political-figures/get/list/"
+
+    def setUp(self):
+        cache.clear()
+        self.congress = create_political_party(
+            name="Nepali Congress", abbreviation="NC"
+        )
+        self.other = create_political_party(name="Other Party", abbreviation="OP")
+        create_political_figure(self.congress, full_name="A")
+        create_political_figure(self.congress, full_name="B", is_active=False)
+        create_political_figure(
+            self.other, full_name="C", gender=PoliticalFigure.Gender.FEMALE
+        )
+
+    def test_filters(self):
+        response = self.client.get(
+            self.url, {"political_party": f"{self.congress.pk}", "is_active": "true"}
+        )
+        names = [row["full_name"] for row in response.json()["data"]]
+        self.assertEqual(names, ["A"])
+
+        response = self.client.get(self.url, {"gender": "f,x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_facet_counts_use_one_query_per_facet(self):
+        cache.clear()
+        # figure and party validators, versions, rows, and one grouped query for each of the 3 facets
+        with self.assertNumQueries(7):
+            response = self.client.get(
+                self.url,
+                {
+                    "political_party": f"{self.congress.pk}",
+                    "facets": "political_party,gender,home_city",
+                },
+            )
+        facets = response.json()["facets"]
+
+        # counts of a facet ignore its own filter
+        self.assertEqual(
+            facets["political_party"],
+            [
+                {"value": self.congress.pk, "label": "Nepali Congress", "count": 2},
+                {"value": self.other.pk, "label": "Other Party", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            facets["gender"], [{"value": "m", "label": "Male", "count": 2}]
+        )
+        self.assertEqual(
+            facets["home_city"],
+            [{"value": "Kathmandu", "label": "Kathmandu", "count": 2}],
+        )
+
+
+class PreRenderedListTests(TestCase):
+    url = "/api/v1/political-figures/get/list/"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pre_rendered_list_is_identical_to_serialized_list(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from apps.political_figure.views import GetPoliticalFigureListAPI
+        from utils.core.response_wrappers import OKResponse
+        from utils.political_figure.core import PoliticalFigureUtil
+
+        political_party = create_political_party(name="पार्टी")
+        for i in range(3):
+            create_political_figure(political_party, full_name=f"नेता {i}")
+
+        # twice, rendered on a miss and then from the cached fragments
+        for _ in range(2):
+            bump_model_generation(PoliticalFigure)
+            response = self.client.get(self.url, {"page_size": 2})
+
+            page = PoliticalFigureUtil.get_read_queryset().order_by(
+                "-created_at", "-id"
+            )[:2]
+            serializer = GetPoliticalFigureListAPI.output_serializer(page, many=True)
+            expected = OKResponse(
+                data=serializer.data,
+                pagination=response.json()["pagination"],
+            )
+            self.assertEqual(response.content, JSONRenderer().render(expected.data))
+
+    def test_fragment_is_not_used_after_related_row_changes(self):
+        political_party = create_political_party(name="Old Name")
+        create_political_figure(political_party)
+        self.client.get(self.url)
+
+        political_party.name = "New Name"
+        political_party.save()
+        bump_model_generation(PoliticalParty)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()["data"][0]["political_party_name"], "New Name")
+
+
+class CompiledSerializerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.political_figure = create_political_figure(
+            create_political_party(name="पार्टी"),
+            full_name="नेता",
+            biography="Line\u2028separator",
+            date_of_birth=datetime.date(1950, 6, 13),
+            photo="political_figures/photos/photo.jpg",
+        )
+        Address.objects.filter(pk=self.political_figure.home_address_id).update(
+            latitude="27.717200", longitude="85.324000"
+        )
+        PoliticalFigure.objects.filter(pk=self.political_figure.pk).update(
+            current_address=None
+        )
+
+    def test_compiled_output_is_identical_to_serializer(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from apps.political_figure.views import GetPoliticalFigureDetailAPI
+        from utils.core.response_wrappers import FastOKResponse, OKResponse
+        from utils.political_figure.core import PoliticalFigureUtil
+
+        view = GetPoliticalFigureDetailAPI
+        qs = PoliticalFigureUtil.get_read_queryset()
+
+        for fields in (None, ["id", "photo", "home_address", "political_party_name"]):
+            data = view.compiled_output_serializer.serialize(qs, fields=fields)
+            expected = view.output_serializer(qs, many=True, fields=fields).data
+            self.assertEqual(data, expected)
+            self.assertEqual(
+                FastOKResponse(data=data).content,
+                JSONRenderer().render(OKResponse(data=expected).data),
+            )
+
+    def test_detail_and_sparse_list_responses(self):
+        detail_url = f"/api/v1/political-figures/get/detail/{self.political_figure.pk}/"
+        data = self.client.get(detail_url).json()["data"]
+        self.assertEqual(data["photo"], "/media/political_figures/photos/photo.jpg")
+        self.assertEqual(data["date_of_birth"], "1950-06-13")
+        self.assertEqual(data["home_address"]["latitude"], "27.717200")
+        self.assertIsNone(data["current_address"])
+
+        response = self.client.get(
+            "/api/v1/political-figures/get/list/", {"fields": "id,slug"}
+        )
+        self.assertEqual(
+            response.json()["data"],
+            [{"id": self.political_figure.pk, "slug": self.political_figure.slug}],
+        )
+        self.assertEqual(
+            self.client.get("/api/v1/political-figures/get/detail/0/").status_code, 404
+        )
+
+
+class StreamingListTests(TestCase):
+    url = "/api/v1/political-figures/get/list/"
+
+    def setUp(self):
+        cache.clear()
+        political_party = create_political_party()
+        for i in range(5):
+            create_political_figure(political_party, full_name=f"Figure {i}")
+
+    def test_streamed_list_is_identical_to_list(self):
+        from apps.political_figure.views import GetPoliticalFigureListAPI
+        from utils.core.response_wrappers import FastOKResponse, StreamingOKResponse
+        from utils.political_figure.core import PoliticalFigureUtil
+
+        compiled = GetPoliticalFigureListAPI.compiled_output_serializer
+        qs = PoliticalFigureUtil.get_read_queryset().order_by("-created_at", "-id")
+
+        # chunk boundaries don't change the output
+        response = StreamingOKResponse(
+            data_chunks=compiled.serialize_chunks(qs, chunk_size=2)
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content),
+            FastOKResponse(data=compiled.serialize(qs)).content,
+        )
+
+    def test_stream_query_param(self):
+        response = self.client.get(self.url, {"stream": "1", "fields": "full_name"})
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(
+            data,
+            {
+                "data": [{"full_name": f"Figure {i}"} for i in reversed(range(5))],
+                "message": "Success",
+            },
+        )
+
+        self.assertFalse(self.client.get(self.url, {"stream": "0"}).streaming)
+        self.assertEqual(self.client.get(self.url, {"stream": "x"}).status_code, 400)
+
+
+class ExportPoliticalFigureTests(TestCase):
+    url = "/api/v1/political-figures/export/"
+
+    def setUp(self):
+        political_party = create_political_party(name="पार्टी")
+        self.political_figures = [
+            create_political_figure(
+                political_party, full_name=f"Figure {i}", biography='Say "hi",\nok'
+            )
+            for i in range(3)
+        ]
+
+    def get_content(self, file_format):
+        response = self.client.get(self.url, {"file_format": file_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        return b"".join(response.streaming_content)
+
+    def test_formats_have_the_same_rows(self):
+        import csv
+        import gzip
+        import io
+
+        from utils.core.export import EXPORT_CHUNK_SIZE
+
+        rows = [json.loads(line) for line in self.get_content("ndjson").splitlines()]
+        self.assertEqual(
+            [row["id"] for row in rows], [pf.pk for pf in self.political_figures]
+        )
+        self.assertEqual(rows[0]["political_party_name"], "पार्टी")
+        self.assertEqual(rows[0]["home_address_city"], "Kathmandu")
+        self.assertEqual(rows[0]["uuid"], str(self.political_figures[0].uuid))
+
+        csv_rows = list(csv.DictReader(io.StringIO(self.get_content("csv").decode())))
+        self.assertEqual(len(csv_rows), 3)
+        self.assertEqual(csv_rows[0]["biography"], 'Say "hi",\nok')
+        self.assertEqual(csv_rows[0]["home_address_latitude"], "")
+
+        self.assertLess(len(rows), EXPORT_CHUNK_SIZE)
+        (group,) = [
+            json.loads(line)
+            for line in gzip.decompress(self.get_content("columnar")).splitlines()
+        ]
+        self.assertEqual(group["rows"], 3)
+        self.assertEqual(
+            [
+                dict(zip(group["columns"], values))
+                for values in zip(*group["columns"].values())
+            ],
+            rows,
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {"file_format": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkCreatePoliticalFigureTests(TestCase):
+    url = "/api/v1/political-figures/bulk-create/"
+
+    def setUp(self):
+        self.political_party = create_political_party()
+
+    def get_item(self, full_name, **kwargs):
+        address = {
+            "street_address": "Test Street",
+            "street_address_2": "",
+            "city": "Kathmandu",
+            "region": "Bagmati",
+            "postal_code": "",
+            "country": "NP",
+            "latitude": None,
+            "longitude": None,
+        }
+        return {
+            "full_name": full_name,
+            "date_of_birth": None,
+            "gender": "m",
+            "biography": "",
+            "home_address": address,
+            "current_address": address,
+            "political_party": self.political_party.pk,
+            "contact_number": "",
+            "website": "",
+            "facebook_url": "",
+            "twitter_url": "",
+            "instagram_url": "",
+            "is_active": True,
+            **kwargs,
+        }
+
+    def test_bulk_create_with_constant_query_count(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        create_political_figure(self.political_party, full_name="Ram Bahadur")
+
+        query_counts = []
+        for count in (2, 20):
+            items = [self.get_item("Ram Bahadur") for _ in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    self.url, {"items": items}, content_type="application/json"
+                )
+            self.assertEqual(response.status_code, 200)
+            query_counts.append(len(queries))
+
+        # party lookup, slugs, addresses, figures, search documents and the output, regardless of the number of items
+        self.assertEqual(query_counts[0], query_counts[1])
+
+        created = response.json()["data"]["created"]
+        self.assertEqual(
+            [political_figure["slug"] for political_figure in created],
+            [f"ram-bahadur-{i}" for i in range(4, 24)],
+        )
+        self.assertEqual(created[0]["political_party_name"], "Test Party")
+        self.assertEqual(created[0]["home_address"]["city"], "Kathmandu")
+
+    def test_invalid_items(self):
+        items = [
+            self.get_item("Valid"),
+            self.get_item("Unknown Party", political_party=0),
+            self.get_item("", gender="x"),
+        ]
+
+        response = self.client.post(
+            self.url, {"items": items}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["extra"]["fields"]["items"]
+        self.assertEqual(errors[0], {})
+        self.assertEqual(
+            errors[1]["political_party"], ["Political party does not exist"]
+        )
+        self.assertEqual(set(errors[2]), {"full_name", "gender"})
+        self.assertFalse(PoliticalFigure.objects.exists())
+
+        response = self.client.post(
+            self.url,
+            {"items": items, "allow_partial": True},
+            content_type="application/json",
+        )
+        data = response.json()["data"]
+        self.assertEqual([pf["full_name"] for pf in data["created"]], ["Valid"])
+        self.assertEqual([error["index"] for error in data["errors"]], [1, 2])
+        self.assertEqual(PoliticalFigure.objects.count(), 1)
+
+
+class BulkUpdatePoliticalFigureTests(TestCase):
+    url = "/api/v1/political-figures/bulk-update/"
+
+    def setUp(self):
+        self.political_party = create_political_party()
+        self.new_political_party = create_political_party("New Party", "NP")
+
+    def test_bulk_update_with_constant_query_count(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        query_counts = []
+        for count in (2, 20):
+            political_figures = [
+                create_political_figure(self.political_party, full_name=f"Figure {i}")
+                for i in range(count)
+            ]
+            items = [
+                {
+                    "id": political_figure.pk,
+                    "changes": {
+                        "is_active": False,
+                        "political_party": self.new_political_party.pk,
+                    },
+                }
+                for political_figure in political_figures
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(
+                    self.url, {"items": items}, content_type="application/json"
+                )
+            self.assertEqual(response.status_code, 200)
+            query_counts.append(len(queries))
+
+        # figures, parties, one UPDATE, search documents and the output, regardless of the number of items
+        self.assertEqual(query_counts[0], query_counts[1])
+
+        updated = response.json()["data"]["updated"]
+        self.assertEqual(len(updated), 20)
+        self.assertEqual(
+            {(pf["is_active"], pf["political_party_name"]) for pf in updated},
+            {(False, "New Party")},
+        )
+        self.assertEqual(
+            PoliticalFigure.objects.filter(
+                political_party=self.new_political_party
+            ).count(),
+            22,
+        )
+
+    def test_changes_of_different_columns(self):
+        first = create_political_figure(self.political_party, full_name="First")
+        second = create_political_figure(self.political_party, full_name="Second")
+        updated_at = first.updated_at
+
+        items = [
+            {"id": first.pk, "changes": {"full_name": "Sher Bahadur"}},
+            {"id": second.pk, "changes": {"current_address": {"city": "Pokhara"}}},
+        ]
+        response = self.client.patch(
+            self.url, {"items": items}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.full_name, "Sher Bahadur")
+        self.assertEqual(first.search_key, "serbahadur")
+        self.assertGreater(first.updated_at, updated_at)
+        self.assertEqual(second.full_name, "Second")
+        self.assertEqual(second.current_address.city, "Pokhara")
+        self.assertEqual(second.home_address.city, "Kathmandu")
+
+    def test_invalid_items(self):
+        political_figure = create_political_figure(self.political_party)
+        items = [
+            {"id": political_figure.pk, "changes": {"is_active": False}},
+            {"id": 0, "changes": {"is_active": False}},
+            {"id": political_figure.pk, "changes": {"gender": "x"}},
+        ]
+
+        response = self.client.patch(
+            self.url, {"items": items}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["extra"]["fields"]["items"]
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]["id"], ["Political figure does not exist"])
+        self.assertEqual(errors[2]["id"], ["Duplicate id"])
+        political_figure.refresh_from_db()
+        self.assertTrue(political_figure.is_active)
+
+        response = self.client.patch(
+            self.url,
+            {"items": items, "allow_partial": True},
+            content_type="application/json",
+        )
+        data = response.json()["data"]
+        self.assertEqual([pf["is_active"] for pf in data["updated"]], [False])
+        self.assertEqual([error["index"] for error in data["errors"]], [1, 2])
+
+
+class SoftDeleteTests(TestCase):
+    def get_rows(self, political_figures):
+        # everything but timestamps and pks, which differ between the compared rows
+        rows = []
+        for political_figure in political_figures:
+            political_figure = PoliticalFigure.all_objects.get(pk=political_figure.pk)
+            rows.append(
+                (
+                    political_figure.deleted is not None,
+                    political_figure.deleted_by_cascade,
+                    political_figure.political_party_id is not None,
+                    [
+                        (address.deleted is not None, address.deleted_by_cascade)
+                        for address in (
+                            political_figure.home_address,
+                            political_figure.current_address,
+                        )
+                    ],
+                )
+            )
+        return rows
+
+    def test_same_rows_as_safedelete(self):
+        from utils.political_party.core import PoliticalPartyUtil
+        from utils.political_figure.core import PoliticalFigureUtil
+
+        compared = []
+        for set_based in (False, True):
+            political_party = create_political_party()
+            political_figures = [
+                create_political_figure(political_party) for _ in range(3)
+            ]
+            deleted_figure = political_figures[0]
+            updated_at = deleted_figure.updated_at
+
+            if set_based:
+                PoliticalFigureUtil.delete_political_figure(deleted_figure)
+                PoliticalPartyUtil.delete_political_party(political_party)
+            else:
+                # what the utils did before, one save() per row
+                deleted_figure.home_address.delete()
+                deleted_figure.current_address.delete()
+                deleted_figure.delete()
+                political_party.delete()
+
+            self.assertGreater(
+                PoliticalFigure.all_objects.get(pk=deleted_figure.pk).updated_at,
+                updated_at,
+            )
+            self.assertIsNotNone(
+                PoliticalParty.all_objects.get(pk=political_party.pk).deleted
+            )
+            compared.append(self.get_rows(political_figures))
+
+        self.assertEqual(compared[0], compared[1])
+        # deleted figure keeps its addresses, party of every figure is set to null
+        self.assertEqual(
+            compared[1][0], (True, False, False, [(True, False), (True, False)])
+        )
+        self.assertEqual(
+            compared[1][1], (False, False, False, [(False, False), (False, False)])
+        )
+
+    def test_bulk_delete_with_constant_query_count(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        political_party = create_political_party()
+        query_counts = []
+        for count in (2, 20):
+            political_figures = [
+                create_political_figure(political_party) for _ in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    "/api/v1/political-figures/bulk-delete/",
+                    {
+                        "ids": [
+                            political_figure.pk
+                            for political_figure in political_figures
+                        ]
+                    },
+                    content_type="application/json",
+                )
+            self.assertEqual(response.status_code, 204)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertFalse(PoliticalFigure.objects.exists())
+        self.assertEqual(Address.objects.count(), 0)
+        self.assertEqual(Address.all_objects.count(), 44)
+
+        response = self.client.post(
+            "/api/v1/political-figures/bulk-delete/",
+            {"ids": [political_figures[0].pk]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_party_delete_with_constant_query_count(self):
+        from django.test.utils import CaptureQueriesContext
+
+        from utils.core.full_text_search import POLITICAL_FIGURE_DOCUMENT, search
+        from utils.political_party.core import PoliticalPartyUtil
+
+        query_counts = []
+        for count in (2, 20):
+            political_party = create_political_party(name="Ujyalo Party")
+            for _ in range(count):
+                create_political_figure(political_party)
+            self.assertEqual(
+                len(search(POLITICAL_FIGURE_DOCUMENT, "Ujyalo", limit=50)), count
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                PoliticalPartyUtil.delete_political_party(political_party)
+            query_counts.append(len(queries))
+
+            # party name is not a part of their search documents anymore
+            self.assertEqual(search(POLITICAL_FIGURE_DOCUMENT, "Ujyalo", limit=50), [])
+            self.assertFalse(PoliticalFigure.objects.exclude(political_party=None))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+class SearchKeyMigrationTests(TransactionTestCase):
+    """
+    search_key is set on rows that already exist when the migrations adding it run
+    """
+
+    before = [
+        ("political_party", "0005_politicalparty_pp_updated_at_deleted_idx"),
+        ("political_figure", "0004_full_text_search"),
+    ]
+    after = [
+        ("political_party", "0006_politicalparty_search_key"),
+        ("political_figure", "0005_politicalfigure_search_key"),
+    ]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def create_rows(self, apps):
+        Party = apps.get_model("political_party", "PoliticalParty")
+        Figure = apps.get_model("political_figure", "PoliticalFigure")
+        party = Party.objects.create(
+            name="Nepali Congress",
+            slug="nepali-congress",
+            abbreviation="NC",
+            founded_date=datetime.date(1950, 1, 1),
+            hq_location="Kathmandu",
+        )
+        for i, full_name in enumerate(["Sher Bahadur Deuba", "शेर बहादुर"]):
+            Figure.objects.create(
+                full_name=full_name, slug=f"figure-{i}", political_party=party
+            )
+
+    def assert_search_keys(self, apps):
+        Party = apps.get_model("political_party", "PoliticalParty")
+        Figure = apps.get_model("political_figure", "PoliticalFigure")
+        self.assertEqual(
+            list(Party.objects.values_list("search_key", flat=True)),
+            ["nepalicongres"],
+        )
+        self.assertEqual(
+            list(Figure.objects.order_by("slug").values_list("search_key", flat=True)),
+            ["serbahadurdeub", "serbahadur"],
+        )
+
+    def test_existing_rows(self):
+        self.create_rows(self.migrate(self.before))
+        self.assert_search_keys(self.migrate(self.after))
@@ -6,26 +6,61 @@ urlpatterns = [
     path(
         "create/",
         views.CreatePoliticalFigureAPI.as_view(),
-        name="create-political-party",
+        name="create-political-figure",
+    ),
+    path(
+        "bulk-create/",
+        views.BulkCreatePoliticalFigureAPI.as_view(),
+        name="bulk-create-political-figure",
     ),
     path(
         "get/list/",
         views.GetPoliticalFigureListAPI.as_view(),
-        name="get-political-party-list",
+        name="get-political-figure-list",
+    ),
+    path(
+        "export/",
+        views.ExportPoliticalFigureAPI.as_view(),
+        name="export-political-figure",
+    ),
+    path(
+        "search/",
+        views.SearchPoliticalFigureAPI.as_view(),
+        name="search-political-figure",
+    ),
+    path(
+        "fuzzy-search/",
+        views.FuzzySearchPoliticalFigureAPI.as_view(),
+        name="fuzzy-search-political-figure",
+    ),
+    path(
+        "autocomplete/",
+        views.AutocompletePoliticalFigureAPI.as_view(),
+        name="autocomplete-political-figure",
     ),
     path(
         "get/detail/<int:pk>/",
         views.GetPoliticalFigureDetailAPI.as_view(),
-        name="get-political-party-detail",
+        name="get-political-figure-detail",
     ),
     path(
         "update/<int:pk>/",
         views.UpdatePoliticalFigureAPI.as_view(),
-        name="update-political-party",
+        name="update-political-figure",
+    ),
+    path(
+        "bulk-update/",
+        views.BulkUpdatePoliticalFigureAPI.as_view(),
+        name="bulk-update-political-figure",
     ),
     path(
         "delete/<int:pk>/",
         views.DeletePoliticalFigureAPI.as_view(),
-        name="delete-political-party",
+        name="delete-political-figure",
+    ),
+    path(
+        "bulk-delete/",
+        views.BulkDeletePoliticalFigureAPI.as_view(),
+        name="bulk-delete-political-figure",
     ),
 ]
@@ -1,12 +1,46 @@
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from apps.core.serializers import GetAddressSerializer
 from apps.political_figure.models import PoliticalFigure
+from apps.political_party.models import PoliticalParty
 from utils.core.base_views import PublicAPIView
-from utils.core.response_wrappers import NoContentResponse, OKResponse
+from utils.core.cache import cache_response
+from utils.core.compiled_serializers import CompiledSerializer
+from utils.core.export import get_export_response, get_export_schema_parameters
+from utils.core.facets import (
+    get_facet_filters,
+    get_facet_schema_parameters,
+    get_requested_facets,
+)
+from utils.core.full_text_search import get_search_query, get_search_schema_parameters
+from utils.core.json_fragments import accepts_json
+from utils.core.metrics import measure_serialization
+from utils.core.fuzzy_search import (
+    get_fuzzy_query_and_limit,
+    get_fuzzy_schema_parameters,
+)
+from utils.core.pagination import KeysetPagination, PageNumberPagination
+from utils.core.streaming import (
+    STREAM_CHUNK_SIZE,
+    get_stream_schema_parameters,
+    should_stream,
+)
+from utils.core.sparse_fieldsets import (
+    SparseFieldsetSerializerMixin,
+    get_requested_fields,
+    get_sparse_fieldset_schema_parameters,
+)
+from utils.core.response_wrappers import (
+    FastOKResponse,
+    NoContentResponse,
+    OKResponse,
+    PreRenderedOKResponse,
+    StreamingOKResponse,
+)
 from utils.political_figure.core import PoliticalFigureUtil
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 
 
 class GetPoliticalFigureDetailAPI(PublicAPIView):
@@ -14,9 +48,16 @@ class GetPoliticalFigureDetailAPI(PublicAPIView):
     Get political figure detail
     """
 
-    class OutputSerializer(serializers.ModelSerializer):
-        political_party_name = serializers.CharField(source="political_party.name")
-        political_party_slug = serializers.CharField(source="political_party.slug")
+    query_budget = 2
+
+    class OutputSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+        # null for figures without a party (for example of a deleted party)
+        political_party_name = serializers.CharField(
+            source="political_party.name", allow_null=True
+        )
+        political_party_slug = serializers.CharField(
+            source="political_party.slug", allow_null=True
+        )
 
         home_address = GetAddressSerializer()
         current_address = GetAddressSerializer()
@@ -47,32 +88,264 @@ class GetPoliticalFigureDetailAPI(PublicAPIView):
             ref_name = "PoliticalFigureDetailSerializer"
 
     output_serializer = OutputSerializer
+    compiled_output_serializer = CompiledSerializer(OutputSerializer)
+
+    def get_validators(self, request, pk):
+        return PoliticalFigureUtil.get_detail_validators(pk)
 
-    @extend_schema(responses=output_serializer)
+    @extend_schema(
+        responses=output_serializer,
+        parameters=get_sparse_fieldset_schema_parameters(output_serializer),
+    )
+    # output contains political party name and slug
+    @cache_response(PoliticalFigure, PoliticalParty)
     def get(self, request, pk):
-        # prefetch addresses
-        qs = PoliticalFigure.objects.all().prefetch_related(
-            "home_address", "current_address"
-        )
+        fields = get_requested_fields(request, self.output_serializer)
+        qs = PoliticalFigureUtil.get_read_queryset(fields=fields)
+
+        if accepts_json(request):
+            data = self.compiled_output_serializer.serialize_one(
+                qs.filter(pk=pk), fields=fields
+            )
+            if data is None:
+                raise Http404
+            return FastOKResponse(data=data)
+
         political_figure = get_object_or_404(qs, pk=pk)
-        serializer = self.output_serializer(instance=political_figure)
-        return OKResponse(data=serializer.data)
+        serializer = self.output_serializer(instance=political_figure, fields=fields)
+        with measure_serialization():
+            data = serializer.data
+        return OKResponse(data=data)
 
 
 class GetPoliticalFigureListAPI(PublicAPIView):
     """
-    Get political figure list
+    Get political figure list.
+    Filter by party, gender, is_active and home/current address, and send ?facets= to get the count of each value of those filters.
+    """
+
+    query_budget = 7
+
+    output_serializer = GetPoliticalFigureDetailAPI.OutputSerializer
+    compiled_output_serializer = GetPoliticalFigureDetailAPI.compiled_output_serializer
+    pagination_class = KeysetPagination
+    # stream without ?stream=1, see utils/core/streaming.py
+    stream_by_default = False
+
+    def get_validators(self, request):
+        return PoliticalFigureUtil.get_list_validators()
+
+    @extend_schema(
+        responses=output_serializer(many=True),
+        parameters=pagination_class.get_schema_parameters()
+        + get_sparse_fieldset_schema_parameters(output_serializer)
+        + get_facet_schema_parameters(PoliticalFigureUtil.facets)
+        + get_stream_schema_parameters(),
+    )
+    @cache_response(PoliticalFigure, PoliticalParty)
+    def get(self, request):
+        fields = get_requested_fields(request, self.output_serializer)
+        filters = get_facet_filters(request, PoliticalFigureUtil.facets)
+        requested_facets = get_requested_facets(request, PoliticalFigureUtil.facets)
+
+        facets = None
+        if requested_facets:
+            facets = PoliticalFigureUtil.get_facet_counts(filters, requested_facets)
+
+        if accepts_json(request) and should_stream(request, self.stream_by_default):
+            # every row matching the filters, not paginated
+            political_figures = PoliticalFigureUtil.filter_political_figures(
+                PoliticalFigureUtil.get_read_queryset(), filters
+            ).order_by(*self.pagination_class.ordering)
+            return StreamingOKResponse(
+                data_chunks=self.compiled_output_serializer.serialize_chunks(
+                    political_figures, fields=fields, chunk_size=STREAM_CHUNK_SIZE
+                ),
+                facets=facets,
+            )
+
+        paginator = self.pagination_class()
+
+        if fields is None and accepts_json(request):
+            # only the versions of the page are fetched, and only the rows whose output has changed since it was last rendered are loaded and serialized
+            political_figures = PoliticalFigureUtil.filter_political_figures(
+                PoliticalFigureUtil.get_version_queryset(), filters
+            )
+            page = paginator.paginate_queryset(political_figures, request)
+            data_fragments = PoliticalFigureUtil.fragment_cache.get_many(
+                page, render_missing=self.serialize_political_figures
+            )
+            return PreRenderedOKResponse(
+                data_fragments=data_fragments,
+                pagination=paginator.get_pagination_data(),
+                facets=facets,
+            )
+
+        political_figures = PoliticalFigureUtil.filter_political_figures(
+            PoliticalFigureUtil.get_read_queryset(fields=fields), filters
+        )
+
+        if accepts_json(request):
+            # only some fields: not worth caching, but still read as plain rows instead of model instances
+            leading = paginator.cursor_fields
+            rows = self.compiled_output_serializer.get_rows(
+                political_figures, fields=fields, leading=leading
+            )
+            page = paginator.paginate_queryset(rows, request)
+            return FastOKResponse(
+                data=self.compiled_output_serializer.serialize_rows(
+                    page, fields=fields, leading=leading
+                ),
+                pagination=paginator.get_pagination_data(),
+                facets=facets,
+            )
+
+        page = paginator.paginate_queryset(political_figures, request)
+        serializer = self.output_serializer(instance=page, many=True, fields=fields)
+        with measure_serialization():
+            data = serializer.data
+
+        return OKResponse(
+            data=data,
+            pagination=paginator.get_pagination_data(),
+            facets=facets,
+        )
+
+    def serialize_political_figures(self, political_figures):
+        data = self.compiled_output_serializer.serialize(
+            PoliticalFigureUtil.get_read_queryset().filter(
+                pk__in=[political_figure.pk for political_figure in political_figures]
+            )
+        )
+        rows = {item["id"]: item for item in data}
+        return [rows[political_figure.pk] for political_figure in political_figures]
+
+
+class SearchPoliticalFigureAPI(PublicAPIView):
+    """
+    Full text search political figures by full name, biography, party name and abbreviation, best match first
+    """
+
+    query_budget = 2
+
+    output_serializer = GetPoliticalFigureDetailAPI.OutputSerializer
+    pagination_class = PageNumberPagination
+
+    @extend_schema(
+        responses=output_serializer(many=True),
+        parameters=get_search_schema_parameters()
+        + pagination_class.get_schema_parameters()
+        + get_sparse_fieldset_schema_parameters(output_serializer),
+    )
+    @cache_response(PoliticalFigure, PoliticalParty)
+    def get(self, request):
+        query = get_search_query(request)
+        fields = get_requested_fields(request, self.output_serializer)
+        paginator = self.pagination_class()
+        offset, limit = paginator.get_offset_and_limit(request)
+
+        political_figures = PoliticalFigureUtil.search_political_figures(
+            query, limit=limit, offset=offset, fields=fields
+        )
+        page = paginator.paginate_rows(political_figures)
+
+        serializer = self.output_serializer(instance=page, many=True, fields=fields)
+        with measure_serialization():
+            data = serializer.data
+        return OKResponse(data=data, pagination=paginator.get_pagination_data())
+
+
+class FuzzySearchPoliticalFigureAPI(PublicAPIView):
+    """
+    Typo tolerant look up of political figures by full name, in romanized Nepali or Devanagari, most similar first
     """
 
+    query_budget = 2
+
     output_serializer = GetPoliticalFigureDetailAPI.OutputSerializer
 
-    @extend_schema(responses=output_serializer(many=True))
+    @extend_schema(
+        responses=output_serializer(many=True),
+        parameters=get_fuzzy_schema_parameters()
+        + get_sparse_fieldset_schema_parameters(output_serializer),
+    )
+    @cache_response(PoliticalFigure, PoliticalParty)
     def get(self, request):
-        political_figures = PoliticalFigure.objects.all().prefetch_related(
-            "home_address", "current_address"
+        query, limit = get_fuzzy_query_and_limit(request)
+        fields = get_requested_fields(request, self.output_serializer)
+
+        political_figures = PoliticalFigureUtil.fuzzy_search_political_figures(
+            query, limit=limit, fields=fields
+        )
+
+        serializer = self.output_serializer(
+            instance=political_figures, many=True, fields=fields
         )
-        serializer = self.output_serializer(instance=political_figures, many=True)
-        return OKResponse(data=serializer.data)
+        # similarity is not a field of the serializer, so that it can be reused as is
+        with measure_serialization():
+            data = [
+                {**item, "similarity": round(political_figure.similarity, 4)}
+                for item, political_figure in zip(serializer.data, political_figures)
+            ]
+        return OKResponse(data=data)
+
+
+class AutocompletePoliticalFigureAPI(PublicAPIView):
+    """
+    Search as you type political figures by name, slug or party, served from memory
+    """
+
+    # when the index is refreshed: database watermark of figures and parties, then changed parties and figures
+    query_budget = 4
+
+    limit = 10
+
+    class OutputSerializer(serializers.Serializer):
+        id = serializers.IntegerField()
+        slug = serializers.CharField()
+        full_name = serializers.CharField()
+        party = serializers.CharField(allow_null=True)
+
+        class Meta:
+            ref_name = "PoliticalFigureAutocompleteSerializer"
+
+    output_serializer = OutputSerializer
+
+    @extend_schema(
+        responses=output_serializer(many=True),
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type=str,
+                required=False,
+                description="What the user has typed so far, in romanized Nepali or Devanagari",
+            )
+        ],
+    )
+    def get(self, request):
+        # NOTE: not wrapped with cache_response, the index is faster than the cache
+        hits = PoliticalFigureUtil.autocomplete_political_figures(
+            request.query_params.get("q", ""), limit=self.limit
+        )
+        serializer = self.output_serializer(hits, many=True)
+        with measure_serialization():
+            data = serializer.data
+        return OKResponse(data=data)
+
+
+class ExportPoliticalFigureAPI(PublicAPIView):
+    """
+    Download every political figure, with addresses and party flattened into columns, as NDJSON, CSV or gzipped columnar JSON (see utils/core/export.py)
+    """
+
+    query_budget = 2
+
+    def get_validators(self, request):
+        return PoliticalFigureUtil.get_list_validators()
+
+    @extend_schema(responses=bytes, parameters=get_export_schema_parameters())
+    def get(self, request):
+        return get_export_response(PoliticalFigureUtil.export_dataset, request)
 
 
 class CreatePoliticalFigureAPI(PublicAPIView):
@@ -81,6 +354,8 @@ class CreatePoliticalFigureAPI(PublicAPIView):
     For creating via drf-spectacular form, send `null` wherever a file is expected, and empty string wherever a string `""` is expected and value is optional
     """
 
+    query_budget = 7
+
     # NOTE: we need the multipart parser and form parser for file upload
     # But also allow JSONParser so that user can create using drf-spectacular's swagger ui.
     parser_classes = [JSONParser, MultiPartParser, FormParser]
@@ -97,11 +372,100 @@ class CreatePoliticalFigureAPI(PublicAPIView):
         political_figure = PoliticalFigureUtil.create_political_figure(data)
 
         # prepare output
-        output_data = self.output_serializer(political_figure).data
+        with measure_serialization():
+            output_data = self.output_serializer(political_figure).data
 
         return OKResponse(data=output_data)
 
 
+class BulkCreatePoliticalFigureAPI(PublicAPIView):
+    """
+    Create many political figures at once, for example an election's candidate list. Items are the same as the create API's, without photos.
+    If any item is invalid nothing is created, unless `allow_partial` is true, in which case valid items are created and the errors of the others are returned.
+    """
+
+    query_budget = 10
+
+    parser_classes = [JSONParser]
+
+    output_serializer = GetPoliticalFigureDetailAPI.OutputSerializer
+    compiled_output_serializer = GetPoliticalFigureDetailAPI.compiled_output_serializer
+
+    class ResponseSerializer(serializers.Serializer):
+        created = GetPoliticalFigureDetailAPI.OutputSerializer(many=True)
+        # [{"index": index of the item, "errors": {field: errors}}]
+        errors = serializers.ListField(child=serializers.DictField())
+
+        class Meta:
+            ref_name = "PoliticalFigureBulkCreateResponseSerializer"
+
+    @extend_schema(
+        request=PoliticalFigureUtil.bulk_create_serializer,
+        responses=ResponseSerializer,
+    )
+    def post(self, request):
+        serializer = PoliticalFigureUtil.bulk_create_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        political_figures, errors = PoliticalFigureUtil.bulk_create_political_figures(
+            serializer.validated_data["items"],
+            allow_partial=serializer.validated_data["allow_partial"],
+        )
+
+        created = self.compiled_output_serializer.serialize(
+            PoliticalFigureUtil.get_read_queryset()
+            .filter(
+                pk__in=[political_figure.pk for political_figure in political_figures]
+            )
+            .order_by("id")
+        )
+        return OKResponse(data={"created": created, "errors": errors})
+
+
+class BulkUpdatePoliticalFigureAPI(PublicAPIView):
+    """
+    Partially update many political figures at once, for example to set `is_active` or `political_party` of every figure of a merged party. Each item is {"id", "changes"} where changes are the same as the update API's, without photos.
+    If any item is invalid nothing is updated, unless `allow_partial` is true, in which case valid items are updated and the errors of the others are returned.
+    """
+
+    # NOTE: one UPDATE for each set of changed columns, so the queries depend on the request, N+1 is still checked
+    query_budget = None
+
+    parser_classes = [JSONParser]
+
+    compiled_output_serializer = GetPoliticalFigureDetailAPI.compiled_output_serializer
+
+    class ResponseSerializer(serializers.Serializer):
+        updated = GetPoliticalFigureDetailAPI.OutputSerializer(many=True)
+        # [{"index": index of the item, "errors": {field: errors}}]
+        errors = serializers.ListField(child=serializers.DictField())
+
+        class Meta:
+            ref_name = "PoliticalFigureBulkUpdateResponseSerializer"
+
+    @extend_schema(
+        request=PoliticalFigureUtil.bulk_update_serializer,
+        responses=ResponseSerializer,
+    )
+    def patch(self, request):
+        serializer = PoliticalFigureUtil.bulk_update_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        political_figures, errors = PoliticalFigureUtil.bulk_update_political_figures(
+            serializer.validated_data["items"],
+            allow_partial=serializer.validated_data["allow_partial"],
+        )
+
+        updated = self.compiled_output_serializer.serialize(
+            PoliticalFigureUtil.get_read_queryset()
+            .filter(
+                pk__in=[political_figure.pk for political_figure in political_figures]
+            )
+            .order_by("id")
+        )
+        return OKResponse(data={"updated": updated, "errors": errors})
+
+
 class UpdatePoliticalFigureAPI(PublicAPIView):
     """
     Update political figure.
@@ -109,6 +473,8 @@ class UpdatePoliticalFigureAPI(PublicAPIView):
     Don't send the fields that you don't want to update cause this is a patch update.
     """
 
+    query_budget = 6
+
     # NOTE: we need the multipart parser and form parser for file upload
     # But also allow JSONParser so that user can create using drf-spectacular's swagger ui.
     parser_classes = [JSONParser, MultiPartParser, FormParser]
@@ -119,7 +485,9 @@ class UpdatePoliticalFigureAPI(PublicAPIView):
         request=PoliticalFigureUtil.update_serializer, responses=output_serializer
     )
     def patch(self, request, pk):
-        political_figure = get_object_or_404(PoliticalFigure, pk=pk)
+        # addresses are needed for the update, so join them instead of lazily fetching them one by one
+        qs = PoliticalFigure.objects.select_related("home_address", "current_address")
+        political_figure = get_object_or_404(qs, pk=pk)
 
         data = request.data
 
@@ -127,15 +495,20 @@ class UpdatePoliticalFigureAPI(PublicAPIView):
 
         # photo field becomes null somehow only on the returned object from PoliticalFigureUtil.update_political_figure (but is set correctly in the database), so instead just fetch again to provide correct output
 
-        updated_political_figure = (
-            PoliticalFigure.objects.all()
-            .prefetch_related("home_address", "current_address")
-            .get(pk=political_figure.pk)
+        updated_political_figure = PoliticalFigureUtil.get_read_queryset().get(
+            pk=political_figure.pk
         )
 
         # prepare output data
         serializer = self.output_serializer(instance=updated_political_figure)
-        return OKResponse(data=serializer.data)
+        with measure_serialization():
+            data = serializer.data
+        # list views won't have to render it again
+        PoliticalFigureUtil.fragment_cache.set(
+            PoliticalFigureUtil.get_version_queryset().get(pk=political_figure.pk),
+            data,
+        )
+        return OKResponse(data=data)
 
 
 class DeletePoliticalFigureAPI(PublicAPIView):
@@ -143,8 +516,31 @@ class DeletePoliticalFigureAPI(PublicAPIView):
     Delete political figure
     """
 
+    query_budget = 7
+
     @extend_schema(responses=None)
     def delete(self, request, pk):
-        political_figure = get_object_or_404(PoliticalFigure, pk=pk)
+        qs = PoliticalFigure.objects.select_related("home_address", "current_address")
+        political_figure = get_object_or_404(qs, pk=pk)
         PoliticalFigureUtil.delete_political_figure(political_figure=political_figure)
         return NoContentResponse()
+
+
+class BulkDeletePoliticalFigureAPI(PublicAPIView):
+    """
+    Delete many political figures (and their addresses) at once, with a fixed number of queries.
+    If any of them does not exist nothing is deleted.
+    """
+
+    query_budget = 7
+
+    parser_classes = [JSONParser]
+
+    @extend_schema(request=PoliticalFigureUtil.bulk_delete_serializer, responses=None)
+    def post(self, request):
+        serializer = PoliticalFigureUtil.bulk_delete_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        PoliticalFigureUtil.bulk_delete_political_figures(
+            serializer.validated_data["ids"]
+        )
+        return NoContentResponse()
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("political_party", "0004_alter_politicalparty_uuid"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="politicalparty",
+            index=models.Index(
+                fields=["updated_at", "deleted"], name="pp_updated_at_deleted_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+from utils.core.fuzzy_search import (
+    create_trigram_index,
+    drop_trigram_index,
+    set_search_keys,
+)
+
+
+def backfill_search_keys(apps, schema_editor):
+    Model = apps.get_model("political_party", "politicalparty")
+    set_search_keys(Model._base_manager.all(), "name")
+
+
+def create_index(apps, schema_editor):
+    create_trigram_index(schema_editor, "political_party")
+
+
+def drop_index(apps, schema_editor):
+    drop_trigram_index(schema_editor, "political_party")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("political_party", "0005_politicalparty_pp_updated_at_deleted_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="politicalparty",
+            name="search_key",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
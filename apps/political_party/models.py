@@ -1,7 +1,10 @@
+import functools
+
 from django.db import models
 from django.forms import ValidationError
 
 from utils.core.base_models import BaseModel
+from utils.core.fuzzy_search import SEARCH_KEY_MAX_LENGTH, normalize_name
 
 # Create your models here.
 
@@ -11,6 +14,10 @@ class PoliticalParty(BaseModel):
     description = models.TextField(blank=True)
     # we can keep slugfield as unique=True since we can just add random suffix if a soft deleted party has same slug
     slug = models.SlugField(unique=True)
+    # normalized name for typo tolerant lookup, set in save(), see utils/core/fuzzy_search.py
+    search_key = models.CharField(
+        max_length=SEARCH_KEY_MAX_LENGTH, blank=True, editable=False
+    )
     abbreviation = models.CharField(max_length=50)
     founded_date = models.DateField()
     dissolved_date = models.DateField(
@@ -21,20 +28,77 @@ class PoliticalParty(BaseModel):
     website = models.URLField(blank=True)
     logo_url = models.URLField(blank=True)
 
+    # fields in the full text search documents of the party, and of its figures, see save()
+    PARTY_DOCUMENT_FIELDS = {"name", "abbreviation", "ideology", "description"}
+    FIGURE_DOCUMENT_FIELDS = {"name", "abbreviation"}
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # values as loaded, to only refresh search documents when they change, see save()
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_changed_fields(self, fields):
+        """
+        Fields (of `fields`) whose value differs from the one loaded from the database. Every field of a new instance has changed.
+        """
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return set(fields)
+        # deferred fields that were never loaded nor set haven't changed
+        return {
+            field
+            for field in fields
+            if field in self.__dict__
+            and (field not in loaded or loaded[field] != self.__dict__[field])
+        }
+
     def save(self, *args, **kwargs):
-        from utils.core.general import check_and_generate_slug
+        from utils.core.full_text_search import (
+            POLITICAL_FIGURE_DOCUMENT,
+            POLITICAL_PARTY_DOCUMENT,
+            refresh_search_documents,
+        )
+        from utils.core.slugs import get_base_slug, save_with_unique_slug
+
+        self.search_key = normalize_name(self.name)
 
-        # set slug if it is not set
-        if not self.id:
-            # fail_silently=False does not allow the slug field to be set if it already exists
-            self.slug = check_and_generate_slug(
-                self, "name", "slug", fail_silently=False
+        adding = self._state.adding
+        changed = self.get_changed_fields(
+            self.PARTY_DOCUMENT_FIELDS | self.FIGURE_DOCUMENT_FIELDS
+        )
+        if kwargs.get("update_fields") is not None:
+            changed &= set(kwargs["update_fields"])
+
+        # set slug if it is not set, see utils/core/slugs.py
+        if not self.id and not self.slug:
+            result = save_with_unique_slug(
+                self,
+                get_base_slug(self.name, PoliticalParty),
+                functools.partial(super().save, *args, **kwargs),
+            )
+        else:
+            result = super().save(*args, **kwargs)
+
+        # keep full text search documents in sync, see utils/core/full_text_search.py
+        # NOTE: only when the text in them changed, deleted rows are filtered out when searching
+        if changed & self.PARTY_DOCUMENT_FIELDS:
+            refresh_search_documents(POLITICAL_PARTY_DOCUMENT, ids=[self.pk])
+        # documents of its figures contain party name and abbreviation as well, a new party has no figures yet
+        if not adding and changed & self.FIGURE_DOCUMENT_FIELDS:
+            refresh_search_documents(
+                POLITICAL_FIGURE_DOCUMENT, ids=[self.pk], column="political_party_id"
             )
+        self._loaded_values = {
+            **getattr(self, "_loaded_values", {}),
+            **{field: getattr(self, field) for field in changed},
+        }
 
-        return super().save(*args, **kwargs)
+        return result
 
     class Meta:
         db_table = "political_party"
@@ -51,3 +115,10 @@ class PoliticalParty(BaseModel):
                 name="founded_date_before_dissolved_date_or_active",
             )
         ]
+        indexes = [
+            # conditional GET validators (max(updated_at) and count of non deleted rows), see utils/core/general.py:get_model_validators
+            models.Index(
+                fields=["updated_at", "deleted"],
+                name="pp_updated_at_deleted_idx",
+            ),
+        ]
@@ -1,3 +1,222 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
+from apps.political_party.models import PoliticalParty
+from utils.core.full_text_search import (
+    POLITICAL_FIGURE_DOCUMENT,
+    POLITICAL_PARTY_DOCUMENT,
+)
+from utils.core.fuzzy_search import normalize_name
+from utils.political_party.core import PoliticalPartyUtil
+
 # Create your tests here.
+
+
+class PoliticalPartyResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.political_party = PoliticalParty.objects.create(
+            name="Test Party",
+            description="Test description",
+            abbreviation="TP",
+            founded_date=datetime.date(1990, 1, 1),
+            ideology="Test ideology",
+            hq_location="Kathmandu",
+            logo_url="https://example.com/logo.png",
+        )
+        self.url = "/api/v1/political-parties/get/list/"
+
+    def test_cached_response_is_served_without_querying_rows(self):
+        self.client.get(self.url)
+
+        # only the conditional GET validators are queried
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json()["data"][0]["name"], "Test Party")
+
+    def test_write_through_util_invalidates_cached_response(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PoliticalPartyUtil.update_political_party(
+                self.political_party, {"name": "Renamed Party"}
+            )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()["data"][0]["name"], "Renamed Party")
+
+    def test_cached_json_is_not_served_to_other_renderers(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json; indent=4")
+        self.assertIn('\n    "data"', response.content.decode())
+
+        response = self.client.get(self.url, HTTP_ACCEPT="text/html")
+        self.assertTrue(response["Content-Type"].startswith("text/html"))
+
+        # and the other way around
+        cache.clear()
+        self.client.get(self.url, HTTP_ACCEPT="application/json; indent=4")
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json()["data"][0]["name"], "Test Party")
+        self.assertNotIn(b"\n", response.content)
+
+
+class PoliticalPartyConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.political_party = PoliticalParty.objects.create(
+            name="Test Party",
+            description="Test description",
+            abbreviation="TP",
+            founded_date=datetime.date(1990, 1, 1),
+            ideology="Test ideology",
+            hq_location="Kathmandu",
+            logo_url="https://example.com/logo.png",
+        )
+
+    def test_if_none_match_returns_304_until_modified(self):
+        url = f"/api/v1/political-parties/get/detail/{self.political_party.pk}/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        PoliticalPartyUtil.update_political_party(
+            self.political_party, {"name": "Renamed Party"}
+        )
+
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class PoliticalPartySlugTests(TestCase):
+    def create_political_party(self, name):
+        return PoliticalParty.objects.create(
+            name=name,
+            description="Test description",
+            abbreviation="JP",
+            founded_date=datetime.date(1990, 1, 1),
+            ideology="Test ideology",
+            hq_location="Kathmandu",
+            logo_url="https://example.com/logo.png",
+        )
+
+    def test_same_names_get_numeric_suffixes(self):
+        slugs = [self.create_political_party("Janata Party").slug for _ in range(3)]
+        self.assertEqual(slugs, ["janata-party", "janata-party-2", "janata-party-3"])
+
+    def test_slug_taken_concurrently_is_allocated_again(self):
+        self.create_political_party("Janata Party")
+        # first allocation doesn't see the existing row, as if it was created after the allocation
+        with mock.patch(
+            "utils.core.slugs.get_existing_slugs", side_effect=[set(), {"janata-party"}]
+        ):
+            political_party = self.create_political_party("Janata Party")
+        self.assertEqual(political_party.slug, "janata-party-2")
+
+
+class BulkUpdatePoliticalPartyTests(TestCase):
+    url = "/api/v1/political-parties/bulk-update/"
+
+    def test_bulk_update(self):
+        political_parties = [
+            PoliticalParty.objects.create(
+                name=f"Party {i}",
+                description="Test description",
+                abbreviation="P",
+                founded_date=datetime.date(1990, 1, 1),
+                ideology="Test ideology",
+                hq_location="Kathmandu",
+                logo_url="https://example.com/logo.png",
+            )
+            for i in range(3)
+        ]
+        items = [
+            {"id": political_parties[0].pk, "changes": {"name": "Merged Party"}},
+            {"id": political_parties[1].pk, "changes": {"hq_location": "Pokhara"}},
+            {"id": political_parties[2].pk, "changes": {"founded_date": "invalid"}},
+        ]
+
+        response = self.client.patch(
+            self.url, {"items": items}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch(
+            self.url,
+            {"items": items, "allow_partial": True},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(
+            [(party["name"], party["hq_location"]) for party in data["updated"]],
+            [("Merged Party", "Kathmandu"), ("Party 1", "Pokhara")],
+        )
+        self.assertEqual([error["index"] for error in data["errors"]], [2])
+        self.assertEqual(
+            PoliticalParty.objects.get(pk=political_parties[0].pk).search_key,
+            normalize_name("Merged Party"),
+        )
+
+
+class PoliticalPartySearchDocumentTests(TestCase):
+    def setUp(self):
+        self.political_party = PoliticalParty.objects.create(
+            name="Nepali Congress",
+            description="Test description",
+            abbreviation="NC",
+            founded_date=datetime.date(1947, 1, 25),
+            ideology="Social democracy",
+            hq_location="Kathmandu",
+        )
+        # loaded from the database, like in the update views
+        self.political_party = PoliticalParty.objects.get(pk=self.political_party.pk)
+
+    def save(self, **fields):
+        for field, value in fields.items():
+            setattr(self.political_party, field, value)
+        with mock.patch(
+            "utils.core.full_text_search.refresh_search_documents"
+        ) as refresh_search_documents:
+            self.political_party.save()
+        return [call.args[0] for call in refresh_search_documents.call_args_list]
+
+    def test_unrelated_change_refreshes_nothing(self):
+        self.assertEqual(self.save(website="https://example.com"), [])
+        # same value again
+        self.assertEqual(self.save(name="Nepali Congress"), [])
+
+    def test_name_change_refreshes_party_and_figure_documents(self):
+        self.assertEqual(
+            self.save(name="Nepali Congress Party"),
+            [POLITICAL_PARTY_DOCUMENT, POLITICAL_FIGURE_DOCUMENT],
+        )
+
+        # not again once saved
+        self.assertEqual(self.save(name="Nepali Congress Party"), [])
+
+    def test_description_change_only_refreshes_party_document(self):
+        self.assertEqual(
+            self.save(description="Another description"), [POLITICAL_PARTY_DOCUMENT]
+        )
+
+    def test_update_fields_limit_refreshes(self):
+        self.political_party.description = "Another description"
+        self.political_party.abbreviation = "NCP"
+        with mock.patch(
+            "utils.core.full_text_search.refresh_search_documents"
+        ) as refresh_search_documents:
+            self.political_party.save(update_fields=["description", "search_key"])
+        refresh_search_documents.assert_called_once_with(
+            POLITICAL_PARTY_DOCUMENT, ids=[self.political_party.pk]
+        )
@@ -13,6 +13,21 @@ urlpatterns = [
         views.GetPoliticalPartyListAPI.as_view(),
         name="get-political-party-list",
     ),
+    path(
+        "export/",
+        views.ExportPoliticalPartyAPI.as_view(),
+        name="export-political-party",
+    ),
+    path(
+        "search/",
+        views.SearchPoliticalPartyAPI.as_view(),
+        name="search-political-party",
+    ),
+    path(
+        "fuzzy-search/",
+        views.FuzzySearchPoliticalPartyAPI.as_view(),
+        name="fuzzy-search-political-party",
+    ),
     path(
         "get/detail/<int:pk>/",
         views.GetPoliticalPartyDetailAPI.as_view(),
@@ -23,6 +38,11 @@ urlpatterns = [
         views.UpdatePoliticalPartyAPI.as_view(),
         name="update-political-party",
     ),
+    path(
+        "bulk-update/",
+        views.BulkUpdatePoliticalPartyAPI.as_view(),
+        name="bulk-update-political-party",
+    ),
     path(
         "delete/<int:pk>/",
         views.DeletePoliticalPartyAPI.as_view(),
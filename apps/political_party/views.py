@@ -1,12 +1,39 @@
 from drf_spectacular.utils import extend_schema
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from apps.political_party.models import PoliticalParty
 from utils.core.base_views import PublicAPIView
-from utils.core.response_wrappers import OKResponse, NoContentResponse
+from utils.core.cache import cache_response
+from utils.core.compiled_serializers import CompiledSerializer
+from utils.core.export import get_export_response, get_export_schema_parameters
+from utils.core.full_text_search import get_search_query, get_search_schema_parameters
+from utils.core.fuzzy_search import (
+    get_fuzzy_query_and_limit,
+    get_fuzzy_schema_parameters,
+)
+from utils.core.pagination import PageNumberPagination
+from utils.core.json_fragments import accepts_json
+from utils.core.metrics import measure_serialization
+from utils.core.response_wrappers import (
+    FastOKResponse,
+    NoContentResponse,
+    OKResponse,
+    PreRenderedOKResponse,
+    StreamingOKResponse,
+)
+from utils.core.streaming import (
+    STREAM_CHUNK_SIZE,
+    get_stream_schema_parameters,
+    should_stream,
+)
+from utils.core.sparse_fieldsets import (
+    SparseFieldsetSerializerMixin,
+    get_requested_fields,
+    get_sparse_fieldset_schema_parameters,
+)
 from utils.political_party.core import PoliticalPartyUtil
 
-
 # ---------- DETAIL ----------
 
 
@@ -16,8 +43,9 @@ class GetPoliticalPartyDetailAPI(PublicAPIView):
     """
 
     extra_permissions = []
+    query_budget = 2
 
-    class OutputSerializer(serializers.ModelSerializer):
+    class OutputSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
         class Meta:
             model = PoliticalParty
             fields = [
@@ -36,12 +64,33 @@ class GetPoliticalPartyDetailAPI(PublicAPIView):
             ref_name = "PoliticalPartyDetailSerializer"
 
     output_serializer = OutputSerializer
+    compiled_output_serializer = CompiledSerializer(OutputSerializer)
+
+    def get_validators(self, request, pk):
+        return PoliticalPartyUtil.get_detail_validators(pk)
 
-    @extend_schema(responses=output_serializer)
+    @extend_schema(
+        responses=output_serializer,
+        parameters=get_sparse_fieldset_schema_parameters(output_serializer),
+    )
+    @cache_response(PoliticalParty)
     def get(self, request, pk):
-        party = get_object_or_404(PoliticalParty, pk=pk)
-        serializer = self.output_serializer(instance=party)
-        return OKResponse(data=serializer.data)
+        fields = get_requested_fields(request, self.output_serializer)
+        qs = PoliticalPartyUtil.get_read_queryset(fields=fields)
+
+        if accepts_json(request):
+            data = self.compiled_output_serializer.serialize_one(
+                qs.filter(pk=pk), fields=fields
+            )
+            if data is None:
+                raise Http404
+            return FastOKResponse(data=data)
+
+        party = get_object_or_404(qs, pk=pk)
+        serializer = self.output_serializer(instance=party, fields=fields)
+        with measure_serialization():
+            data = serializer.data
+        return OKResponse(data=data)
 
 
 # ---------- LIST ----------
@@ -51,14 +100,154 @@ class GetPoliticalPartyListAPI(PublicAPIView):
     """
 
     extra_permissions = []
+    query_budget = 3
 
     output_serializer = GetPoliticalPartyDetailAPI.OutputSerializer
+    compiled_output_serializer = GetPoliticalPartyDetailAPI.compiled_output_serializer
+    # stream without ?stream=1, see utils/core/streaming.py
+    stream_by_default = False
+
+    def get_validators(self, request):
+        return PoliticalPartyUtil.get_list_validators()
 
-    @extend_schema(responses=output_serializer(many=True))
+    @extend_schema(
+        responses=output_serializer(many=True),
+        parameters=get_sparse_fieldset_schema_parameters(output_serializer)
+        + get_stream_schema_parameters(),
+    )
+    @cache_response(PoliticalParty)
     def get(self, request):
-        parties = PoliticalParty.objects.all().order_by("-created_at")
-        serializer = self.output_serializer(parties, many=True)
-        return OKResponse(data=serializer.data)
+        fields = get_requested_fields(request, self.output_serializer)
+
+        if accepts_json(request) and should_stream(request, self.stream_by_default):
+            parties = PoliticalPartyUtil.get_read_queryset().order_by("-created_at")
+            return StreamingOKResponse(
+                data_chunks=self.compiled_output_serializer.serialize_chunks(
+                    parties, fields=fields, chunk_size=STREAM_CHUNK_SIZE
+                )
+            )
+
+        if fields is None and accepts_json(request):
+            # only the rows whose output has changed since it was last rendered are loaded and serialized
+            parties = PoliticalPartyUtil.get_version_queryset().order_by("-created_at")
+            data_fragments = PoliticalPartyUtil.fragment_cache.get_many(
+                list(parties), render_missing=self.serialize_parties
+            )
+            return PreRenderedOKResponse(data_fragments=data_fragments)
+
+        parties = PoliticalPartyUtil.get_read_queryset(fields=fields).order_by(
+            "-created_at"
+        )
+
+        if accepts_json(request):
+            return FastOKResponse(
+                data=self.compiled_output_serializer.serialize(parties, fields=fields)
+            )
+
+        serializer = self.output_serializer(parties, many=True, fields=fields)
+        with measure_serialization():
+            data = serializer.data
+        return OKResponse(data=data)
+
+    def serialize_parties(self, parties):
+        data = self.compiled_output_serializer.serialize(
+            PoliticalPartyUtil.get_read_queryset().filter(
+                pk__in=[party.pk for party in parties]
+            )
+        )
+        rows = {item["id"]: item for item in data}
+        return [rows[party.pk] for party in parties]
+
+
+# ---------- EXPORT ----------
+
+
+class ExportPoliticalPartyAPI(PublicAPIView):
+    """
+    Download every political party as NDJSON, CSV or gzipped columnar JSON (see utils/core/export.py)
+    """
+
+    extra_permissions = []
+    query_budget = 1
+
+    def get_validators(self, request):
+        return PoliticalPartyUtil.get_list_validators()
+
+    @extend_schema(responses=bytes, parameters=get_export_schema_parameters())
+    def get(self, request):
+        return get_export_response(PoliticalPartyUtil.export_dataset, request)
+
+
+# ---------- SEARCH ----------
+
+
+class SearchPoliticalPartyAPI(PublicAPIView):
+    """
+    Full text search political parties by name, abbreviation, ideology and description, best match first
+    """
+
+    extra_permissions = []
+    query_budget = 2
+
+    output_serializer = GetPoliticalPartyDetailAPI.OutputSerializer
+    pagination_class = PageNumberPagination
+
+    @extend_schema(
+        responses=output_serializer(many=True),
+        parameters=get_search_schema_parameters()
+        + pagination_class.get_schema_parameters()
+        + get_sparse_fieldset_schema_parameters(output_serializer),
+    )
+    @cache_response(PoliticalParty)
+    def get(self, request):
+        query = get_search_query(request)
+        fields = get_requested_fields(request, self.output_serializer)
+        paginator = self.pagination_class()
+        offset, limit = paginator.get_offset_and_limit(request)
+
+        parties = PoliticalPartyUtil.search_political_parties(
+            query, limit=limit, offset=offset, fields=fields
+        )
+        page = paginator.paginate_rows(parties)
+
+        serializer = self.output_serializer(page, many=True, fields=fields)
+        with measure_serialization():
+            data = serializer.data
+        return OKResponse(data=data, pagination=paginator.get_pagination_data())
+
+
+class FuzzySearchPoliticalPartyAPI(PublicAPIView):
+    """
+    Typo tolerant look up of political parties by name, in romanized Nepali or Devanagari, most similar first
+    """
+
+    extra_permissions = []
+    query_budget = 1
+
+    output_serializer = GetPoliticalPartyDetailAPI.OutputSerializer
+
+    @extend_schema(
+        responses=output_serializer(many=True),
+        parameters=get_fuzzy_schema_parameters()
+        + get_sparse_fieldset_schema_parameters(output_serializer),
+    )
+    @cache_response(PoliticalParty)
+    def get(self, request):
+        query, limit = get_fuzzy_query_and_limit(request)
+        fields = get_requested_fields(request, self.output_serializer)
+
+        parties = PoliticalPartyUtil.fuzzy_search_political_parties(
+            query, limit=limit, fields=fields
+        )
+
+        serializer = self.output_serializer(parties, many=True, fields=fields)
+        # similarity is not a field of the serializer, so that it can be reused as is
+        with measure_serialization():
+            data = [
+                {**item, "similarity": round(party.similarity, 4)}
+                for item, party in zip(serializer.data, parties)
+            ]
+        return OKResponse(data=data)
 
 
 # ---------- CREATE ----------
@@ -70,6 +259,7 @@ class CreatePoliticalPartyAPI(PublicAPIView):
     """
 
     extra_permissions = []
+    query_budget = 6
 
     output_serializer = GetPoliticalPartyDetailAPI.OutputSerializer
 
@@ -82,7 +272,8 @@ class CreatePoliticalPartyAPI(PublicAPIView):
         political_party = PoliticalPartyUtil.create_political_party(data)
 
         # prepare output data
-        output_data = self.output_serializer(political_party).data
+        with measure_serialization():
+            output_data = self.output_serializer(political_party).data
 
         return OKResponse(
             data=output_data, message="Political Party created successfully"
@@ -98,6 +289,7 @@ class UpdatePoliticalPartyAPI(PublicAPIView):
     """
 
     extra_permissions = []
+    query_budget = 7
 
     output_serializer = GetPoliticalPartyDetailAPI.OutputSerializer
 
@@ -115,11 +307,60 @@ class UpdatePoliticalPartyAPI(PublicAPIView):
         )
 
         # prepare output data
-        party = self.output_serializer(updated_political_party).data
+        with measure_serialization():
+            party = self.output_serializer(updated_political_party).data
+        # list views won't have to render it again
+        PoliticalPartyUtil.fragment_cache.set(
+            PoliticalPartyUtil.get_version_queryset().get(pk=pk), party
+        )
 
         return OKResponse(data=party, message="Political Party updated successfully")
 
 
+class BulkUpdatePoliticalPartyAPI(PublicAPIView):
+    """
+    Partially update many political parties at once, each item is {"id", "changes"} where changes are the same as the update API's.
+    If any item is invalid nothing is updated, unless `allow_partial` is true, in which case valid items are updated and the errors of the others are returned.
+    """
+
+    extra_permissions = []
+    # NOTE: one UPDATE for each set of changed columns, so the queries depend on the request, N+1 is still checked
+    query_budget = None
+
+    compiled_output_serializer = GetPoliticalPartyDetailAPI.compiled_output_serializer
+
+    class ResponseSerializer(serializers.Serializer):
+        updated = GetPoliticalPartyDetailAPI.OutputSerializer(many=True)
+        # [{"index": index of the item, "errors": {field: errors}}]
+        errors = serializers.ListField(child=serializers.DictField())
+
+        class Meta:
+            ref_name = "PoliticalPartyBulkUpdateResponseSerializer"
+
+    @extend_schema(
+        request=PoliticalPartyUtil.bulk_update_serializer,
+        responses=ResponseSerializer,
+    )
+    def patch(self, request):
+        serializer = PoliticalPartyUtil.bulk_update_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        political_parties, errors = PoliticalPartyUtil.bulk_update_political_parties(
+            serializer.validated_data["items"],
+            allow_partial=serializer.validated_data["allow_partial"],
+        )
+
+        updated = self.compiled_output_serializer.serialize(
+            PoliticalParty.objects.filter(
+                pk__in=[political_party.pk for political_party in political_parties]
+            ).order_by("id")
+        )
+        return OKResponse(
+            data={"updated": updated, "errors": errors},
+            message="Political Parties updated successfully",
+        )
+
+
 # ---------- DELETE ----------
 class DeletePoliticalPartyAPI(PublicAPIView):
     """
@@ -127,6 +368,8 @@ class DeletePoliticalPartyAPI(PublicAPIView):
     """
 
     extra_permissions = []
+    # search documents of its figures are refreshed with 2 statements on SQLite, 1 on Postgres
+    query_budget = 6
 
     @extend_schema(responses=None)
     def delete(self, request, pk):
@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 from datetime import timedelta
+from decouple import Csv
+from django.core.exceptions import ImproperlyConfigured
 from electionsys.utils import (
     check_all_okay,
     create_logs_dir_if_not_exists,
@@ -39,6 +42,9 @@ print("\033[92m---------DEBUG: {} is used---------\033[0m".format(DEBUG))
 
 config = get_config(debug=DEBUG)
 
+# running the test suite (manage.py test)
+TESTING = sys.argv[1:2] == ["test"]
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -87,6 +93,10 @@ INSTALLED_APPS = DJANGO_DEFAULT_APPS + LOCAL_APPS + THIRD_PARTY_APPS
 
 
 MIDDLEWARE = [
+    # first, so that they see (the time and queries of) every other middleware too
+    "utils.core.profiling.ProfilingMiddleware",
+    "utils.core.metrics.MetricsMiddleware",
+    "utils.core.query_budget.QueryBudgetMiddleware",
     # cors middleware
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -139,6 +149,83 @@ DATABASES = {
     },
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# NOTE: local memory cache is per process, so use redis (django.core.cache.backends.redis.RedisCache) in production to share invalidation between gunicorn workers, see RESPONSE_CACHE_ENABLED
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "DJANGO_CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config("DJANGO_CACHE_LOCATION", default=""),
+    }
+}
+
+# caches every process reads and writes, unlike locmem
+SHARED_CACHE_BACKENDS = [
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django.core.cache.backends.db.DatabaseCache",
+]
+CACHE_IS_SHARED = CACHES["default"]["BACKEND"] in SHARED_CACHE_BACKENDS
+
+# See utils/core/cache.py
+# NOTE: cached responses are invalidated by bumping generations in the cache, which other gunicorn workers only see in a shared cache, so it is off by default with a per process cache (except in tests, which run in one process)
+RESPONSE_CACHE_ENABLED = config(
+    "DJANGO_RESPONSE_CACHE_ENABLED", default=CACHE_IS_SHARED or TESTING, cast=bool
+)
+if RESPONSE_CACHE_ENABLED and not (CACHE_IS_SHARED or DEBUG or TESTING):
+    raise ImproperlyConfigured(
+        f"DJANGO_RESPONSE_CACHE_ENABLED needs a cache shared by every worker ({', '.join(SHARED_CACHE_BACKENDS)}), "
+        f"other workers would keep serving stale responses from {CACHES['default']['BACKEND']}. Set DJANGO_CACHE_BACKEND, or DJANGO_RESPONSE_CACHE_ENABLED=False"
+    )
+# cached responses are invalidated on write by bumping model generation, so this can be long
+RESPONSE_CACHE_TIMEOUT = config(
+    "DJANGO_RESPONSE_CACHE_TIMEOUT", default=60 * 60, cast=int
+)
+
+# pre-rendered JSON of each row for list responses, see utils/core/json_fragments.py
+# fragments are keyed by the rows' updated_at, so they never have to be invalidated and can live long
+JSON_FRAGMENT_CACHE_ENABLED = config(
+    "DJANGO_JSON_FRAGMENT_CACHE_ENABLED", default=True, cast=bool
+)
+JSON_FRAGMENT_CACHE_TIMEOUT = config(
+    "DJANGO_JSON_FRAGMENT_CACHE_TIMEOUT", default=60 * 60 * 24, cast=int
+)
+
+# query budgets of views and N+1 detection, see utils/core/query_budget.py
+QUERY_BUDGET_ENABLED = config(
+    "DJANGO_QUERY_BUDGET_ENABLED", default=DEBUG or TESTING, cast=bool
+)
+# fail the request (and so the test) instead of logging a warning
+QUERY_BUDGET_RAISE = config("DJANGO_QUERY_BUDGET_RAISE", default=TESTING, cast=bool)
+# the same query made this many times in a request is flagged as N+1
+QUERY_REPEAT_LIMIT = config("DJANGO_QUERY_REPEAT_LIMIT", default=3, cast=int)
+
+# on-demand profiling of requests, see utils/core/profiling.py
+PROFILING_ENABLED = config("DJANGO_PROFILING_ENABLED", default=False, cast=bool)
+# fraction of requests profiled without the signed header, 0 for none
+PROFILING_SAMPLE_RATE = config("DJANGO_PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+# profiler of sampled requests, "sampling" or "cprofile"
+PROFILING_PROFILER = config("DJANGO_PROFILING_PROFILER", default="sampling")
+# seconds a signed X-Profile header is valid for
+PROFILING_TOKEN_MAX_AGE = config(
+    "DJANGO_PROFILING_TOKEN_MAX_AGE", default=60 * 60, cast=int
+)
+PROFILING_DIR = os.path.join(BASE_DIR, "logs", "profiles")
+# older profiles are removed
+PROFILING_MAX_PROFILES = config("DJANGO_PROFILING_MAX_PROFILES", default=500, cast=int)
+
+# Prometheus metrics of requests on /metrics, see utils/core/metrics.py
+# off by default, enable where something scrapes them
+METRICS_ENABLED = config("DJANGO_METRICS_ENABLED", default=False, cast=bool)
+# only these addresses can read /metrics, and not through the reverse proxy
+METRICS_ALLOWED_IPS = config(
+    "DJANGO_METRICS_ALLOWED_IPS", default="127.0.0.1,::1", cast=Csv()
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
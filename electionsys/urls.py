@@ -25,6 +25,7 @@ from drf_spectacular.views import (
 from django.conf import settings
 from utils.core.constants import API_V1_PREFIX
 from django.conf.urls.static import static
+from utils.core.metrics import metrics_view
 
 urlpatterns = [
     # NOTE: We'll have our own dashboard in NextJS, so don't use django admin
@@ -36,6 +37,8 @@ urlpatterns = [
     path(f"{API_V1_PREFIX}/core/", include("apps.core.urls")),
     path(f"{API_V1_PREFIX}/political-figures/", include("apps.political_figure.urls")),
     path(f"{API_V1_PREFIX}/users/", include("apps.users.urls")),
+    # internal only, see utils/core/metrics.py
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 if settings.DEBUG:
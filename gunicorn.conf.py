@@ -0,0 +1,24 @@
+"""
+Gunicorn hooks, loaded from the directory gunicorn is started in.
+
+With PROMETHEUS_MULTIPROC_DIR set, workers write their metrics to files in that directory and /metrics aggregates them, see utils/core/metrics.py.
+"""
+
+import os
+import shutil
+
+
+def on_starting(server):
+    # files of a previous run would still be aggregated
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    # so that the requests in progress of a dead worker are not counted anymore
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
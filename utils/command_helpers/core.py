@@ -1,3 +1,4 @@
+import datetime
 import json
 import os
 import secrets
@@ -6,13 +7,11 @@ import traceback
 from typing import Dict, List
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from apps.core.models import Address
 from apps.political_figure.models import PoliticalFigure
 from apps.political_party.models import PoliticalParty
 from django.core.exceptions import ValidationError
-from django.db import transaction
-
-from utils.political_figure.core import PoliticalFigureUtil
-from utils.political_party.core import PoliticalPartyUtil
+from django.db import connection
 
 User = get_user_model()
 
@@ -41,28 +40,22 @@ def print_info(message, *args, **kwargs):
     print(f"{BLUE}{message}{RESET}", *args, **kwargs)
 
 
-@transaction.atomic
-def seed_data():
+def seed_data(file_path=None, batch_size=None, workers=1):
+    """
+    Imports the seed file (data/seed_data.json by default) batch by batch, see utils/command_helpers/importer.py
+    """
+    from utils.command_helpers.importer import DEFAULT_BATCH_SIZE, import_seed_file
+
     # Define the path to JSON data file
-    file_path = os.path.join(settings.BASE_DIR, "data", "seed_data.json")
+    file_path = file_path or os.path.join(settings.BASE_DIR, "data", "seed_data.json")
     print_info(f"Attempting to seed data from {file_path}...")
 
     try:
-        # Read the JSON file
-        with open(file_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-
-        # Process Users
-        users_data = data.get("users", [])
-
-        seed_users(users_data)
-
-        # Process Political Parties
-        parties_data = data.get("political_parties", [])
-
-        seed_political_parties(parties_data)
+        stats = import_seed_file(
+            file_path, batch_size=batch_size or DEFAULT_BATCH_SIZE, workers=workers
+        )
 
-        print_success("Database seeding complete!")
+        print_success(f"Database seeding complete! {stats.format()}")
 
     except FileNotFoundError:
         print_error(f"Error: The file {file_path} was not found.")
@@ -80,6 +73,10 @@ def _generate_password():
 
 
 def seed_users(users_data: List[Dict[str, str]]):
+    """
+    Creates the users that don't exist yet, returns (number of created users, number of existing users).
+    """
+    created_count = existing_count = 0
     for user_data in users_data:
         try:
             # Create a user instance
@@ -99,65 +96,68 @@ def seed_users(users_data: List[Dict[str, str]]):
                 generated_password = _generate_password()
                 user.set_password(generated_password)
                 user.save()
+                created_count += 1
                 print_success(f"Successfully created user: {user.username}")
                 print_warning(
                     f"Generated password for '{user.username}': {generated_password}"
                 )
             else:
+                existing_count += 1
                 print_warning(f"User already exists: {user.username}")
         except (KeyError, ValidationError) as e:
             print_error(f"Error processing user data: {user_data} - {e}")
 
-
-def seed_political_parties(parties_data: List[Dict[str, str | List[Dict[str, str]]]]):
-    print_info("Processing political parties...")
-    for party_data in parties_data:
-        try:
-
-            political_figures_data = party_data.pop("political_figures", None)
-
-            political_party = PoliticalParty.objects.filter(
-                name=party_data["name"],
-                abbreviation=party_data["abbreviation"],
-                founded_date=party_data["founded_date"],
-            ).first()
-
-            if not political_party:
-                # Political party does not exist, create it
-                political_party = PoliticalPartyUtil.create_political_party(party_data)
-                print_success(
-                    f"Successfully created political party: {political_party.name}"
-                )
-
-            else:
-                print_warning(f"Political party already exists: {political_party.name}")
-
-            if political_figures_data:
-                for political_figure_data in political_figures_data:
-                    political_figure_data["political_party"] = political_party.pk
-
-                    political_figure = PoliticalFigure.objects.filter(
-                        full_name=political_figure_data["full_name"],
-                        date_of_birth=political_figure_data["date_of_birth"],
-                        gender=political_figure_data["gender"],
-                        political_party=political_party,
-                    ).first()
-
-                    if not political_figure:
-                        PoliticalFigureUtil.create_political_figure(
-                            political_figure_data
-                        )
-                        print_success(
-                            f"Successfully created political figure: {political_figure_data['full_name']}"
-                        )
-                    else:
-                        print_warning(
-                            f"Political figure already exists: {political_figure_data['full_name']}"
-                        )
-            else:
-                print_warning(
-                    f"No political figure data provided for political party: {political_party.name}"
-                )
-
-        except (KeyError, ValidationError) as e:
-            print_error(f"Error processing political party data: {party_data} - {e}")
+    return created_count, existing_count
+
+
+def create_benchmark_political_figures(count, party_count=10, offset=0):
+    """
+    Bulk creates `count` political figures (with home and current addresses) spread over `party_count` new parties, for benchmark commands. Run it in a transaction that is rolled back.
+
+    :param offset: number of rows created by earlier calls in the same transaction, so that slugs don't clash
+    """
+    parties = PoliticalParty.objects.bulk_create(
+        PoliticalParty(
+            name=f"Benchmark Party {offset + i}",
+            slug=f"benchmark-party-{offset + i}",
+            abbreviation=f"BP{i}",
+            founded_date=datetime.date(1990, 1, 1),
+            description="Benchmark party",
+            ideology="Benchmark",
+            hq_location="Kathmandu",
+            logo_url="https://example.com/logo.png",
+        )
+        for i in range(party_count)
+    )
+    addresses = Address.objects.bulk_create(
+        (
+            Address(
+                street_address=f"Street {i}",
+                city="Kathmandu",
+                region="Bagmati",
+                country="NP",
+            )
+            for i in range(count * 2)
+        ),
+        batch_size=2000,
+    )
+    PoliticalFigure.objects.bulk_create(
+        (
+            PoliticalFigure(
+                full_name=f"Benchmark Figure {offset + i}",
+                slug=f"benchmark-figure-{offset + i}",
+                gender=PoliticalFigure.Gender.MALE,
+                biography="Benchmark biography " * 10,
+                political_party=parties[i % len(parties)],
+                home_address=addresses[i * 2],
+                current_address=addresses[i * 2 + 1],
+            )
+            for i in range(count)
+        ),
+        batch_size=2000,
+    )
+    if connection.vendor == "postgresql":
+        # NOTE: without fresh statistics the planner expects a handful of rows and picks nested loops, which makes reads of the new rows orders of magnitude slower than they are on a real table
+        with connection.cursor() as cursor:
+            for model in (PoliticalParty, Address, PoliticalFigure):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
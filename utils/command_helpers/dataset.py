@@ -0,0 +1,407 @@
+"""
+Synthetic datasets of political parties and figures for load and scale testing, see the generate_dataset command. Built with factory_boy and Faker (dev dependencies, see requirements/dev.txt).
+
+Runs are deterministic by seed: every random choice is made with factory_boy's random generator, which is reseeded at the start of a run, so the same seed gives the same rows (except uuids and timestamps, which are generated when rows are written).
+NOTE: Faker is slow (tens of microseconds a value), so it only fills a pool of sentences once, and values are drawn from pools and lists below instead. It keeps a million figures to a few minutes.
+"""
+
+import datetime
+import functools
+import json
+from decimal import Decimal
+
+import factory
+import factory.random
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.text import slugify
+from faker import Faker
+
+from utils.political_figure.core import PoliticalFigureUtil
+from utils.political_party.core import PoliticalPartyUtil
+
+randgen = factory.random.randgen
+
+MALE_FIRST_NAMES = [
+    "Ram", "Hari", "Krishna", "Shyam", "Gopal", "Bishnu", "Prakash", "Sanjay",
+    "Rajendra", "Bikash", "Dipak", "Suresh", "Ramesh", "Dinesh", "Mahesh",
+    "Narayan", "Pushpa", "Sher", "Baburam", "Madhav", "Khadga", "Gagan", "Dhan",
+    "Ganesh", "Yubaraj", "Kamal", "Nabin", "Rabi", "Binod", "Santosh", "Anil",
+    "Sunil", "Bhim", "Tek", "Lok", "Arjun", "Kiran", "Ujjwal", "Pradeep", "Upendra",
+]  # fmt: skip
+FEMALE_FIRST_NAMES = [
+    "Sita", "Gita", "Laxmi", "Sarita", "Sunita", "Anita", "Kamala", "Bidya",
+    "Pampha", "Hisila", "Sushila", "Radha", "Parbati", "Durga", "Mina", "Rita",
+    "Bina", "Asha", "Nirmala", "Shanti", "Manju", "Sabitri", "Onsari", "Renu",
+    "Srijana", "Puja", "Rekha", "Ambika", "Tulsi", "Jayapuri",
+]  # fmt: skip
+# middle names, most names have none
+MALE_MIDDLE_NAMES = ["Bahadur", "Prasad", "Kumar", "Raj", "Nath", "Man", "Lal", "Chandra", "Bikram"]  # fmt: skip
+FEMALE_MIDDLE_NAMES = ["Kumari", "Devi", "Maya"]
+SURNAMES = [
+    "Sharma", "Shrestha", "Thapa", "Magar", "Gurung", "Tamang", "Rai", "Limbu",
+    "Adhikari", "Poudel", "Koirala", "Dahal", "Oli", "Deuba", "Karki", "Khadka",
+    "Bhattarai", "Pandey", "Yadav", "Mahato", "Chaudhary", "Tharu", "Basnet",
+    "Bista", "Shahi", "Rana", "Maharjan", "Joshi", "Acharya", "Ghimire", "Nepal",
+    "Pokharel", "Subedi", "KC", "Lama", "Sherpa", "Jha", "Mishra", "Thakur", "Sah",
+    "Ansari", "Budha", "Rawal", "Bohara", "Dhakal", "Gautam", "Regmi", "Bhandari",
+]  # fmt: skip
+
+# (city, province, latitude, longitude, postal code)
+CITIES = [
+    ("Kathmandu", "Bagmati", 27.7172, 85.3240, "44600"),
+    ("Lalitpur", "Bagmati", 27.6588, 85.3247, "44700"),
+    ("Bhaktapur", "Bagmati", 27.6710, 85.4298, "44800"),
+    ("Bharatpur", "Bagmati", 27.6768, 84.4359, "44200"),
+    ("Hetauda", "Bagmati", 27.4287, 85.0322, "44107"),
+    ("Pokhara", "Gandaki", 28.2096, 83.9856, "33700"),
+    ("Gorkha", "Gandaki", 28.0000, 84.6333, "34000"),
+    ("Biratnagar", "Koshi", 26.4525, 87.2718, "56613"),
+    ("Dharan", "Koshi", 26.8065, 87.2846, "56700"),
+    ("Itahari", "Koshi", 26.6646, 87.2718, "56705"),
+    ("Damak", "Koshi", 26.6600, 87.7000, "57217"),
+    ("Ilam", "Koshi", 26.9094, 87.9282, "57300"),
+    ("Bhadrapur", "Koshi", 26.5443, 88.0945, "57200"),
+    ("Birgunj", "Madhesh", 27.0104, 84.8770, "44300"),
+    ("Janakpur", "Madhesh", 26.7288, 85.9263, "45600"),
+    ("Rajbiraj", "Madhesh", 26.5397, 86.7466, "56400"),
+    ("Butwal", "Lumbini", 27.7006, 83.4484, "32907"),
+    ("Nepalgunj", "Lumbini", 28.0500, 81.6167, "21900"),
+    ("Tulsipur", "Lumbini", 28.1309, 82.2973, "22412"),
+    ("Ghorahi", "Lumbini", 28.0399, 82.4867, "22400"),
+    ("Tansen", "Lumbini", 27.8673, 83.5467, "32500"),
+    ("Birendranagar", "Karnali", 28.6019, 81.6339, "21700"),
+    ("Jumla", "Karnali", 29.2747, 82.1838, "21200"),
+    ("Dhangadhi", "Sudurpashchim", 28.6852, 80.6216, "10900"),
+    ("Mahendranagar", "Sudurpashchim", 28.9644, 80.1789, "10400"),
+]
+STREETS = [
+    "Baneshwor", "Thamel", "Maharajgunj", "Lazimpat", "Kalimati", "Koteshwor",
+    "Jawalakhel", "Pulchowk", "Lakeside", "New Road", "Bagbazar", "Durbar",
+    "Putali", "Tinkune", "Chabahil", "Balaju", "Kirtipur", "Gaushala", "Mill",
+]  # fmt: skip
+STREET_TYPES = ["Marg", "Sadak", "Chowk", "Tole", "Path"]
+
+PARTY_PREFIXES = ["Nepal", "Rastriya", "Nepali", "Loktantrik", "Madhesi", "Sanghiya", "Swatantra", "Nagarik"]  # fmt: skip
+PARTY_CORES = [
+    "Janamorcha", "Samajwadi", "Prajatantra", "Communist", "Janamukti", "Swabhiman",
+    "Unmukti", "Sadbhawana", "Majdoor Kisan", "Janata", "Ekata", "Congress",
+]  # fmt: skip
+PARTY_SUFFIXES = ["Party", "Morcha", "Sangh", "Manch", "Forum", "Party (Unified)", "Party (Socialist)"]  # fmt: skip
+IDEOLOGIES = [
+    "Social democracy", "Communism", "Marxism-Leninism", "Democratic socialism",
+    "Monarchism", "Hindu nationalism", "Federalism", "Liberalism", "Conservatism",
+    "Regionalism", "Environmentalism", "Agrarianism",
+]  # fmt: skip
+
+MINISTRIES = ["Finance", "Home Affairs", "Foreign Affairs", "Health", "Education", "Agriculture", "Energy", "Tourism", "Physical Infrastructure"]  # fmt: skip
+SUBJECTS = ["law", "political science", "economics", "sociology", "engineering", "medicine", "journalism"]  # fmt: skip
+MOVEMENTS = ["People's Movement", "Madhes Movement", "student movement", "trade union movement"]  # fmt: skip
+ISSUES = ["land reform", "federalism", "women's rights", "rural roads", "hydropower", "migrant workers", "education reform"]  # fmt: skip
+BIOGRAPHY_TEMPLATES = [
+    "Elected to the House of Representatives from {city} in {year}.",
+    "Served as Minister of {ministry} from {year} to {next_year}.",
+    "Began a political career in the student movement in {year}.",
+    "Member of the central committee since {year}.",
+    "Former mayor of {city}.",
+    "Studied {subject} at Tribhuvan University.",
+    "Took part in the {movement} of {year}.",
+    "Known for work on {issue}.",
+]
+
+PHONE_PREFIXES = ["984", "985", "986", "974", "975", "980", "981", "982", "961", "988", "972", "963"]  # fmt: skip
+
+# the dataset ends at a fixed date, so that runs don't depend on the day they are made
+END_DATE = datetime.date(2025, 12, 31)
+DISSOLVED_RATIO = 0.15
+DELETED_RATIO = 0.02
+
+
+@functools.cache
+def get_sentences():
+    """
+    Pool of biography and description sentences, the same for every run.
+    """
+    faker = Faker()
+    faker.seed_instance(0)
+    sentences = [faker.sentence(nb_words=faker.random_int(6, 18)) for _ in range(1000)]
+    for template in BIOGRAPHY_TEMPLATES:
+        for _ in range(100):
+            year = faker.random_int(1980, 2022)
+            sentences.append(
+                template.format(
+                    city=faker.random_element(CITIES)[0],
+                    year=year,
+                    next_year=year + faker.random_int(1, 3),
+                    ministry=faker.random_element(MINISTRIES),
+                    subject=faker.random_element(SUBJECTS),
+                    movement=faker.random_element(MOVEMENTS),
+                    issue=faker.random_element(ISSUES),
+                )
+            )
+    return sentences
+
+
+def get_text(min_sentences, max_sentences):
+    return " ".join(
+        randgen.choices(
+            get_sentences(), k=randgen.randint(min_sentences, max_sentences)
+        )
+    )
+
+
+def get_biography():
+    # mostly short, some long
+    ranges = [(0, 0), (1, 3), (4, 10), (11, 40)]
+    return get_text(*randgen.choices(ranges, weights=[5, 40, 40, 15])[0])
+
+
+def get_date(start, end):
+    return start + datetime.timedelta(days=randgen.randint(0, (end - start).days))
+
+
+def get_deleted():
+    if randgen.random() >= DELETED_RATIO:
+        return None
+    day = get_date(datetime.date(2015, 1, 1), END_DATE)
+    return datetime.datetime.combine(day, datetime.time(12), tzinfo=datetime.UTC)
+
+
+def get_coordinate(value):
+    # a few kilometers around the city
+    return Decimal(value + randgen.uniform(-0.05, 0.05)).quantize(Decimal("0.000001"))
+
+
+def get_address(deleted=None):
+    """
+    Returns validated data of an address (like the create serializer's).
+    """
+    city, province, latitude, longitude, postal_code = randgen.choice(CITIES)
+    return {
+        "street_address": f"{randgen.choice(STREETS)} {randgen.choice(STREET_TYPES)}, Ward {randgen.randint(1, 32)}",
+        "street_address_2": (
+            f"House No. {randgen.randint(1, 999)}" if randgen.random() < 0.2 else ""
+        ),
+        "city": city,
+        "region": province,
+        "postal_code": postal_code,
+        "country": "NP",
+        "latitude": get_coordinate(latitude),
+        "longitude": get_coordinate(longitude),
+        "deleted": deleted,
+    }
+
+
+def get_full_name(gender):
+    male = gender == "m"
+    names = [randgen.choice(MALE_FIRST_NAMES if male else FEMALE_FIRST_NAMES)]
+    if randgen.random() < 0.4:
+        names.append(randgen.choice(MALE_MIDDLE_NAMES if male else FEMALE_MIDDLE_NAMES))
+    names.append(randgen.choice(SURNAMES))
+    return " ".join(names)
+
+
+def get_party_name():
+    prefix, core = randgen.sample(PARTY_PREFIXES + PARTY_CORES, 2)
+    return f"{prefix} {core} {randgen.choice(PARTY_SUFFIXES)}"
+
+
+def get_abbreviation(name):
+    return "".join(word[0] for word in name.split() if word[0].isalpha()).upper()
+
+
+def get_dissolved_date(founded_date):
+    if randgen.random() >= DISSOLVED_RATIO:
+        return None
+    return min(
+        founded_date + datetime.timedelta(days=randgen.randint(365, 30 * 365)),
+        END_DATE,
+    )
+
+
+def maybe(ratio, value):
+    return value if randgen.random() < ratio else ""
+
+
+class PoliticalPartyFactory(factory.DictFactory):
+    """
+    Validated data of a political party (like the create serializer's), with dissolved_date and deleted.
+    """
+
+    name = factory.LazyFunction(get_party_name)
+    description = factory.LazyFunction(lambda: get_text(1, 3))
+    abbreviation = factory.LazyAttribute(lambda party: get_abbreviation(party.name))
+    founded_date = factory.LazyFunction(
+        lambda: get_date(datetime.date(1950, 1, 1), datetime.date(2022, 12, 31))
+    )
+    dissolved_date = factory.LazyAttribute(
+        lambda party: get_dissolved_date(party.founded_date)
+    )
+    ideology = factory.LazyFunction(lambda: randgen.choice(IDEOLOGIES))
+    hq_location = factory.LazyFunction(lambda: randgen.choice(CITIES)[0])
+    website = factory.LazyAttribute(
+        lambda party: maybe(0.7, f"https://{party.abbreviation.lower()}.org.np")
+    )
+    logo_url = factory.LazyFunction(
+        lambda: f"https://example.com/logos/{randgen.getrandbits(32):08x}.png"
+    )
+    deleted = factory.LazyFunction(get_deleted)
+
+
+class PoliticalFigureFactory(factory.DictFactory):
+    """
+    Validated data of a political figure (like the create serializer's) without its party, with deleted. Addresses of deleted figures are deleted as well.
+    """
+
+    gender = factory.LazyFunction(lambda: randgen.choice("mf"))
+    full_name = factory.LazyAttribute(lambda figure: get_full_name(figure.gender))
+    date_of_birth = factory.LazyFunction(
+        lambda: (
+            get_date(datetime.date(1940, 1, 1), datetime.date(2000, 12, 31))
+            if randgen.random() < 0.95
+            else None
+        )
+    )
+    biography = factory.LazyFunction(get_biography)
+    photo = None
+    deleted = factory.LazyFunction(get_deleted)
+    home_address = factory.LazyAttribute(lambda figure: get_address(figure.deleted))
+    current_address = factory.LazyAttribute(lambda figure: get_address(figure.deleted))
+    contact_number = factory.LazyFunction(
+        lambda: maybe(
+            0.85, f"{randgen.choice(PHONE_PREFIXES)}{randgen.randint(0, 9999999):07}"
+        )
+    )
+    website = factory.LazyAttribute(
+        lambda figure: maybe(0.3, f"https://{slugify(figure.full_name)}.com.np")
+    )
+    facebook_url = factory.LazyAttribute(
+        lambda figure: maybe(0.6, f"https://facebook.com/{figure.handle}")
+    )
+    twitter_url = factory.LazyAttribute(
+        lambda figure: maybe(0.4, f"https://twitter.com/{figure.handle}")
+    )
+    instagram_url = factory.LazyAttribute(
+        lambda figure: maybe(0.3, f"https://instagram.com/{figure.handle}")
+    )
+    is_active = factory.LazyFunction(lambda: randgen.random() < 0.9)
+
+    class Params:
+        # username on social media
+        handle = factory.LazyAttribute(
+            lambda figure: f"{slugify(figure.full_name).replace('-', '.')}{randgen.randint(1, 999)}"
+        )
+
+
+def get_figure_counts(parties, figures):
+    """
+    Spreads `figures` over `parties` the way real ones are: a few large parties and many small ones.
+    """
+    weights = [randgen.paretovariate(1.2) for _ in range(parties)]
+    total = sum(weights)
+    counts = [int(figures * weight / total) for weight in weights]
+    for index in range(figures - sum(counts)):
+        counts[index % parties] += 1
+    return counts
+
+
+def iter_dataset(parties, figures, seed=0):
+    """
+    Yields (political party, [political figures]) of a dataset, see the factories.
+    """
+    factory.random.reseed_random(seed)
+
+    for count in get_figure_counts(parties, figures):
+        yield PoliticalPartyFactory(), PoliticalFigureFactory.build_batch(count)
+
+
+def write_dataset(dataset, chunk_size=50_000, on_progress=None):
+    """
+    Writes (political party, [political figures]) of a dataset to the database with the bulk loader, about `chunk_size` figures per transaction.
+    Figures of deleted parties are written without a party, like deleting a party leaves them (see PoliticalPartyUtil.delete_political_party()).
+
+    :param on_progress: called with the number of parties and figures written after every transaction
+    """
+    written_parties = written_figures = 0
+    chunk, size = [], 0
+
+    def write():
+        with transaction.atomic():
+            party_ids = PoliticalPartyUtil.load_political_parties(
+                [party for party, _ in chunk]
+            )
+            rows = [
+                {**figure, "political_party_id": None if party["deleted"] else pk}
+                for (party, figures), pk in zip(chunk, party_ids)
+                for figure in figures
+            ]
+            for start in range(0, len(rows), chunk_size):
+                PoliticalFigureUtil.load_political_figures(
+                    rows[start : start + chunk_size]
+                )
+        return len(chunk), len(rows)
+
+    for party, figures in dataset:
+        chunk.append((party, figures))
+        size += 1 + len(figures)
+        if size >= chunk_size:
+            parties, figures = write()
+            written_parties += parties
+            written_figures += figures
+            chunk, size = [], 0
+            if on_progress:
+                on_progress(written_parties, written_figures)
+    if chunk:
+        parties, figures = write()
+        written_parties += parties
+        written_figures += figures
+        if on_progress:
+            on_progress(written_parties, written_figures)
+
+    return written_parties, written_figures
+
+
+def _without(data, *keys):
+    return {key: value for key, value in data.items() if key not in keys}
+
+
+def get_party_input(party):
+    """
+    Returns a generated political party as the input of the create API (and of seed files), without political figures.
+    """
+    return _without(party, "dissolved_date", "deleted")
+
+
+def get_figure_input(figure):
+    """
+    Returns a generated political figure as the input of the create API (and of seed files), without political party.
+    """
+    return {
+        **_without(figure, "deleted"),
+        "home_address": _without(figure["home_address"], "deleted"),
+        "current_address": _without(figure["current_address"], "deleted"),
+    }
+
+
+def write_seed_file(dataset, file):
+    """
+    Writes (political party, [political figures]) of a dataset to `file` in the format of data/seed_data.json (see utils/command_helpers/importer.py), one party at a time.
+    NOTE: the seed format has no deleted rows and dissolved dates, deleted rows (and figures of deleted parties) are left out and dissolved dates are dropped.
+
+    :returns: (number of parties written, number of figures written)
+    """
+    written_parties = written_figures = 0
+    file.write('{"users": [], "political_parties": [')
+    for party, figures in dataset:
+        if party["deleted"]:
+            continue
+        item = get_party_input(party)
+        item["political_figures"] = [
+            get_figure_input(figure) for figure in figures if not figure["deleted"]
+        ]
+        file.write(",\n" if written_parties else "\n")
+        json.dump(item, file, cls=DjangoJSONEncoder)
+        written_parties += 1
+        written_figures += len(item["political_figures"])
+    file.write("\n]}\n")
+    return written_parties, written_figures
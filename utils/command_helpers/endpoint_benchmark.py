@@ -0,0 +1,483 @@
+"""
+Benchmark of every API endpoint with django's test client against a generated dataset (see utils/command_helpers/dataset.py), see the benchmark_endpoints command.
+
+Requests are timed end to end (middlewares, views, rendering and streaming, without the network), and their queries are counted and timed with an execution wrapper of the connection.
+NOTE: rows fetched later from server-side cursors (exports, streamed lists) are not queries of their own, so their time is part of the latency but not of the DB time.
+Results are plain dicts, so that they can be written as JSON and runs diffed across commits.
+"""
+
+import io
+import json
+import math
+import random
+import resource
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.political_figure.models import PoliticalFigure
+from apps.political_party.models import PoliticalParty
+from apps.users.models import User
+from utils.command_helpers.dataset import (
+    CITIES,
+    FEMALE_FIRST_NAMES,
+    IDEOLOGIES,
+    MALE_FIRST_NAMES,
+    PARTY_CORES,
+    SURNAMES,
+    PoliticalFigureFactory,
+    PoliticalPartyFactory,
+    get_biography,
+    get_figure_input,
+    get_party_input,
+    iter_dataset,
+    write_dataset,
+)
+
+# items per request of bulk endpoints
+BULK_SIZE = 50
+USERS = 20
+PASSWORD = "benchmark-password"
+
+
+class QueryTimer:
+    """
+    Execution wrapper (see connection.execute_wrapper()) counting and timing queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+
+
+@dataclass
+class BenchmarkContext:
+    client: Client
+    rng: random.Random
+    party_ids: list
+    figure_ids: list
+    # of a super user
+    username: str
+    headers: dict
+    refresh_token: str
+    # ids of rows created by the benchmark, deleted by the delete endpoints
+    created: dict = field(default_factory=lambda: defaultdict(list))
+
+    def get_name(self):
+        first_names = MALE_FIRST_NAMES + FEMALE_FIRST_NAMES
+        return f"{self.rng.choice(first_names)} {self.rng.choice(SURNAMES)}"
+
+
+@dataclass
+class Endpoint:
+    """
+    :param name: url name
+    :param get_request: returns (method, path, kwargs of the client's method) of the nth request
+    :param on_response: called with the context and every response, for example to keep the ids of created rows
+    :param max_requests: for endpoints too slow to be requested as many times as the others
+    """
+
+    name: str
+    get_request: Callable
+    on_response: Callable = None
+    max_requests: int = None
+
+
+def _json(data):
+    return {"data": json.dumps(data, cls=DjangoJSONEncoder), "content_type": "application/json"}  # fmt: skip
+
+
+def _get(name, *args, params=None, **kwargs):
+    return "get", reverse(name, args=args), {"data": params, **kwargs}
+
+
+def _with_typo(name):
+    # a letter dropped, for the fuzzy lookups
+    index = len(name) // 2
+    return name[:index] + name[index + 1 :]
+
+
+def _figure_input(context):
+    return {
+        **get_figure_input(PoliticalFigureFactory()),
+        "political_party": context.rng.choice(context.party_ids),
+    }
+
+
+def _keep_id(key):
+    def on_response(context, response):
+        if response.status_code == 200:
+            context.created[key].append(response.json()["data"]["id"])
+
+    return on_response
+
+
+def _keep_bulk_ids(context, response):
+    if response.status_code == 200:
+        context.created["bulk-figures"].extend(
+            item["id"] for item in response.json()["data"]["created"]
+        )
+
+
+def _pop_id(context, key):
+    # 0 (not found) if the rows to delete were not created
+    return context.created[key].pop() if context.created[key] else 0
+
+
+def _bulk_update(name, ids, changes):
+    def get_request(context, number):
+        sample = context.rng.sample(ids(context), min(BULK_SIZE, len(ids(context))))
+        items = [{"id": pk, "changes": changes(context)} for pk in sample]
+        return "patch", reverse(name), _json({"items": items})
+
+    return get_request
+
+
+def _bulk_delete(context, number):
+    ids = context.created["bulk-figures"][:BULK_SIZE]
+    del context.created["bulk-figures"][:BULK_SIZE]
+    return "post", reverse("bulk-delete-political-figure"), _json({"ids": ids or [0]})
+
+
+# reads first, then creates, updates and deletes (of the rows created before)
+ENDPOINTS = [
+    Endpoint("get-country-list", lambda context, number: _get("get-country-list")),
+    # ---------- political parties ----------
+    Endpoint(
+        "get-political-party-list",
+        lambda context, number: _get("get-political-party-list"),
+    ),
+    Endpoint(
+        "get-political-party-detail",
+        lambda context, number: _get(
+            "get-political-party-detail", context.rng.choice(context.party_ids)
+        ),
+    ),
+    Endpoint(
+        "search-political-party",
+        lambda context, number: _get(
+            "search-political-party", params={"q": context.rng.choice(PARTY_CORES)}
+        ),
+    ),
+    Endpoint(
+        "fuzzy-search-political-party",
+        lambda context, number: _get(
+            "fuzzy-search-political-party",
+            params={"q": _with_typo(context.rng.choice(PARTY_CORES))},
+        ),
+    ),
+    Endpoint(
+        "export-political-party",
+        lambda context, number: _get("export-political-party"),
+        max_requests=10,
+    ),
+    # ---------- political figures ----------
+    Endpoint(
+        "get-political-figure-list",
+        lambda context, number: _get(
+            "get-political-figure-list",
+            # the first page with different filters, see PoliticalFigureUtil.facets
+            params=[
+                {},
+                {"gender": "f", "facets": "gender,home_city"},
+                {"home_city": context.rng.choice(CITIES)[0], "page_size": 100},
+                {"political_party": context.rng.choice(context.party_ids)},
+            ][number % 4],
+        ),
+    ),
+    Endpoint(
+        "get-political-figure-detail",
+        lambda context, number: _get(
+            "get-political-figure-detail", context.rng.choice(context.figure_ids)
+        ),
+    ),
+    Endpoint(
+        "search-political-figure",
+        lambda context, number: _get(
+            "search-political-figure", params={"q": context.get_name()}
+        ),
+    ),
+    Endpoint(
+        "fuzzy-search-political-figure",
+        lambda context, number: _get(
+            "fuzzy-search-political-figure",
+            params={"q": _with_typo(context.get_name())},
+        ),
+    ),
+    Endpoint(
+        "autocomplete-political-figure",
+        lambda context, number: _get(
+            "autocomplete-political-figure",
+            params={"q": context.get_name()[: context.rng.randint(1, 6)]},
+        ),
+    ),
+    Endpoint(
+        "export-political-figure",
+        lambda context, number: _get("export-political-figure"),
+        max_requests=3,
+    ),
+    # ---------- users ----------
+    Endpoint(
+        "users:token-generate",
+        lambda context, number: (
+            "post",
+            reverse("users:token-generate"),
+            _json({"username": context.username, "password": PASSWORD}),
+        ),
+        # the password hash takes most of the time
+        max_requests=10,
+    ),
+    Endpoint(
+        "users:token-refresh",
+        lambda context, number: (
+            "post",
+            reverse("users:token-refresh"),
+            _json({"refresh": context.refresh_token}),
+        ),
+    ),
+    Endpoint(
+        "users:user-list",
+        lambda context, number: _get("users:user-list", headers=context.headers),
+    ),
+    Endpoint(
+        "users:user-profile",
+        lambda context, number: _get("users:user-profile", headers=context.headers),
+    ),
+    # ---------- writes ----------
+    Endpoint(
+        "create-political-party",
+        lambda context, number: (
+            "post",
+            reverse("create-political-party"),
+            _json(get_party_input(PoliticalPartyFactory())),
+        ),
+        on_response=_keep_id("parties"),
+    ),
+    Endpoint(
+        "create-political-figure",
+        lambda context, number: (
+            "post",
+            reverse("create-political-figure"),
+            _json(_figure_input(context)),
+        ),
+        on_response=_keep_id("figures"),
+    ),
+    Endpoint(
+        "bulk-create-political-figure",
+        lambda context, number: (
+            "post",
+            reverse("bulk-create-political-figure"),
+            _json({"items": [_figure_input(context) for _ in range(BULK_SIZE)]}),
+        ),
+        on_response=_keep_bulk_ids,
+    ),
+    Endpoint(
+        "update-political-party",
+        lambda context, number: (
+            "patch",
+            reverse(
+                "update-political-party", args=[context.rng.choice(context.party_ids)]
+            ),
+            _json({"ideology": context.rng.choice(IDEOLOGIES)}),
+        ),
+    ),
+    Endpoint(
+        "bulk-update-political-party",
+        _bulk_update(
+            "bulk-update-political-party",
+            lambda context: context.party_ids,
+            lambda context: {"ideology": context.rng.choice(IDEOLOGIES)},
+        ),
+    ),
+    Endpoint(
+        "update-political-figure",
+        lambda context, number: (
+            "patch",
+            reverse(
+                "update-political-figure", args=[context.rng.choice(context.figure_ids)]
+            ),
+            _json({"biography": get_biography()}),
+        ),
+    ),
+    Endpoint(
+        "bulk-update-political-figure",
+        _bulk_update(
+            "bulk-update-political-figure",
+            lambda context: context.figure_ids,
+            lambda context: {"is_active": context.rng.random() < 0.9},
+        ),
+    ),
+    Endpoint(
+        "delete-political-party",
+        lambda context, number: (
+            "delete",
+            reverse("delete-political-party", args=[_pop_id(context, "parties")]),
+            {},
+        ),
+    ),
+    Endpoint(
+        "delete-political-figure",
+        lambda context, number: (
+            "delete",
+            reverse("delete-political-figure", args=[_pop_id(context, "figures")]),
+            {},
+        ),
+    ),
+    Endpoint("bulk-delete-political-figure", _bulk_delete),
+]
+
+
+def percentile(values, percent):
+    # nearest rank
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes. It only grows, so it is the peak of every request made so far.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def benchmark_endpoint(endpoint, context, requests, warmup=1):
+    """
+    Makes `warmup` and then `requests` requests (at most endpoint.max_requests) to the endpoint, and returns the stats of the latter.
+    """
+    requests = min(requests, endpoint.max_requests or requests)
+    latencies, query_counts, query_times, statuses = [], [], [], Counter()
+
+    for number in range(warmup + requests):
+        method, path, kwargs = endpoint.get_request(context, number)
+        timer = QueryTimer()
+        # NOTE: some views print the request data, keep the output clean
+        with connection.execute_wrapper(timer), redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            response = getattr(context.client, method)(path, **kwargs)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = time.perf_counter() - started
+
+        if endpoint.on_response:
+            endpoint.on_response(context, response)
+        if number >= warmup:
+            latencies.append(elapsed * 1000)
+            query_counts.append(timer.count)
+            query_times.append(timer.time * 1000)
+            statuses[response.status_code] += 1
+
+    return {
+        "requests": requests,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "errors": sum(count for code, count in statuses.items() if code >= 400),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3),
+            "mean": round(sum(latencies) / requests, 3),
+        },
+        "queries": {
+            "mean": round(sum(query_counts) / requests, 2),
+            "max": max(query_counts),
+        },
+        "db_time_ms": {
+            "mean": round(sum(query_times) / requests, 3),
+            "p95": round(percentile(query_times, 95), 3),
+        },
+        "peak_rss_mb": round(get_peak_rss() / 1024 / 1024, 1),
+    }
+
+
+def create_users(count=USERS):
+    """
+    Creates a super user (with PASSWORD) and `count` other users, returns the super user.
+    """
+    User.objects.bulk_create(
+        [
+            # emails and phone numbers are unique
+            User(
+                username=f"benchmark-user-{number}",
+                email=f"benchmark-user-{number}@example.com",
+                phone_number=f"980{number:07}",
+            )
+            for number in range(count)
+        ]
+    )
+    return User.objects.create_superuser(
+        username="benchmark", email="benchmark@example.com", password=PASSWORD
+    )
+
+
+def benchmark_dataset(
+    figures,
+    parties,
+    requests=100,
+    warmup=1,
+    seed=0,
+    response_cache=False,
+    endpoints=ENDPOINTS,
+    on_endpoint=None,
+):
+    """
+    Generates a dataset into the (empty) database and benchmarks every endpoint against it, see benchmark_endpoint().
+
+    :param response_cache: with the response cache (see utils/core/cache.py), repeated reads are cache hits
+    :param on_endpoint: called with the name and stats of every endpoint once it is benchmarked
+    :returns: {"dataset": {...}, "endpoints": {name: stats}}
+    """
+    started = time.perf_counter()
+    parties, figures = write_dataset(iter_dataset(parties, figures, seed))
+    generation_time = time.perf_counter() - started
+
+    user = create_users()
+    refresh_token = RefreshToken.for_user(user)
+    context = BenchmarkContext(
+        # server errors are counted like the other errors
+        client=Client(raise_request_exception=False),
+        rng=random.Random(seed),
+        party_ids=list(PoliticalParty.objects.values_list("pk", flat=True)),
+        figure_ids=list(PoliticalFigure.objects.values_list("pk", flat=True)),
+        username=user.username,
+        headers={"Authorization": f"Bearer {refresh_token.access_token}"},
+        refresh_token=str(refresh_token),
+    )
+
+    results = {}
+    with override_settings(RESPONSE_CACHE_ENABLED=response_cache):
+        for endpoint in endpoints:
+            results[endpoint.name] = benchmark_endpoint(
+                endpoint, context, requests, warmup
+            )
+            if on_endpoint:
+                on_endpoint(endpoint.name, results[endpoint.name])
+
+    return {
+        "dataset": {
+            "parties": parties,
+            "figures": figures,
+            "seed": seed,
+            "generation_time_s": round(generation_time, 1),
+        },
+        "endpoints": results,
+    }
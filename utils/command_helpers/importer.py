@@ -0,0 +1,306 @@
+"""
+Streaming import of seed files ({"users": [...], "political_parties": [{..., "political_figures": [...]}, ...]}, see data/seed_data.json).
+
+The file is parsed incrementally (see utils/core/json_stream.py) and imported in batches of about `batch_size` records (a party and each of its figures are one record each), every batch in its own transaction and with a fixed number of queries: rows that already exist are found with one query per model, and the others are created with the bulk loader (see utils/core/bulk_load.py).
+Since every batch is committed and existing rows are skipped, an interrupted import resumes where it stopped when it is run again.
+Batches are validated (prepared) before they are written, optionally by a pool of worker processes, see import_items().
+"""
+
+import multiprocessing
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import django
+from django.db import transaction
+
+from apps.political_figure.models import PoliticalFigure
+from apps.political_party.models import PoliticalParty
+from utils.command_helpers.core import (
+    print_error,
+    print_info,
+    print_warning,
+    seed_users,
+)
+from utils.core.bulk import validate_items
+from utils.core.json_stream import iter_object_items
+from utils.political_figure.core import PoliticalFigureUtil
+from utils.political_party.core import PoliticalPartyUtil
+
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class ImportStats:
+    records: int = 0
+    created: int = 0
+    existing: int = 0
+    invalid: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def format(self):
+        elapsed = self.elapsed
+        return (
+            f"{self.records} records ({self.created} created, {self.existing} existing, {self.invalid} invalid) "
+            f"in {elapsed:.2f}s ({self.records / elapsed:.0f} records/s)"
+        )
+
+
+def _count_records(key, item):
+    if key == "political_parties":
+        return 1 + len(item.get("political_figures") or [])
+    return 1
+
+
+def iter_batches(items, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Groups consecutive (key, item) of the same key into (key, [item, ...]) of about `batch_size` records.
+    NOTE: a party is never split from its figures, so a party with more figures than `batch_size` is a batch of its own.
+    """
+    key, batch, size = None, [], 0
+    for item_key, item in items:
+        if batch and (item_key != key or size >= batch_size):
+            yield key, batch
+            batch, size = [], 0
+        key = item_key
+        batch.append(item)
+        size += _count_records(item_key, item)
+    if batch:
+        yield key, batch
+
+
+def _isoformat(value):
+    # dates of the file are iso formatted strings, the database's are dates
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def get_party_key(name, abbreviation, founded_date):
+    return (name, abbreviation, _isoformat(founded_date))
+
+
+def get_figure_key(full_name, date_of_birth, gender, political_party_id):
+    return (full_name, _isoformat(date_of_birth), gender, political_party_id)
+
+
+def _split_new(items, keys, existing):
+    """
+    Returns the indexes of items whose key is neither in `existing` nor repeated earlier in the batch.
+    """
+    new, seen = [], set()
+    for index, key in enumerate(keys):
+        if key not in existing and key not in seen:
+            seen.add(key)
+            new.append(index)
+    return new
+
+
+@dataclass
+class PreparedParty:
+    """
+    A political party of a seed file validated by prepare_political_parties(), with its political figures as [(full name, validated data, errors), ...].
+    Validated data is None for invalid items and errors is None for valid ones.
+    """
+
+    name: str
+    data: dict = None
+    errors: dict = None
+    figures: list = field(default_factory=list)
+
+
+def prepare_political_parties(items):
+    """
+    Validates a batch of political parties (with their "political_figures") with the create serializers.
+    Figures are validated without their party (which may not exist yet), it is set by write_political_parties().
+
+    NOTE: no query is made, so that batches can be prepared in other processes (see import_items()).
+
+    :returns: [PreparedParty, ...] in the order of items
+    """
+    items = [dict(item) for item in items]
+    figures_of_items = [item.pop("political_figures", None) or [] for item in items]
+
+    validated, errors = validate_items(PoliticalPartyUtil.create_serializer(), items)
+    figure_serializer = PoliticalFigureUtil.bulk_create_item_serializer(
+        context={"political_parties": {}}
+    )
+
+    prepared = []
+    for item, data, item_errors, figures in zip(
+        items, validated, errors, figures_of_items
+    ):
+        figures = [{**figure, "political_party": None} for figure in figures]
+        figure_data, figure_errors = validate_items(figure_serializer, figures)
+        prepared.append(
+            PreparedParty(
+                name=item.get("name"),
+                data=data,
+                errors=item_errors,
+                figures=[
+                    (figure.get("full_name"), data, errors)
+                    for figure, data, errors in zip(figures, figure_data, figure_errors)
+                ],
+            )
+        )
+    return prepared
+
+
+def write_political_parties(prepared, stats):
+    """
+    Creates a batch of prepared political parties and figures (see prepare_political_parties()) in one transaction, skipping the ones that already exist (by name, abbreviation and founded date, and figures by full name, date of birth, gender and party).
+    """
+    stats.records += sum(1 + len(party.figures) for party in prepared)
+
+    with transaction.atomic():
+        # ---------- parties ----------
+        valid = []
+        for party in prepared:
+            if party.data is None:
+                # figures of an invalid party are invalid as well
+                stats.invalid += 1 + len(party.figures)
+                print_error(f"Invalid political party {party.name}: {party.errors}")
+            else:
+                valid.append(party)
+
+        keys = [
+            get_party_key(
+                party.data["name"],
+                party.data["abbreviation"],
+                party.data["founded_date"],
+            )
+            for party in valid
+        ]
+        party_ids = {
+            get_party_key(name, abbreviation, founded_date): pk
+            for pk, name, abbreviation, founded_date in PoliticalParty.objects.filter(
+                name__in={key[0] for key in keys}
+            ).values_list("pk", "name", "abbreviation", "founded_date")
+        }
+        new = _split_new(valid, keys, party_ids)
+        stats.existing += len(valid) - len(new)
+
+        created = PoliticalPartyUtil.load_political_parties(
+            [valid[index].data for index in new]
+        )
+        for index, pk in zip(new, created):
+            party_ids[keys[index]] = pk
+        stats.created += len(created)
+
+        # ---------- figures ----------
+        figures = []
+        for key, party in zip(keys, valid):
+            party_id = party_ids[key]
+            for full_name, data, errors in party.figures:
+                if data is None:
+                    stats.invalid += 1
+                    print_error(f"Invalid political figure {full_name}: {errors}")
+                    continue
+                figure = dict(data, political_party_id=party_id)
+                del figure["political_party"]
+                figures.append(figure)
+
+        keys = [
+            get_figure_key(
+                figure["full_name"],
+                figure["date_of_birth"],
+                figure["gender"],
+                figure["political_party_id"],
+            )
+            for figure in figures
+        ]
+        existing = {
+            get_figure_key(*row)
+            for row in PoliticalFigure.objects.filter(
+                political_party_id__in={key[3] for key in keys},
+                full_name__in={key[0] for key in keys},
+            ).values_list("full_name", "date_of_birth", "gender", "political_party_id")
+        }
+        new = _split_new(figures, keys, existing)
+        stats.existing += len(figures) - len(new)
+
+        created = PoliticalFigureUtil.load_political_figures(
+            [figures[index] for index in new]
+        )
+        stats.created += len(created)
+
+
+def import_political_parties(items, stats):
+    """
+    Imports a batch of political parties (with their "political_figures"), see prepare_political_parties() and write_political_parties().
+    """
+    write_political_parties(prepare_political_parties(items), stats)
+
+
+def _prepare_batch(key, batch):
+    # run in the worker processes, see iter_prepared_batches()
+    if key == "political_parties":
+        return prepare_political_parties(batch)
+    return batch
+
+
+def iter_prepared_batches(batches, workers=1):
+    """
+    Yields (key, prepared batch) for each (key, batch) of `batches` (see iter_batches()), in the same order.
+    With more than one worker, batches are prepared in a pool of `workers` processes, at most `workers * 2` batches ahead of the one yielded so that memory use stays bounded.
+    """
+    if workers <= 1:
+        for key, batch in batches:
+            yield key, _prepare_batch(key, batch)
+        return
+
+    # NOTE: spawn instead of fork, forked processes would share the database connection of this process (the workers make no query anyway)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=django.setup) as pool:
+        pending = deque()
+        for key, batch in batches:
+            pending.append((key, pool.apply_async(_prepare_batch, (key, batch))))
+            if len(pending) >= workers * 2:
+                key, result = pending.popleft()
+                yield key, result.get()
+        while pending:
+            key, result = pending.popleft()
+            yield key, result.get()
+
+
+def import_items(items, batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """
+    Imports (key, item) of a seed file (see iter_object_items()) batch by batch, printing the progress after each batch.
+
+    Validation, which takes most of the time, is done by `workers` processes (see iter_prepared_batches()), but batches are written by this process one after the other in the order of the file.
+    So existing rows, duplicates and slugs are resolved the same way whatever the number of workers: the first item of the file wins and the next ones get the next slug suffixes.
+
+    :returns: ImportStats
+    """
+    stats = ImportStats()
+    batches = iter_prepared_batches(iter_batches(items, batch_size), workers)
+    for number, (key, batch) in enumerate(batches, start=1):
+        if key == "users":
+            # a handful of rows, created one by one since their generated passwords are printed
+            created, existing = seed_users(batch)
+            stats.records += len(batch)
+            stats.created += created
+            stats.existing += existing
+            stats.invalid += len(batch) - created - existing
+        elif key == "political_parties":
+            write_political_parties(batch, stats)
+        else:
+            print_warning(f"Skipping {len(batch)} items of unknown key: {key}")
+            continue
+        print_info(f"Batch {number}: {stats.format()}")
+    return stats
+
+
+def import_seed_file(file_path, batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """
+    Imports a seed file, see import_items().
+
+    :raises FileNotFoundError:
+    :raises json.JSONDecodeError: if the file is malformed, batches before the error are imported
+    """
+    with open(file_path, "r", encoding="utf-8") as file:
+        return import_items(
+            iter_object_items(file), batch_size=batch_size, workers=workers
+        )
@@ -0,0 +1,181 @@
+"""
+Reading and rendering of the request profiles written by utils/core/profiling.py, see `python manage.py profiles`.
+"""
+
+import html
+import io
+import os
+import pstats
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.conf import settings
+
+# flamegraph layout, in pixels
+FLAMEGRAPH_WIDTH = 1200
+FLAMEGRAPH_ROW_HEIGHT = 16
+# frames narrower than this are left out
+FLAMEGRAPH_MIN_WIDTH = 0.5
+
+
+def parse_profile_name(name):
+    """
+    Metadata of a profile from its file name, see utils/core/profiling.py:get_profile_name()
+    """
+    stem, extension = os.path.splitext(name)
+    created, method, rest = stem.split("-", 2)
+    url_name, duration = rest.rsplit("-", 1)
+    return {
+        "name": name,
+        "created": datetime.strptime(created, "%Y%m%dT%H%M%S.%f"),
+        "method": method,
+        "url_name": url_name,
+        "duration_ms": int(duration.removesuffix("ms")),
+        "format": extension.lstrip("."),
+    }
+
+
+def list_profiles(directory=None):
+    """
+    Metadata of every profile in the directory (PROFILING_DIR by default), oldest first.
+    """
+    directory = directory or settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory)):
+        try:
+            profile = parse_profile_name(name)
+        except ValueError:
+            # not a profile
+            continue
+        profile["size"] = os.path.getsize(os.path.join(directory, name))
+        profiles.append(profile)
+    return profiles
+
+
+def get_profile_path(name, directory=None):
+    """
+    Path of the profile, "latest" for the latest one.
+
+    :raises FileNotFoundError: if there is no such profile
+    """
+    directory = directory or settings.PROFILING_DIR
+    if name == "latest":
+        profiles = list_profiles(directory)
+        if not profiles:
+            raise FileNotFoundError(f"No profiles in {directory}")
+        name = profiles[-1]["name"]
+
+    path = os.path.join(directory, os.path.basename(name))
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No profile {name} in {directory}")
+    return path
+
+
+def render_pstats(path, sort="cumulative", limit=30):
+    stream = io.StringIO()
+    stats = pstats.Stats(path, stream=stream)
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def read_collapsed(path):
+    """
+    {stack: samples} of a collapsed stacks file.
+    """
+    stacks = Counter()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            stack, count = line.rstrip("\n").rsplit(" ", 1)
+            stacks[stack] += int(count)
+    return stacks
+
+
+def get_hottest_frames(stacks, limit=30):
+    """
+    [(frame, self samples, total samples)] of the frames with the most samples of their own.
+    """
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        # recursive frames are counted once per stack
+        for frame in set(frames):
+            total[frame] += count
+    return [(frame, count, total[frame]) for frame, count in own.most_common(limit)]
+
+
+def render_collapsed(path, limit=30):
+    stacks = read_collapsed(path)
+    samples = sum(stacks.values())
+    lines = [f"{samples} samples", "", f"{'self':>7} {'total':>7}  frame"]
+    for frame, own, total in get_hottest_frames(stacks, limit):
+        lines.append(f"{own / samples:>7.1%} {total / samples:>7.1%}  {frame}")
+    return "\n".join(lines) + "\n"
+
+
+def render_profile(path, sort="cumulative", limit=30):
+    """
+    Text summary of the profile: the pstats table, or the hottest frames of sampled stacks.
+    """
+    if path.endswith(".pstats"):
+        return render_pstats(path, sort=sort, limit=limit)
+    return render_collapsed(path, limit=limit)
+
+
+def _get_color(frame):
+    # stable warm colors, so that the same frame has the same color in every flamegraph
+    hash_ = zlib.crc32(frame.encode())
+    return f"rgb({205 + hash_ % 50},{hash_ // 50 % 180},{hash_ // 9000 % 55})"
+
+
+def render_flamegraph(stacks, title="Flamegraph"):
+    """
+    SVG flamegraph of collapsed stacks, outermost frames at the bottom and frame widths proportional to samples. Hover a frame for its name and samples.
+    """
+
+    def new_node():
+        # [samples, {frame: child node}]
+        return [0, defaultdict(new_node)]
+
+    root = new_node()
+    for stack, count in stacks.items():
+        node = root
+        node[0] += count
+        for frame in stack.split(";"):
+            node = node[1][frame]
+            node[0] += count
+
+    def get_depth(node):
+        return 1 + max((get_depth(child) for child in node[1].values()), default=0)
+
+    samples = root[0] or 1
+    scale = FLAMEGRAPH_WIDTH / samples
+    # a row for the title, and one for each frame depth
+    height = get_depth(root) * FLAMEGRAPH_ROW_HEIGHT
+    rects = []
+
+    def add_rects(node, x, depth):
+        for frame, child in node[1].items():
+            width = child[0] * scale
+            if width >= FLAMEGRAPH_MIN_WIDTH:
+                y = height - (depth + 1) * FLAMEGRAPH_ROW_HEIGHT
+                label = frame[: int(width / 7)] if width > 21 else ""
+                rects.append(
+                    f"<g><title>{html.escape(frame)} ({child[0]} samples, {child[0] / samples:.1%})</title>"
+                    f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FLAMEGRAPH_ROW_HEIGHT - 1}" fill="{_get_color(frame)}"/>'
+                    f'<text x="{x + 3:.1f}" y="{y + FLAMEGRAPH_ROW_HEIGHT - 4}">{html.escape(label)}</text></g>'
+                )
+                add_rects(child, x, depth + 1)
+            x += width
+
+    add_rects(root, 0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAMEGRAPH_WIDTH}" height="{height}" '
+        'font-family="monospace" font-size="11">'
+        f'<text x="{FLAMEGRAPH_WIDTH / 2}" y="{FLAMEGRAPH_ROW_HEIGHT - 3}" text-anchor="middle" font-size="13">'
+        f"{html.escape(title)} ({root[0]} samples)</text>" + "".join(rects) + "</svg>\n"
+    )
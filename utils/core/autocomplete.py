@@ -0,0 +1,215 @@
+"""
+Search as you type, served from memory instead of the database.
+
+Each worker process keeps its own AutocompleteIndex, which is loaded on the first lookup and refreshed incrementally (only rows changed since the last refresh are fetched) whenever the generation of a model it depends on changes (see utils/core/cache.py), or the database has rows updated after the latest one it has seen.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+from utils.core.fuzzy_search import normalize_name
+
+# names share a lot of words
+_normalize_word = functools.lru_cache(maxsize=100_000)(normalize_name)
+
+
+def get_suffix_keys(text):
+    """
+    Returns the normalized key of every word suffix of `text`, so that it can be found by the start of any of its words.
+    For example, "Sher Bahadur Deuba" gives ["serbahadurdeub", "bahadurdeub", "deub"].
+    """
+    words = [_normalize_word(word) for word in (text or "").split()]
+    return ["".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, id) pairs searched with bisect.
+
+    Keys and ids are kept in two parallel arrays instead of a list of tuples, ids in a typed array, to keep the memory per entry low.
+    """
+
+    def __init__(self, entries=()):
+        entries = sorted(entries)
+        self._keys = [key for key, _ in entries]
+        self._ids = array("q", (pk for _, pk in entries))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, pk):
+        position = bisect.bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._ids.insert(position, pk)
+
+    def remove(self, key, pk):
+        position = bisect.bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            if self._ids[position] == pk:
+                del self._keys[position]
+                del self._ids[position]
+                return
+            position += 1
+
+    def search(self, prefix, limit, exclude=()):
+        """
+        Returns up to `limit` distinct ids (not in `exclude`) whose key starts with `prefix`, in key order.
+        """
+        ids = []
+        position = bisect.bisect_left(self._keys, prefix)
+        while (
+            len(ids) < limit
+            and position < len(self._keys)
+            and self._keys[position].startswith(prefix)
+        ):
+            pk = self._ids[position]
+            if pk not in exclude and pk not in ids:
+                ids.append(pk)
+            position += 1
+        return ids
+
+
+class AutocompleteIndex:
+    """
+    In-process autocomplete over the documents of a model, with one PrefixIndex per tier: hits from a tier are returned before hits from the next one.
+
+    Subclasses implement:
+        get_generations(): generations of the models the documents depend on
+        get_db_watermark(): latest updated_at of the rows the documents depend on (deleted rows included), None if there are no rows
+        fetch_documents(since): returns (documents, watermark). documents is {id: (keys, payload) or None if the row should be removed}, where keys has a tuple of normalized keys for each tier, for rows changed at or after `since` (every row if `since` is None). watermark is the latest updated_at seen, `since` of the next refresh is computed from it.
+
+    NOTE: rows hard deleted from the database are only removed by a full reload, see reset(). Soft deleted rows should be returned with a None document.
+    """
+
+    tiers = 1
+
+    # rows committed a bit after their updated_at (long transactions) would be missed by a strict `updated_at > watermark`, so fetch a bit more than needed
+    refresh_overlap = timedelta(seconds=60)
+
+    # if more than this share of documents changed, sorting everything again is faster than inserting one by one
+    rebuild_ratio = 0.1
+
+    # generation bumps of other processes are not seen with a per process cache (locmem), so the database watermark (see get_db_watermark()) is checked as well, at most once in this many seconds
+    db_check_interval = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Drops everything, the next lookup loads every row again.
+        """
+        with self._lock:
+            self.documents = {}
+            self._indexes = [PrefixIndex() for _ in range(self.tiers)]
+            self._generations = None
+            self._watermark = None
+            self._db_watermark = None
+            self._db_checked_at = None
+
+    def get_generations(self):
+        raise NotImplementedError
+
+    def get_db_watermark(self):
+        raise NotImplementedError
+
+    def fetch_documents(self, since):
+        raise NotImplementedError
+
+    def _is_db_check_due(self):
+        now = time.monotonic()
+        if (
+            self._db_checked_at is not None
+            and now - self._db_checked_at < self.db_check_interval
+        ):
+            return False
+        self._db_checked_at = now
+        return True
+
+    def refresh(self):
+        """
+        Loads the rows changed since the last refresh, if the generation of any model has changed since then or the database watermark has moved.
+        """
+        # read before fetching, so that a change made while fetching is picked up on the next refresh
+        generations = self.get_generations()
+
+        with self._lock:
+            if generations == self._generations:
+                if not self._is_db_check_due():
+                    return
+                # NOTE: rows committed with an updated_at older than the latest one (long transactions) are not noticed until another row changes
+                db_watermark = self.get_db_watermark()
+                if db_watermark == self._db_watermark:
+                    return
+            else:
+                # read before fetching as well, so that rows fetched now don't look new on the next check
+                db_watermark = self.get_db_watermark()
+                self._db_checked_at = time.monotonic()
+
+            since = None
+            if self._watermark is not None:
+                since = self._watermark - self.refresh_overlap
+
+            changed_documents, watermark = self.fetch_documents(since)
+
+            if (
+                since is None
+                or len(changed_documents) > len(self.documents) * self.rebuild_ratio
+            ):
+                self._rebuild(changed_documents)
+            else:
+                self._update(changed_documents)
+
+            self._generations = generations
+            self._db_watermark = db_watermark
+            if watermark is not None:
+                self._watermark = max(watermark, self._watermark or watermark)
+
+    def _rebuild(self, changed_documents):
+        documents = {**self.documents, **changed_documents}
+        self.documents = {
+            pk: document for pk, document in documents.items() if document is not None
+        }
+
+        entries = [[] for _ in range(self.tiers)]
+        for pk, (keys, _) in self.documents.items():
+            for tier, tier_keys in enumerate(keys):
+                entries[tier].extend((key, pk) for key in tier_keys)
+        self._indexes = [PrefixIndex(tier_entries) for tier_entries in entries]
+
+    def _update(self, changed_documents):
+        for pk, document in changed_documents.items():
+            old_document = self.documents.pop(pk, None)
+            if old_document is not None:
+                for index, tier_keys in zip(self._indexes, old_document[0]):
+                    for key in tier_keys:
+                        index.remove(key, pk)
+
+            if document is not None:
+                self.documents[pk] = document
+                for index, tier_keys in zip(self._indexes, document[0]):
+                    for key in tier_keys:
+                        index.add(key, pk)
+
+    def search(self, query, limit):
+        """
+        Returns [(id, payload), ...] of up to `limit` documents with a key starting with the normalized query.
+        """
+        self.refresh()
+
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+
+        with self._lock:
+            ids = []
+            for index in self._indexes:
+                ids.extend(index.search(prefix, limit - len(ids), exclude=ids))
+                if len(ids) >= limit:
+                    break
+            return [(pk, self.documents[pk][1]) for pk in ids]
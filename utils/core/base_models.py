@@ -89,10 +89,15 @@ class BaseModel(SafeDeleteModel, TimeAuditModel, UserAuditModel):
     def is_deleted(self):
         return getattr(self, FIELD_NAME, None) is not None
 
-    def save(self, *args, **kwargs):
-        user = get_current_authenticated_user()
+    def set_user_audit_fields(self, user):
+        """
+        Sets created_by (if it is a new row) and updated_by to the user. Also call it for rows created with bulk_create(), which does not call save().
+        """
         if user and not self.pk and not self.created_by:
             self.created_by = user
         if user:
             self.updated_by = user
+
+    def save(self, *args, **kwargs):
+        self.set_user_audit_fields(get_current_authenticated_user())
         super().save(*args, **kwargs)
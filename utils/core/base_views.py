@@ -1,15 +1,88 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
 # from rest_framework_api_key.permissions import HasAPIKey
 
 
-class BaseAPIView(APIView):
+class _NotModified(Exception):
+    """
+    Raised from ConditionalGetMixin.initial() to skip the handler, and turned back into the 304 response in ConditionalGetMixin.handle_exception()
+    """
+
+    def __init__(self, response):
+        super().__init__("Not modified")
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified headers to GET responses and answers If-None-Match / If-Modified-Since with 304 before the handler (and hence any query or serialization) runs.
+
+    Opt in by overriding get_validators() to return (etag, last_modified), see utils/core/general.py:get_model_validators()
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        """
+        Returns (etag, last_modified) for the current GET request. last_modified is a datetime. Either can be None.
+        """
+        return None, None
+
+    def initial(self, request, *args, **kwargs):
+        # authentication, permissions and throttling come first
+        super().initial(request, *args, **kwargs)
+
+        self.etag, self.last_modified = None, None
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        self.etag, self.last_modified = self.get_validators(request, *args, **kwargs)
+        if self.etag is None and self.last_modified is None:
+            return
+
+        response = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=(
+                int(self.last_modified.timestamp()) if self.last_modified else None
+            ),
+        )
+        if response is not None:
+            raise _NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        # getattr since initial() may have failed (authentication, etc.) before setting these
+        etag = getattr(self, "etag", None)
+        last_modified = getattr(self, "last_modified", None)
+        if response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            if etag:
+                response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
+
+
+class BaseAPIView(ConditionalGetMixin, APIView):
     """
     Use PublicAPIView or AuthAPIView, don't use this directly
     """
 
     extra_permissions = []
+    # most queries a request may make (authentication included), checked in DEBUG and tests, see utils/core/query_budget.py
+    # None for no budget, N+1 queries are flagged either way
+    query_budget = None
 
     def get_permissions(self):
         return [
@@ -0,0 +1,269 @@
+"""
+Fast path for loading many new rows at once (for example a whole election dataset), where even bulk_create() is bound by building and sending INSERT statements.
+
+Rows are written to a temporary staging table, with COPY FROM STDIN on Postgres and executemany() on other databases, and moved to the model's table with a single INSERT ... SELECT.
+Foreign keys to rows loaded just before (which have no id yet when the rows are built) are given as the uuid of the referenced row, and remapped to ids by joining the staging table with the referenced table.
+Values that the database or save() would set (uuid, timestamps, defaults) are generated here, so that rows need no round trip of their own. Slugs are allocated for all rows at once, see load_rows_with_unique_slugs().
+
+NOTE: like bulk_create(), save() is not called and no signal is sent.
+"""
+
+import io
+from operator import itemgetter
+
+from django.db import IntegrityError, connection, models, transaction
+from django.utils import timezone
+
+from utils.core.full_text_search import get_search_vector_sql, refresh_search_documents
+from utils.core.slugs import MAX_ATTEMPTS, _is_slug_conflict, allocate_slugs
+
+# rows sent to the staging table at a time
+CHUNK_SIZE = 10_000
+COPY_READ_SIZE = 64 * 1024
+
+# escapes of COPY's text format, see https://www.postgresql.org/docs/current/sql-copy.html
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _format_text(value):
+    return "\\N" if value is None else value.translate(_COPY_ESCAPES)
+
+
+def _format_value(value):
+    # dates, datetimes (with their timezone), decimals, uuids and booleans ("True", "False") are parsed by Postgres the way str() prints them
+    return "\\N" if value is None else str(value)
+
+
+class _CopyFile(io.TextIOBase):
+    """
+    Readable file of rows in COPY's text format, formatted as they are read so that they are streamed instead of being held in memory at once.
+    """
+
+    def __init__(self, rows, formatters):
+        self.lines = (
+            "\t".join([format(value) for format, value in zip(formatters, row)]) + "\n"
+            for row in rows
+        )
+        self.buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        lines = [self.buffer]
+        length = len(self.buffer)
+        for line in self.lines:
+            lines.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        data = "".join(lines)
+        if size < 0:
+            size = len(data)
+        data, self.buffer = data[:size], data[size:]
+        return data
+
+
+class PostgresLoader:
+    @staticmethod
+    def write(cursor, table, columns, fields, rows):
+        sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+        cursor = cursor.cursor
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            formatters = [
+                (
+                    _format_text
+                    if isinstance(field, (models.CharField, models.TextField))
+                    else _format_value
+                )
+                for field in fields
+            ]
+            cursor.copy_expert(sql, _CopyFile(rows, formatters), size=COPY_READ_SIZE)
+        else:
+            # psycopg 3 formats the values itself
+            with cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+
+class ExecuteManyLoader:
+    @staticmethod
+    def write(cursor, table, columns, fields, rows):
+        placeholders = ", ".join(["%s"] * len(columns))
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            (
+                [
+                    field.get_db_prep_save(value, connection)
+                    for field, value in zip(fields, row)
+                ]
+                for row in rows
+            ),
+        )
+
+
+LOADERS = {"postgresql": PostgresLoader}
+
+
+def get_loader(vendor=None):
+    """
+    Returns the loader writing rows to staging tables for the database vendor, executemany() for the ones without a faster way.
+    """
+    return LOADERS.get(vendor or connection.vendor, ExecuteManyLoader)
+
+
+def _get_defaults(fields, user):
+    """
+    Returns ({attname: value}, {attname: function returning the value}) of the fields of new rows, like Model() and save() would set them.
+    """
+    now = timezone.now()
+    values, functions = {}, {}
+    for field in fields:
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            values[field.attname] = now
+        elif field.has_default() and callable(field.default):
+            # for example uuid4, generated for each row
+            functions[field.attname] = field.default
+        else:
+            values[field.attname] = field.get_default()
+    if user:
+        values["created_by_id"] = values["updated_by_id"] = user.pk
+    return values, functions
+
+
+def load_rows(model, rows, references=None, search_document=None, user=None):
+    """
+    Inserts new rows of `model` (with a uuid field, see BaseModel) and returns their ids, in the order of rows.
+
+    Usage:
+        home_address = {"uuid": uuid.uuid4(), "city": "Kathmandu", ...}
+        load_rows(Address, [home_address, ...])
+        load_rows(
+            PoliticalFigure,
+            [{"full_name": ..., "home_address_id": home_address["uuid"], ...}, ...],
+            references={"home_address_id": Address},
+            search_document=POLITICAL_FIGURE_DOCUMENT,
+        )
+
+    :param rows: list of {attname: value} with values as they are stored (for example "NP" for a country). Missing values are generated like save() would (uuid, created_at, ...) or the field's default. Generated uuids are set in the dicts.
+    :param references: {attname: model} of foreign keys given as the uuid of the referenced row instead of its id. NOTE: uuids that don't exist are loaded as null.
+    :param search_document: SearchDocument of the model, computed while inserting the rows on Postgres and refreshed afterwards on other databases
+    :param user: set as created_by and updated_by
+    """
+    if not rows:
+        return []
+
+    references = references or {}
+    table = model._meta.db_table
+    staging = f"{table}_staging"
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+
+    values, functions = _get_defaults(fields, user)
+    for row in rows:
+        for attname, function in functions.items():
+            if attname not in row:
+                row[attname] = function()
+    get_values = itemgetter(*(field.attname for field in fields))
+
+    def iter_rows(chunk):
+        for row in chunk:
+            try:
+                yield get_values(row)
+            except KeyError:
+                # defaults of the values the row does not set
+                yield get_values({**values, **row})
+
+    # the staging table has the columns of the table, with the uuid of the referenced rows for references (joined as r0, r1, ...)
+    aliases = {attname: f"r{number}" for number, attname in enumerate(references)}
+    staging_fields = [
+        (
+            references[field.attname]._meta.get_field("uuid")
+            if field.attname in references
+            else field
+        )
+        for field in fields
+    ]
+    staging_select = ", ".join(
+        (
+            f"{aliases[field.attname]}.uuid AS {field.column}"
+            if field.attname in references
+            else f"t.{field.column}"
+        )
+        for field in fields
+    )
+    empty_joins = " ".join(
+        f"LEFT JOIN {related._meta.db_table} {aliases[attname]} ON 1 = 0"
+        for attname, related in references.items()
+    )
+
+    columns = [field.column for field in fields]
+    # staging rows are aliased as t, like the rows of search documents
+    select_columns = [
+        (
+            f"{aliases[field.attname]}.id"
+            if field.attname in references
+            else f"t.{field.column}"
+        )
+        for field in fields
+    ]
+    joins = [
+        f"LEFT JOIN {related._meta.db_table} {aliases[attname]} ON {aliases[attname]}.uuid = t.{model._meta.get_field(attname).column}"
+        for attname, related in references.items()
+    ]
+    insert_columns = list(columns)
+    search_vector = search_document and get_search_vector_sql(search_document)
+    if search_vector:
+        insert_columns.append(search_vector[0])
+        select_columns.append(search_vector[1])
+        joins.append(search_document.joins)
+
+    loader = get_loader()
+    uuid_field = model._meta.get_field("uuid")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {staging} AS SELECT {staging_select} FROM {table} t {empty_joins} WHERE 1 = 0"
+        )
+        for start in range(0, len(rows), CHUNK_SIZE):
+            loader.write(
+                cursor,
+                staging,
+                columns,
+                staging_fields,
+                iter_rows(rows[start : start + CHUNK_SIZE]),
+            )
+        # statistics of the staging table, so that the references are joined with a plan for its size
+        cursor.execute(f"ANALYZE {staging}")
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(insert_columns)}) SELECT {', '.join(select_columns)} FROM {staging} t {' '.join(joins)} RETURNING uuid, id"
+        )
+        ids = {uuid_field.to_python(value): pk for value, pk in cursor.fetchall()}
+        cursor.execute(f"DROP TABLE {staging}")
+
+        ids = [ids[row["uuid"]] for row in rows]
+        if search_document and not search_vector:
+            refresh_search_documents(search_document, ids=ids)
+
+    return ids
+
+
+def load_rows_with_unique_slugs(
+    model, rows, base_slugs, slug_field="slug", max_length=50, **kwargs
+):
+    """
+    load_rows() with a unique slug allocated from each base slug (in the same order), allocating every slug again if any of them is taken concurrently, see bulk_create_with_unique_slugs().
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        slugs = allocate_slugs(model, base_slugs, slug_field, max_length)
+        for row, slug in zip(rows, slugs):
+            row[slug_field] = slug
+        try:
+            with transaction.atomic():
+                return load_rows(model, rows, **kwargs)
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS or not _is_slug_conflict(
+                model, slugs, slug_field
+            ):
+                raise
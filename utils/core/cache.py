@@ -0,0 +1,130 @@
+import functools
+import hashlib
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from utils.core.metrics import record_cache_lookups
+
+GENERATION_KEY_PREFIX = "generation"
+RESPONSE_KEY_PREFIX = "response"
+
+# cached body of responses that are already rendered (not DRF responses), see utils/core/response_wrappers.py:PreRenderedOKResponse
+RenderedContent = namedtuple("RenderedContent", ["content", "content_type"])
+
+
+def _get_generation_key(model):
+    return f"{GENERATION_KEY_PREFIX}:{model._meta.label_lower}"
+
+
+def _new_generation():
+    # NOTE: if the generation key is evicted, starting again from 1 could reuse an old generation and serve stale responses, so start from current time in ms
+    return int(time.time() * 1000)
+
+
+def get_model_generation(model):
+    """
+    Returns the current generation of the model. It changes every time bump_model_generation() is called for the model.
+    """
+    key = _get_generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        # add() does not overwrite if another worker has set it in the meantime
+        cache.add(key, _new_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_model_generation(model):
+    """
+    Invalidates every cached response that depends on the model in O(1) by changing its generation.
+    Old responses are not deleted, they just can't be looked up anymore and will expire on their own.
+    """
+    key = _get_generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # key does not exist (never set or evicted)
+        cache.set(key, _new_generation(), timeout=None)
+
+
+def bump_model_generation_on_commit(*models):
+    """
+    Bumps the generation of the models after the current transaction is committed, so that a response built from uncommitted data is never cached under the new generation.
+    If there's no transaction, it is bumped immediately.
+    """
+    transaction.on_commit(lambda: [bump_model_generation(model) for model in models])
+
+
+def get_response_cache_key(request, view_name, models):
+    generations = ":".join(str(get_model_generation(model)) for model in models)
+    # sort query params so that ?a=1&b=2 and ?b=2&a=1 share the same cache entry
+    query = "&".join(
+        f"{key}={value}"
+        for key, values in sorted(request.query_params.lists())
+        for value in values
+    )
+    # NOTE: pre-rendered bytes only fit the renderer they were rendered for (JSON without indentation, see utils/core/json_fragments.py:accepts_json), so the media type DRF accepted is a part of the key as well
+    media_type = getattr(request, "accepted_media_type", None) or ""
+    digest = hashlib.md5(f"{request.path}?{query}|{media_type}".encode()).hexdigest()
+    return f"{RESPONSE_KEY_PREFIX}:{view_name}:{generations}:{digest}"
+
+
+def cache_response(*models, timeout=None):
+    """
+    Caches the data of successful responses of a view method in django's cache, keyed by the request path, query params, accepted media type and the generation of every model the response depends on.
+
+    Usage:
+        class GetPoliticalPartyListAPI(PublicAPIView):
+            @cache_response(PoliticalParty)
+            def get(self, request):
+                ...
+
+    NOTE: It should only be used on views whose response is the same for every user, since the user is not a part of the cache key.
+    NOTE: Data is cached (not the rendered bytes), so the response is still rendered according to content negotiation. Responses that are not DRF responses (already rendered) are cached as bytes, for the accepted media type only.
+    """
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED:
+                return view_method(self, request, *args, **kwargs)
+
+            key = get_response_cache_key(request, self.__class__.__name__, models)
+            cached = cache.get(key)
+            if cached is None:
+                record_cache_lookups("response", misses=1)
+            else:
+                record_cache_lookups("response", hits=1)
+            if isinstance(cached, RenderedContent):
+                return HttpResponse(
+                    cached.content,
+                    content_type=cached.content_type,
+                    status=status.HTTP_200_OK,
+                )
+            if cached is not None:
+                return Response(data=cached, status=status.HTTP_200_OK)
+
+            response = view_method(self, request, *args, **kwargs)
+            # NOTE: streamed responses are not cached, their whole body would have to be kept in memory
+            if response.status_code == status.HTTP_200_OK and not response.streaming:
+                if isinstance(response, Response):
+                    cached = response.data
+                else:
+                    cached = RenderedContent(response.content, response["Content-Type"])
+                cache.set(
+                    key,
+                    cached,
+                    timeout=timeout or settings.RESPONSE_CACHE_TIMEOUT,
+                )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,217 @@
+"""
+"Compiled" output serializers and a fast JSON renderer for hot read views.
+
+DRF serializers get every field of every row one by one from model instances (to_representation of each field, through its source), and the JSON encoder calls back into python for dates, uuids, etc.
+CompiledSerializer instead reads rows as values_list() tuples and maps them to dicts of json native values with accessors precomputed once per serializer and set of fields, and render_native_json() renders them without any python callbacks.
+
+The output is the same as the serializer's (and the rendered bytes the same as DRF's JSONRenderer), field types that can't be compiled are refused when the serializer is compiled instead of silently rendered differently.
+"""
+
+import json
+import operator
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from utils.core.metrics import measure_serialization
+
+# same options as DRF's JSONRenderer (UNICODE_JSON, COMPACT_JSON and STRICT_JSON defaults), without its encoder's default() for non native types
+_encoder = json.JSONEncoder(
+    ensure_ascii=JSONRenderer.ensure_ascii,
+    allow_nan=not JSONRenderer.strict,
+    separators=(",", ":") if JSONRenderer.compact else (", ", ": "),
+)
+
+
+def render_native_json(data):
+    """
+    Renders data of json native types (dict, list, str, int, float, bool, None) to the same bytes as DRF's JSONRenderer.
+
+    :raises TypeError: if data contains other types
+    """
+    rendered = _encoder.encode(data)
+    # JSONRenderer escapes these as well, they are valid json but not valid javascript
+    return rendered.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+def _none_or(convert):
+    # like Serializer.to_representation(), None is never passed to the field
+    return lambda value: None if value is None else convert(value)
+
+
+def _get_converter(field, model_field):
+    """
+    Returns a function converting the values() value of the field to its output, or None if the value is output as is.
+    """
+    if isinstance(field, serializers.ChoiceField):
+        choices = field.choice_strings_to_values
+        return lambda value: (
+            value if value in ("", None) else choices.get(str(value), value)
+        )
+    if isinstance(field, serializers.FileField):
+        # values() gives the file name, FileField.to_representation() outputs its url (always relative, since views don't pass the request in the serializer context)
+        storage = model_field.storage
+        return lambda value: storage.url(value) if value else None
+    if isinstance(field, (serializers.CharField, serializers.IntegerField)):
+        # values() of char, text, slug, url and integer columns are already str and int
+        return None
+    if isinstance(field, serializers.BooleanField):
+        return None
+    if isinstance(field, serializers.DateField):
+        return _none_or(lambda value: value.isoformat())
+    if isinstance(field, serializers.UUIDField):
+        return _none_or(str)
+    if isinstance(field, serializers.DecimalField):
+        # these take the raw value as is, reuse them so that formatting options are respected
+        return _none_or(field.to_representation)
+
+    raise ImproperlyConfigured(
+        f"CompiledSerializer does not support {type(field).__name__} ({field.field_name})"
+    )
+
+
+class CompiledSerializer:
+    """
+    Usage:
+        compiled = CompiledSerializer(GetPoliticalFigureDetailAPI.OutputSerializer)
+        data = compiled.serialize(PoliticalFigure.objects.filter(...), fields=["id", "slug"])
+        return FastOKResponse(data=data)
+
+    Supported: ModelSerializer fields with a dotted source (for example "political_party.name") and nested ModelSerializers. A nested serializer whose relation is null is output as None.
+
+    NOTE: a dotted source through a null relation outputs None, where the serializer would raise AttributeError.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        # (fields tuple or None for all, leading lookups) -> (lookups, build)
+        self._compiled = {}
+
+    def _compile_serializer(self, serializer, prefix, lookups, field_names=None):
+        """
+        Appends the values() lookups of the serializer's fields to `lookups`, and returns [(output name, accessor of a values_list() row), ...]
+        """
+        model = serializer.Meta.model
+        accessors = []
+
+        for name, field in serializer.fields.items():
+            if field_names is not None and name not in field_names:
+                continue
+            if field.write_only:
+                continue
+
+            if isinstance(field, serializers.ModelSerializer):
+                # null relation -> None, checked with the foreign key itself
+                null_index = len(lookups)
+                lookups.append(f"{prefix}{field.source}")
+                nested = self._compile_serializer(
+                    field, f"{prefix}{field.source}__", lookups
+                )
+                accessors.append((name, self._make_nested_accessor(null_index, nested)))
+                continue
+
+            if field.source == "*" or isinstance(
+                field, (serializers.SerializerMethodField, serializers.Serializer)
+            ):
+                raise ImproperlyConfigured(
+                    f"CompiledSerializer does not support {type(field).__name__} ({name})"
+                )
+
+            # "political_party.name" -> political_party__name, and its model field for file storage
+            path = field.source.split(".")
+            model_field = model._meta.get_field(path[0])
+            for part in path[1:]:
+                model_field = model_field.related_model._meta.get_field(part)
+
+            index = len(lookups)
+            lookups.append(prefix + "__".join(path))
+            convert = _get_converter(field, model_field)
+            if convert is None:
+                accessors.append((name, operator.itemgetter(index)))
+            else:
+                accessors.append(
+                    (
+                        name,
+                        lambda row, index=index, convert=convert: convert(row[index]),
+                    )
+                )
+
+        return accessors
+
+    @staticmethod
+    def _make_nested_accessor(null_index, accessors):
+        def accessor(row):
+            if row[null_index] is None:
+                return None
+            return {name: get(row) for name, get in accessors}
+
+        return accessor
+
+    def compile(self, fields=None, leading=()):
+        """
+        Returns (values_list() lookups, function building the output dict of a row) for the output fields (None for all).
+
+        :param leading: lookups selected before the output columns, for example ("pk", "created_at") for KeysetPagination, they are not output
+        """
+        key = (tuple(fields) if fields is not None else None, tuple(leading))
+        if key not in self._compiled:
+            lookups = list(leading)
+            accessors = self._compile_serializer(
+                self.serializer_class(), "", lookups, field_names=fields
+            )
+
+            def build(row):
+                return {name: get(row) for name, get in accessors}
+
+            self._compiled[key] = (lookups, build)
+        return self._compiled[key]
+
+    def serialize(self, queryset, fields=None):
+        """
+        Returns the output of every row of the queryset (in its order), as the serializer would with many=True.
+
+        :param queryset: model queryset, its select_related() and only() don't matter since values_list() selects exactly the needed columns
+        :param fields: output fields (see utils/core/sparse_fieldsets.py), defaults to None (all fields)
+        """
+        lookups, build = self.compile(fields)
+        # rows are fetched first, so that the query isn't counted as serialization time
+        rows = list(queryset.values_list(*lookups))
+        with measure_serialization():
+            return [build(row) for row in rows]
+
+    def serialize_one(self, queryset, fields=None):
+        """
+        Returns the output of the only row of the queryset, or None if there's none.
+        """
+        rows = self.serialize(queryset[:1], fields=fields)
+        return rows[0] if rows else None
+
+    def serialize_chunks(self, queryset, fields=None, chunk_size=2000):
+        """
+        Yields the output of the rows of the queryset in lists of at most `chunk_size`, reading them with a server-side cursor (QuerySet.iterator()) so that only one chunk is in memory at a time.
+        """
+        lookups, build = self.compile(fields)
+        chunk = []
+        for row in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+            chunk.append(build(row))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def get_rows(self, queryset, fields=None, leading=()):
+        """
+        Returns the queryset as named rows, whose `leading` lookups are attributes, for when the rows are needed before they are serialized with serialize_rows(), for example to paginate them.
+        """
+        lookups, _ = self.compile(fields, leading)
+        return queryset.values_list(*lookups, named=True)
+
+    def serialize_rows(self, rows, fields=None, leading=()):
+        """
+        Returns the output of rows from get_rows() with the same fields and leading lookups.
+        """
+        _, build = self.compile(fields, leading)
+        with measure_serialization():
+            return [build(row) for row in rows]
@@ -0,0 +1,225 @@
+"""
+Full dataset exports (NDJSON, CSV and a compressed columnar format), streamed from a server-side cursor so that memory doesn't grow with the number of rows.
+Used by the export endpoints and `python manage.py export_dataset`.
+
+Columnar format: a gzip stream of one json object per line, each holding a row group (up to `chunk_size` rows) as {"rows": n, "columns": {name: [values]}}.
+Values of a column are stored next to each other (like parquet row groups), so it compresses much better than NDJSON and can be loaded column by column, for example with pandas:
+
+    groups = [json.loads(line) for line in gzip.open("political_figures.columnar.json.gz")]
+    df = pd.concat(pd.DataFrame(group["columns"]) for group in groups)
+"""
+
+import csv
+import io
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+from django.db import models
+from django.http import StreamingHttpResponse
+from drf_spectacular.utils import OpenApiParameter
+
+from utils.core.compiled_serializers import render_native_json
+from utils.core.exceptions import ApplicationError
+
+# NOTE: not "format", DRF uses ?format= to pick the renderer
+FORMAT_QUERY_PARAM = "file_format"
+
+# rows fetched from the database at a time, and rows per row group of the columnar format
+EXPORT_CHUNK_SIZE = 5000
+
+
+def _isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+def _get_value_converter(model_field):
+    """
+    Returns a function converting the values() value of the model field to a json native value, or None if it already is one.
+    """
+    if isinstance(model_field, models.FileField):
+        storage = model_field.storage
+        return lambda value: storage.url(value) if value else None
+    if isinstance(model_field, (models.DateField, models.TimeField)):
+        # DateTimeField is a DateField
+        return _isoformat
+    if isinstance(model_field, (models.UUIDField, models.DecimalField)):
+        return _to_str
+    return None
+
+
+def _get_model_field(model, lookup):
+    parts = lookup.split("__")
+    model_field = model._meta.get_field(parts[0])
+    for part in parts[1:]:
+        model_field = model_field.related_model._meta.get_field(part)
+    return model_field
+
+
+@dataclass
+class ExportDataset:
+    """
+    Args:
+        name (str): used in file names, for example "political_figures".
+        get_queryset (callable): returns the queryset of the exported rows.
+        columns (dict): {column name: ORM lookup}, relations are flattened with lookups like "political_party__name".
+    """
+
+    name: str
+    get_queryset: Callable
+    columns: Dict[str, str]
+
+    def iter_chunks(self, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Yields lists of at most `chunk_size` rows (tuples of json native values in the order of `columns`), read with a server-side cursor.
+        """
+        queryset = self.get_queryset()
+        lookups = list(self.columns.values())
+        converters = [
+            (index, convert)
+            for index, lookup in enumerate(lookups)
+            if (
+                convert := _get_value_converter(
+                    _get_model_field(queryset.model, lookup)
+                )
+            )
+        ]
+
+        rows = queryset.order_by("pk").values_list(*lookups).iterator(chunk_size)
+        chunk = []
+        for row in rows:
+            if converters:
+                row = list(row)
+                for index, convert in converters:
+                    row[index] = convert(row[index])
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def export_ndjson(columns, chunks):
+    names = list(columns)
+    for chunk in chunks:
+        yield b"".join(
+            render_native_json(dict(zip(names, row))) + b"\n" for row in chunk
+        )
+
+
+def export_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        # NOTE: csv writes None as an empty string, so null and "" can't be told apart
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # only the header if there are no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_columnar(columns, chunks):
+    names = list(columns)
+    # wbits=31: gzip container, so the output can be read with gzip.open()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        group = {
+            "rows": len(chunk),
+            "columns": dict(zip(names, map(list, zip(*chunk)))),
+        }
+        compressed = compressor.compress(render_native_json(group) + b"\n")
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@dataclass
+class ExportFormat:
+    name: str
+    extension: str
+    content_type: str
+    export: Callable
+
+
+EXPORT_FORMATS = {
+    export_format.name: export_format
+    for export_format in [
+        ExportFormat("ndjson", "ndjson", "application/x-ndjson", export_ndjson),
+        ExportFormat("csv", "csv", "text/csv; charset=utf-8", export_csv),
+        ExportFormat(
+            "columnar", "columnar.json.gz", "application/gzip", export_columnar
+        ),
+    ]
+}
+
+
+def get_export_format(name):
+    """
+    :raises ApplicationError: if the format is unknown
+    """
+    try:
+        return EXPORT_FORMATS[name]
+    except KeyError:
+        raise ApplicationError(
+            "Invalid format",
+            extra={FORMAT_QUERY_PARAM: f"Must be one of {', '.join(EXPORT_FORMATS)}"},
+        )
+
+
+def export_dataset(dataset, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields the exported bytes of the dataset in the format, lazily.
+
+    Usage:
+        with open("political_figures.csv", "wb") as file:
+            for data in export_dataset(PoliticalFigureUtil.export_dataset, EXPORT_FORMATS["csv"]):
+                file.write(data)
+    """
+    return export_format.export(
+        dataset.columns, dataset.iter_chunks(chunk_size=chunk_size)
+    )
+
+
+def get_export_filename(dataset, export_format):
+    return f"{dataset.name}.{export_format.extension}"
+
+
+def get_export_response(dataset, request):
+    """
+    Returns a streamed file download of the dataset, in the format of the request's ?file_format= (ndjson by default).
+
+    :raises ApplicationError: if the format is unknown
+    """
+    export_format = get_export_format(
+        request.query_params.get(FORMAT_QUERY_PARAM, "ndjson")
+    )
+    filename = get_export_filename(dataset, export_format)
+    return StreamingHttpResponse(
+        export_dataset(dataset, export_format),
+        content_type=export_format.content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def get_export_schema_parameters():
+    """
+    Query parameters for drf-spectacular's extend_schema(parameters=...)
+    """
+    return [
+        OpenApiParameter(
+            name=FORMAT_QUERY_PARAM,
+            type=str,
+            required=False,
+            enum=list(EXPORT_FORMATS),
+            description="Export format, defaults to ndjson",
+        )
+    ]
@@ -0,0 +1,176 @@
+"""
+Faceted filtering: list views can be filtered by a few fields (facets), and can return the number of rows for each value of a facet, so that the UI can show "Female (12)" next to each filter option.
+
+Counts of a facet are computed with the filters of every other facet applied, but not its own, so that the other options of a facet that is already filtered on still show how many rows they would add.
+Each facet's counts are one grouped aggregate query (GROUP BY the facet field), regardless of the number of values.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.db.models import Count
+from drf_spectacular.utils import OpenApiParameter
+
+from utils.core.exceptions import ApplicationError
+
+FACETS_QUERY_PARAM = "facets"
+
+TRUE_VALUES = {"true", "1", "yes"}
+FALSE_VALUES = {"false", "0", "no"}
+
+
+def parse_bool(value):
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError("Must be true or false")
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("Must be integers")
+
+
+def choice_parser(choices):
+    """
+    Returns a parser that only accepts the values of `choices`, for example a TextChoices class.
+    """
+    values = [str(value) for value in choices.values]
+
+    def parse(value):
+        if value not in values:
+            raise ValueError(f"Must be one of {', '.join(values)}")
+        return value
+
+    return parse
+
+
+@dataclass
+class Facet:
+    """
+    Args:
+        name (str): query param used for filtering (comma separated values, any of them matches) and the key of its counts.
+        field (str): ORM lookup of the field, for example "home_address__city".
+        parse (callable): converts a query param value to the field's type, raises ValueError if it is invalid.
+        label_field (str): optional ORM lookup of a human readable label grouped along with the field, for example the party name for the party id.
+        get_label (callable): optional, returns the label of a value, for example the country name of a country code.
+    """
+
+    name: str
+    field: str
+    parse: Callable = str
+    label_field: Optional[str] = None
+    get_label: Optional[Callable] = None
+
+    @property
+    def description(self):
+        return f"Comma separated values of {self.field.replace('__', ' ')}, any of them matches"
+
+
+def get_facet_filters(request, facets):
+    """
+    Returns {facet name: [parsed values]} of the facets sent in the query params.
+
+    :raises ApplicationError: if a value is invalid
+    """
+    filters = {}
+    errors = {}
+    for facet in facets:
+        value = request.query_params.get(facet.name)
+        if value is None:
+            continue
+        values = [item.strip() for item in value.split(",") if item.strip()]
+        try:
+            filters[facet.name] = [facet.parse(item) for item in values]
+        except ValueError as e:
+            errors[facet.name] = str(e) or "Invalid value"
+    if errors:
+        raise ApplicationError("Invalid filters", extra=errors)
+    return filters
+
+
+def get_requested_facets(request, facets):
+    """
+    Returns the facets whose counts are requested with ?facets=a,b (none if it is not sent).
+
+    :raises ApplicationError: if an unknown facet is requested
+    """
+    value = request.query_params.get(FACETS_QUERY_PARAM)
+    if not value:
+        return []
+
+    facets_by_name = {facet.name: facet for facet in facets}
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in facets_by_name]
+    if unknown:
+        raise ApplicationError(
+            "Invalid facets",
+            extra={FACETS_QUERY_PARAM: f"Unknown facet(s): {', '.join(unknown)}"},
+        )
+    return [facets_by_name[name] for name in dict.fromkeys(names)]
+
+
+def filter_by_facets(queryset, facets, filters, exclude=None):
+    """
+    Applies the facet filters (AND across facets, OR within a facet), except the facet named `exclude`.
+    """
+    for facet in facets:
+        if facet.name == exclude or facet.name not in filters:
+            continue
+        queryset = queryset.filter(**{f"{facet.field}__in": filters[facet.name]})
+    return queryset
+
+
+def get_facet_counts(queryset, facets, filters, requested_facets, max_values=50):
+    """
+    Returns {facet name: [{"value", "label", "count"}, ...]} for the requested facets, most common first, at most `max_values` per facet.
+    Null values (for example figures without a party) are counted under a null value.
+
+    :param queryset: unfiltered queryset, facet filters are applied here
+    """
+    counts = {}
+    for facet in requested_facets:
+        group_by = [facet.field] + ([facet.label_field] if facet.label_field else [])
+        rows = (
+            filter_by_facets(queryset, facets, filters, exclude=facet.name)
+            .order_by()
+            .values(*group_by)
+            .annotate(count=Count("pk"))
+            .order_by("-count", facet.field)[:max_values]
+        )
+
+        items = []
+        for row in rows:
+            value = row[facet.field]
+            if facet.label_field:
+                label = row[facet.label_field]
+            elif facet.get_label and value is not None:
+                label = facet.get_label(value)
+            else:
+                label = value
+            items.append({"value": value, "label": label, "count": row["count"]})
+        counts[facet.name] = items
+    return counts
+
+
+def get_facet_schema_parameters(facets):
+    """
+    Query parameters for drf-spectacular's extend_schema(parameters=...)
+    """
+    return [
+        OpenApiParameter(
+            name=facet.name, type=str, required=False, description=facet.description
+        )
+        for facet in facets
+    ] + [
+        OpenApiParameter(
+            name=FACETS_QUERY_PARAM,
+            type=str,
+            required=False,
+            description=f"Comma separated facets to return counts for, under `facets` of the response. Available: {', '.join(facet.name for facet in facets)}",
+        )
+    ]
@@ -0,0 +1,328 @@
+"""
+Full text search over models, using a tsvector column with a GIN index on Postgres, and an FTS5 virtual table on SQLite (so that tests and local setups work without Postgres).
+
+The search structures are not django model fields, they are created by migrations (see apps/political_figure/migrations/0004_full_text_search.py) and kept up to date with raw SQL whenever the rows are saved, see PoliticalFigure.save() and PoliticalParty.save().
+"""
+
+import unicodedata
+from dataclasses import dataclass
+from itertools import groupby
+from typing import List, Tuple
+
+from django.db import connection
+from drf_spectacular.utils import OpenApiParameter
+
+from utils.core.exceptions import ApplicationError, InternalApplicationError
+
+# NOTE: "simple" config, cause stemming for english would do more harm than good for Nepali names
+POSTGRES_SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+# ts_rank weights for D, C, B, A, and bm25 weights for the same letters in FTS5
+WEIGHTS = {"A": 10.0, "B": 5.0, "C": 1.0, "D": 0.5}
+
+# sqlite's limit of variables in a query is 999 in older versions
+ID_CHUNK_SIZE = 500
+
+
+@dataclass
+class SearchDocument:
+    """
+    Describes the searchable text of a table.
+
+    Args:
+        table (str): db_table of the model, aliased as `t` in expressions and joins.
+        fields (list): (name, weight, sql expression) for each searchable part. weight is one of A (most important), B, C, D.
+        joins (str): joins needed by the expressions (for example, the political party of a figure).
+    """
+
+    table: str
+    fields: List[Tuple[str, str, str]]
+    joins: str = ""
+
+    @property
+    def fts_table(self):
+        return f"{self.table}_fts"
+
+
+POLITICAL_FIGURE_DOCUMENT = SearchDocument(
+    table="political_figure",
+    fields=[
+        ("full_name", "A", "t.full_name"),
+        ("party", "B", "COALESCE(p.name, '') || ' ' || COALESCE(p.abbreviation, '')"),
+        ("biography", "C", "t.biography"),
+    ],
+    joins="LEFT JOIN political_party p ON p.id = t.political_party_id",
+)
+
+# same document, for figures whose party is being deleted (their political_party is still set until it is, see PoliticalPartyUtil.delete_political_party())
+POLITICAL_FIGURE_WITHOUT_PARTY_DOCUMENT = SearchDocument(
+    table="political_figure",
+    fields=[
+        ("full_name", "A", "t.full_name"),
+        ("party", "B", "''"),
+        ("biography", "C", "t.biography"),
+    ],
+)
+
+POLITICAL_PARTY_DOCUMENT = SearchDocument(
+    table="political_party",
+    fields=[
+        ("name", "A", "t.name || ' ' || t.abbreviation"),
+        ("ideology", "B", "t.ideology"),
+        ("description", "C", "t.description"),
+    ],
+)
+
+
+def _is_word_character(char):
+    # NOTE: \w doesn't match combining marks (Mn, Mc), such as the vowel signs and viramas of Devanagari, which are parts of words
+    return char.isalnum() or char == "_" or unicodedata.category(char)[0] == "M"
+
+
+def tokenize_query(query):
+    """
+    Splits the user's query into word tokens, so that no search syntax (quotes, operators, etc.) from the user ever reaches the database.
+    """
+    return [
+        "".join(chars)
+        for is_word, chars in groupby(query.lower(), _is_word_character)
+        if is_word
+    ]
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[i : i + ID_CHUNK_SIZE]
+
+
+class PostgresSearchBackend:
+    @staticmethod
+    def create_sql(document: SearchDocument):
+        return [
+            f"ALTER TABLE {document.table} ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector",
+            f"CREATE INDEX IF NOT EXISTS {document.table}_{SEARCH_VECTOR_COLUMN}_idx ON {document.table} USING GIN ({SEARCH_VECTOR_COLUMN})",
+        ]
+
+    @staticmethod
+    def drop_sql(document: SearchDocument):
+        return [
+            f"DROP INDEX IF EXISTS {document.table}_{SEARCH_VECTOR_COLUMN}_idx",
+            f"ALTER TABLE {document.table} DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}",
+        ]
+
+    @staticmethod
+    def vector_sql(document: SearchDocument):
+        return " || ".join(
+            f"setweight(to_tsvector('{POSTGRES_SEARCH_CONFIG}', COALESCE({expression}, '')), '{weight}')"
+            for _, weight, expression in document.fields
+        )
+
+    @staticmethod
+    def refresh_sql(document: SearchDocument, where):
+        vector = PostgresSearchBackend.vector_sql(document)
+        return f"""
+            UPDATE {document.table} AS target SET {SEARCH_VECTOR_COLUMN} = d.vector
+            FROM (
+                SELECT t.id, {vector} AS vector
+                FROM {document.table} t {document.joins}
+                WHERE {where}
+            ) d
+            WHERE target.id = d.id
+        """
+
+    @staticmethod
+    def search_sql(document: SearchDocument):
+        weights = ", ".join(str(WEIGHTS[letter] / WEIGHTS["A"]) for letter in "DCBA")
+        return f"""
+            SELECT t.id
+            FROM {document.table} t, to_tsquery('{POSTGRES_SEARCH_CONFIG}', %s) query
+            WHERE t.{SEARCH_VECTOR_COLUMN} @@ query AND t.deleted IS NULL
+            ORDER BY ts_rank('{{{weights}}}', t.{SEARCH_VECTOR_COLUMN}, query) DESC, t.id DESC
+            LIMIT %s OFFSET %s
+        """
+
+    @staticmethod
+    def build_query(tokens):
+        # every token must match, last one as a prefix so that partially typed words match as well
+        return " & ".join(tokens[:-1] + [f"{tokens[-1]}:*"])
+
+
+class SQLiteSearchBackend:
+    @staticmethod
+    def vector_sql(document: SearchDocument):
+        # documents are rows of the FTS5 table, not a column of the row
+        return None
+
+    @staticmethod
+    def create_sql(document: SearchDocument):
+        columns = ", ".join(name for name, _, _ in document.fields)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {document.fts_table} USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')",
+        ]
+
+    @staticmethod
+    def drop_sql(document: SearchDocument):
+        return [f"DROP TABLE IF EXISTS {document.fts_table}"]
+
+    @staticmethod
+    def refresh_sql(document: SearchDocument, where):
+        # FTS5 tables can't be updated from a join, so delete and insert again (rowid is the id of the row)
+        columns = ", ".join(name for name, _, _ in document.fields)
+        expressions = ", ".join(
+            f"COALESCE({expression}, '')" for _, _, expression in document.fields
+        )
+        return [
+            f"DELETE FROM {document.fts_table} WHERE rowid IN (SELECT t.id FROM {document.table} t WHERE {where})",
+            f"""
+            INSERT INTO {document.fts_table} (rowid, {columns})
+            SELECT t.id, {expressions}
+            FROM {document.table} t {document.joins}
+            WHERE {where}
+            """,
+        ]
+
+    @staticmethod
+    def search_sql(document: SearchDocument):
+        # bm25() is lower for better matches
+        weights = ", ".join(str(WEIGHTS[weight]) for _, weight, _ in document.fields)
+        return f"""
+            SELECT t.id
+            FROM {document.fts_table}
+            JOIN {document.table} t ON t.id = {document.fts_table}.rowid
+            WHERE {document.fts_table} MATCH %s AND t.deleted IS NULL
+            ORDER BY bm25({document.fts_table}, {weights}), t.id DESC
+            LIMIT %s OFFSET %s
+        """
+
+    @staticmethod
+    def build_query(tokens):
+        # implicit AND between quoted tokens, last one as a prefix
+        return " ".join([f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*'])
+
+
+BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend(vendor=None):
+    """
+    Returns the search backend for the database vendor, or None if full text search is not supported for it.
+    """
+    return BACKENDS.get(vendor or connection.vendor)
+
+
+def _execute(cursor, sql, params=()):
+    statements = sql if isinstance(sql, list) else [sql]
+    for statement in statements:
+        cursor.execute(statement, params)
+
+
+def create_search_structures(schema_editor, document: SearchDocument):
+    """
+    Used in migrations to create the search column/table and fill it for existing rows.
+    """
+    backend = get_search_backend(schema_editor.connection.vendor)
+    if backend is None:
+        return
+
+    for sql in backend.create_sql(document):
+        schema_editor.execute(sql)
+
+    with schema_editor.connection.cursor() as cursor:
+        _execute(cursor, backend.refresh_sql(document, where="1 = 1"))
+
+
+def drop_search_structures(schema_editor, document: SearchDocument):
+    backend = get_search_backend(schema_editor.connection.vendor)
+    if backend is None:
+        return
+
+    for sql in backend.drop_sql(document):
+        schema_editor.execute(sql)
+
+
+def refresh_search_documents(document: SearchDocument, ids=None, column="id"):
+    """
+    Rebuilds the searchable text of the rows whose `column` is in `ids`, in a few set based queries (no matter how many rows).
+
+    Args:
+        document (SearchDocument): the document to refresh.
+        ids (iterable): values of `column` to refresh.
+        column (str): Defaults to "id". For example, "political_party_id" to refresh all figures of some parties.
+    """
+    backend = get_search_backend()
+    if backend is None or not ids:
+        return
+
+    with connection.cursor() as cursor:
+        for chunk in _chunks(ids):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            sql = backend.refresh_sql(document, where=f"t.{column} IN ({placeholders})")
+            _execute(cursor, sql, chunk)
+
+
+def get_search_vector_sql(document: SearchDocument):
+    """
+    Returns (column, sql expression) of the searchable text of a row aliased as `t` (with document.joins), to compute it while inserting rows (see utils/core/bulk_load.py), or None if the backend keeps it outside of the row (rows must be refreshed after they are inserted).
+    """
+    backend = get_search_backend()
+    vector = backend and backend.vector_sql(document)
+    return (SEARCH_VECTOR_COLUMN, vector) if vector else None
+
+
+def search(document: SearchDocument, query, limit, offset=0):
+    """
+    Returns ids of non deleted rows matching every word of `query` (last word as a prefix), best match first.
+    """
+    backend = get_search_backend()
+    if backend is None:
+        raise InternalApplicationError(
+            f"Full text search is not supported for {connection.vendor}"
+        )
+
+    tokens = tokenize_query(query)
+    if not tokens:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            backend.search_sql(document),
+            [backend.build_query(tokens), limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+SEARCH_QUERY_PARAM = "q"
+
+
+def get_search_query(request):
+    """
+    Returns the ?q= query param.
+
+    :raises ApplicationError: if it is missing or has no words
+    """
+    query = request.query_params.get(SEARCH_QUERY_PARAM, "")
+    if not tokenize_query(query):
+        raise ApplicationError(
+            "Search query is required",
+            extra={SEARCH_QUERY_PARAM: "Must contain at least one word"},
+        )
+    return query
+
+
+def get_search_schema_parameters():
+    """
+    Query parameters for drf-spectacular's extend_schema(parameters=...)
+    """
+    return [
+        OpenApiParameter(
+            name=SEARCH_QUERY_PARAM,
+            type=str,
+            required=True,
+            description="Search query. Every word must match, the last word can be partial",
+        )
+    ]
@@ -0,0 +1,370 @@
+"""
+Typo tolerant, transliteration aware name lookup.
+
+Names are normalized once at write time into a `search_key` field (see normalize_name() and PoliticalFigure.save()), and looked up by trigram similarity (pg_trgm on Postgres, with a GIN index created by migrations; python implementation registered as a SQLite function so that tests and local setups work without Postgres).
+"""
+
+import re
+import unicodedata
+
+from django.db import connection
+from drf_spectacular.utils import OpenApiParameter
+
+from utils.core.exceptions import ApplicationError, InternalApplicationError
+
+SEARCH_KEY_MAX_LENGTH = 255
+
+# pg_trgm's default similarity threshold
+SIMILARITY_THRESHOLD = 0.3
+
+FUZZY_QUERY_PARAM = "q"
+FUZZY_LIMIT_QUERY_PARAM = "limit"
+DEFAULT_FUZZY_LIMIT = 10
+MAX_FUZZY_LIMIT = 50
+
+
+# ---------- NORMALIZATION ----------
+
+DEVANAGARI_VOWELS = {
+    "अ": "a",
+    "आ": "aa",
+    "इ": "i",
+    "ई": "ii",
+    "उ": "u",
+    "ऊ": "uu",
+    "ऋ": "ri",
+    "ए": "e",
+    "ऐ": "ai",
+    "ओ": "o",
+    "औ": "au",
+}
+
+# dependent vowel signs, they replace the inherent "a" of the consonant before them
+DEVANAGARI_MATRAS = {
+    "ा": "aa",
+    "ि": "i",
+    "ी": "ii",
+    "ु": "u",
+    "ू": "uu",
+    "ृ": "ri",
+    "े": "e",
+    "ै": "ai",
+    "ो": "o",
+    "ौ": "au",
+}
+
+DEVANAGARI_CONSONANTS = {
+    "क": "k",
+    "ख": "kh",
+    "ग": "g",
+    "घ": "gh",
+    "ङ": "ng",
+    "च": "ch",
+    "छ": "chh",
+    "ज": "j",
+    "झ": "jh",
+    "ञ": "ny",
+    "ट": "t",
+    "ठ": "th",
+    "ड": "d",
+    "ढ": "dh",
+    "ण": "n",
+    "त": "t",
+    "थ": "th",
+    "द": "d",
+    "ध": "dh",
+    "न": "n",
+    "प": "p",
+    "फ": "ph",
+    "ब": "b",
+    "भ": "bh",
+    "म": "m",
+    "य": "y",
+    "र": "r",
+    "ल": "l",
+    "व": "v",
+    "श": "sh",
+    "ष": "sh",
+    "स": "s",
+    "ह": "h",
+}
+
+DEVANAGARI_SIGNS = {
+    "ं": "n",  # anusvara
+    "ँ": "n",  # chandrabindu
+    "ः": "h",  # visarga
+}
+
+DEVANAGARI_VIRAMA = "्"
+DEVANAGARI_NUKTA = "़"
+
+# applied in order on each romanized word, so that common spelling variations of Nepali names end up the same
+ROMANIZATION_FOLDS = [
+    ("chh", "ch"),
+    ("sh", "s"),
+    ("ph", "f"),
+    # ब/व are used interchangeably (Deuba/Deuwa/देउवा)
+    ("w", "b"),
+    ("v", "b"),
+    ("ee", "i"),
+    ("oo", "u"),
+]
+DOUBLE_LETTERS_REGEX = re.compile(r"(.)\1+")
+
+# latin letters that NFKD does not split into base letter + combining mark
+LATIN_SPECIAL_LETTERS = str.maketrans(
+    {"đ": "d", "ð": "d", "ø": "o", "ł": "l", "ħ": "h", "ı": "i", "æ": "ae", "œ": "oe"}
+)
+
+
+def transliterate_devanagari(text):
+    """
+    Transliterates Devanagari to a simple ascii romanization (for example, "शेर बहादुर" to "shera bahaadura"). Other characters are kept as is.
+    """
+    output = []
+    # consonants carry an inherent "a" unless followed by a matra or virama
+    pending_inherent_a = False
+
+    for char in text:
+        if char in DEVANAGARI_MATRAS:
+            output.append(DEVANAGARI_MATRAS[char])
+            pending_inherent_a = False
+            continue
+        if char == DEVANAGARI_VIRAMA:
+            pending_inherent_a = False
+            continue
+        if char == DEVANAGARI_NUKTA:
+            continue
+
+        if pending_inherent_a:
+            output.append("a")
+            pending_inherent_a = False
+
+        if char in DEVANAGARI_CONSONANTS:
+            output.append(DEVANAGARI_CONSONANTS[char])
+            pending_inherent_a = True
+        elif char in DEVANAGARI_VOWELS:
+            output.append(DEVANAGARI_VOWELS[char])
+        elif char in DEVANAGARI_SIGNS:
+            output.append(DEVANAGARI_SIGNS[char])
+        elif unicodedata.category(char) == "Nd":
+            # Devanagari (and any other) digits
+            output.append(str(unicodedata.digit(char)))
+        else:
+            output.append(char)
+
+    if pending_inherent_a:
+        output.append("a")
+
+    return "".join(output)
+
+
+def _fold_word(word):
+    for old, new in ROMANIZATION_FOLDS:
+        word = word.replace(old, new)
+    word = DOUBLE_LETTERS_REGEX.sub(r"\1", word)
+    # inherent "a" at the end is written inconsistently (Prachanda/Prachand)
+    if len(word) > 2 and word.endswith("a"):
+        word = word[:-1]
+    return word
+
+
+def normalize_name(name):
+    """
+    Returns the search key of a name: Devanagari transliterated, casefolded, diacritics, spacing and punctuation stripped, and common romanization variations folded.
+
+    For example, "Sher Bahadur", "Sherbahadur" and "शेर बहादुर" all become "serbahadur", and "Prachanda" and "Prachand" both become "prachand".
+    """
+    text = name or ""
+    if text.isascii():
+        # most names, no need to go through every character
+        text = text.lower()
+    else:
+        text = transliterate_devanagari(text)
+        # NFKD splits accented characters into base character + combining mark, which are then dropped
+        text = unicodedata.normalize("NFKD", text.casefold())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        text = text.translate(LATIN_SPECIAL_LETTERS)
+
+    words = re.findall(r"[^\W_]+", text)
+    return "".join(_fold_word(word) for word in words)[:SEARCH_KEY_MAX_LENGTH]
+
+
+# ---------- TRIGRAM SIMILARITY (python, for SQLite) ----------
+
+
+def _trigrams(text):
+    """
+    Same as pg_trgm: each word is padded with two spaces in front and one at the end.
+    """
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def trigram_similarity(a, b):
+    """
+    Python version of pg_trgm's similarity(a, b)
+    """
+    a_trigrams, b_trigrams = _trigrams(a or ""), _trigrams(b or "")
+    if not a_trigrams or not b_trigrams:
+        return 0.0
+    return len(a_trigrams & b_trigrams) / len(a_trigrams | b_trigrams)
+
+
+def trigram_word_similarity(a, b):
+    """
+    Approximation of pg_trgm's word_similarity(a, b): the share of trigrams of `a` that are found in `b`, so a part of a name scores high.
+    """
+    a_trigrams, b_trigrams = _trigrams(a or ""), _trigrams(b or "")
+    if not a_trigrams:
+        return 0.0
+    # padding trigrams of `a` can't be expected in the middle of `b`
+    inner_trigrams = {trigram for trigram in a_trigrams if " " not in trigram}
+    a_trigrams = inner_trigrams or a_trigrams
+    return len(a_trigrams & b_trigrams) / len(a_trigrams)
+
+
+def register_sqlite_functions(sender, connection, **kwargs):
+    """
+    connection_created signal receiver, see apps/core/apps.py
+    """
+    if connection.vendor != "sqlite":
+        return
+    connection.connection.create_function(
+        "similarity", 2, trigram_similarity, deterministic=True
+    )
+    connection.connection.create_function(
+        "word_similarity", 2, trigram_word_similarity, deterministic=True
+    )
+
+
+# ---------- LOOKUP ----------
+
+
+def create_trigram_index(schema_editor, table, column="search_key"):
+    """
+    Used in migrations. Only Postgres has trigram indexes, SQLite scans the table.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx ON {table} USING GIN ({column} gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(schema_editor, table, column="search_key"):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm_idx")
+
+
+def set_search_keys(queryset, source, batch_size=1000):
+    """
+    Used in migrations. Sets search_key of every row of the queryset from its `source` field (for example "full_name"), a batch at a time.
+    """
+    model = queryset.model
+
+    def update(batch):
+        # NOTE: the instances that were changed must be passed, a queryset would be fetched again without the new keys
+        model._base_manager.bulk_update(batch, ["search_key"], batch_size=batch_size)
+
+    batch = []
+    for row in queryset.only("id", source).iterator(chunk_size=batch_size):
+        row.search_key = normalize_name(getattr(row, source))
+        batch.append(row)
+        if len(batch) == batch_size:
+            update(batch)
+            batch = []
+    if batch:
+        update(batch)
+
+
+def fuzzy_search(table, query, limit, column="search_key"):
+    """
+    Returns [(id, score), ...] of the non deleted rows of `table` whose `column` is the most similar to the normalized query, best match first.
+    """
+    key = normalize_name(query)
+    if not key:
+        return []
+
+    if connection.vendor == "postgresql":
+        # % and <% use the trigram index (thresholds: pg_trgm.similarity_threshold and pg_trgm.word_similarity_threshold)
+        sql = f"""
+            SELECT t.id, GREATEST(similarity(t.{column}, %s), word_similarity(%s, t.{column})) AS score
+            FROM {table} t
+            WHERE (t.{column} %% %s OR %s <%% t.{column}) AND t.deleted IS NULL
+            ORDER BY score DESC, t.id DESC
+            LIMIT %s
+        """
+        params = [key, key, key, key, limit]
+    elif connection.vendor == "sqlite":
+        sql = f"""
+            SELECT id, score FROM (
+                SELECT t.id, MAX(similarity(t.{column}, %s), word_similarity(%s, t.{column})) AS score
+                FROM {table} t
+                WHERE t.deleted IS NULL
+            )
+            WHERE score >= %s
+            ORDER BY score DESC, id DESC
+            LIMIT %s
+        """
+        params = [key, key, SIMILARITY_THRESHOLD, limit]
+    else:
+        raise InternalApplicationError(
+            f"Fuzzy search is not supported for {connection.vendor}"
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+
+def get_fuzzy_query_and_limit(request):
+    """
+    Returns (query, limit) from ?q= and ?limit=
+
+    :raises ApplicationError: if query is missing or limit is invalid
+    """
+    query = request.query_params.get(FUZZY_QUERY_PARAM, "")
+    if not normalize_name(query):
+        raise ApplicationError(
+            "Search query is required",
+            extra={FUZZY_QUERY_PARAM: "Must contain at least one letter or number"},
+        )
+
+    limit = request.query_params.get(FUZZY_LIMIT_QUERY_PARAM, DEFAULT_FUZZY_LIMIT)
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ApplicationError(
+            "Invalid limit",
+            extra={FUZZY_LIMIT_QUERY_PARAM: "Must be an integer greater than 0"},
+        )
+
+    return query, min(limit, MAX_FUZZY_LIMIT)
+
+
+def get_fuzzy_schema_parameters():
+    """
+    Query parameters for drf-spectacular's extend_schema(parameters=...)
+    """
+    return [
+        OpenApiParameter(
+            name=FUZZY_QUERY_PARAM,
+            type=str,
+            required=True,
+            description="Name to look up, in romanized Nepali or Devanagari. Spelling doesn't have to be exact",
+        ),
+        OpenApiParameter(
+            name=FUZZY_LIMIT_QUERY_PARAM,
+            type=int,
+            required=False,
+            description=f"Number of candidates (default {DEFAULT_FUZZY_LIMIT}, max {MAX_FUZZY_LIMIT})",
+        ),
+    ]
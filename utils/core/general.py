@@ -1,62 +1,6 @@
-import random
-import string
+import hashlib
 
 from django_countries import countries
-from utils.core.exceptions import InternalApplicationError
-from django.utils.text import slugify
-
-
-def check_and_generate_slug(
-    instance, field_name, slug_field, fail_silently=False, max_length=50
-):
-    """
-    Checks if the instance already has a pk or slug, and if so, returns the slug if fail_silently is True, otherwise raises an InternalApplicationError.
-
-    Generates a slug from the specified field, truncates it to fit within the max_length, and checks if the generated slug already exists in the database. If it does, appends a random suffix to the base slug and tries again until a unique slug is found.
-
-    Args:
-        instance (models.Model): The instance to generate a slug for.
-        field_name (str): The name of the field to generate the slug from (for example, 'name').
-        slug_field (str): The name of the field to store the generated slug in (for example, 'slug').
-        fail_silently (bool, optional): Defaults to False. If True, returns the slug if it already exists, otherwise raises an InternalApplicationError.
-        max_length (int, optional): Defaults to 50. The maximum length of the generated slug.
-
-    Returns:
-        str: The generated slug.
-    """
-    if instance.pk or instance.slug:
-
-        if fail_silently:
-            return instance.slug
-
-        raise InternalApplicationError(
-            "pk of this instance is not None or Slug already exists"
-        )
-
-    from safedelete.models import SafeDeleteModel
-
-    # Generate a slug from the specified field
-    base_slug = slugify(getattr(instance, field_name))[:max_length]
-    slug = base_slug
-
-    # Truncate the slug to fit within the max length
-    slug = slug[:max_length]
-
-    model = instance.__class__
-
-    # check if it is a safe delete model cause we're checking unique=True in entire table where SlugField is used
-    is_safe_delete_model = isinstance(instance, SafeDeleteModel)
-    if is_safe_delete_model:
-        queryset = model.all_objects.filter()
-    else:
-        queryset = model.objects.filter()
-    # Check if the generated slug already exists in the database
-    while queryset.filter(**{slug_field: slug}).exists():
-        random_suffix = "".join(random.choices(string.ascii_lowercase, k=5))
-        trimmed_base = base_slug[: max_length - 6]  # 5 for random chars, 1 for hyphen
-        slug = f"{trimmed_base}-{random_suffix}"
-
-    return slug
 
 
 def get_country_list():
@@ -78,3 +22,51 @@ def update_model_instance(instance, **kwargs):
         setattr(instance, key, value)
     instance.save()
     return instance
+
+
+def make_etag(*parts):
+    """
+    Returns a weak ETag built from the given parts (anything with a stable str()).
+    """
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def get_model_validators(*models):
+    """
+    Returns (etag, last_modified) for collection endpoints, computed from max(updated_at) and number of non deleted rows of each model (one aggregate query per model).
+
+    Soft deleted rows are included in max(updated_at) since safedelete soft deletes using save(), which updates updated_at, so deleting a row also changes the validators.
+
+    Args:
+        models: safedelete models the response is built from (for example, PoliticalFigure and PoliticalParty for the figure list since it contains the party name).
+
+    Returns:
+        tuple: (etag, last_modified). last_modified is None if there are no rows.
+    """
+    from django.db.models import Count, Max
+    from safedelete.models import FIELD_NAME
+
+    parts = []
+    last_modified = None
+    for model in models:
+        # NOTE: COUNT(*) and COUNT(deleted) rather than a filtered count of ids, so that every column of the query is in the (updated_at, deleted) index and Postgres answers it with an index only scan
+        result = model.all_objects.aggregate(
+            last_updated_at=Max("updated_at"),
+            total=Count("*"),
+            deleted=Count(FIELD_NAME),
+        )
+        parts.extend(
+            [
+                model._meta.label_lower,
+                result["last_updated_at"],
+                result["total"] - result["deleted"],
+            ]
+        )
+
+        if result["last_updated_at"] and (
+            last_modified is None or result["last_updated_at"] > last_modified
+        ):
+            last_modified = result["last_updated_at"]
+
+    return make_etag(*parts), last_modified
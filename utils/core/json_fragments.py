@@ -0,0 +1,105 @@
+"""
+Pre-rendered JSON of each row's output, so that list responses don't serialize and render rows that haven't changed since the last time.
+
+The rendered bytes of a row are cached under its pk and the updated_at of the row and of every related row in its output (its versions), so a changed row is simply looked up under a new key, nothing has to be invalidated.
+List responses are then assembled by joining the cached bytes inside the response envelope, see utils/core/response_wrappers.py:PreRenderedOKResponse.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from utils.core.metrics import measure_serialization, record_cache_lookups
+
+FRAGMENT_KEY_PREFIX = "fragment"
+
+_renderer = JSONRenderer()
+
+
+def render_json(data):
+    """
+    Renders data to bytes exactly like DRF's JSONRenderer renders it in a response, so that fragments can be joined into the same bytes as rendering the whole response.
+    """
+    return _renderer.render(data)
+
+
+def accepts_json(request):
+    """
+    Whether the response to the DRF request will be rendered with JSONRenderer (and not the browsable API, etc.) without indentation, so that pre-rendered JSON can be sent instead.
+    """
+    if not isinstance(getattr(request, "accepted_renderer", None), JSONRenderer):
+        return False
+    # NOTE: Accept: application/json; indent=4 makes JSONRenderer indent its output
+    return "indent" not in (getattr(request, "accepted_media_type", None) or "")
+
+
+class JSONFragmentCache:
+    """
+    Fragments are looked up with version rows: any object with a `pk` attribute, usually named tuples from values_list(..., named=True) since they are much cheaper to build than model instances.
+
+    Args:
+        name (str): part of the cache key, for example "political_figure". Change it if the output of the rows changes (a new field, etc.), so that old fragments aren't used.
+        get_versions (callable): returns a tuple of the updated_at of a row and of every related row in its output (for example figure, addresses and party for a political figure) from a version row.
+
+    Usage:
+        fragment_cache = JSONFragmentCache("political_party", lambda row: (row.updated_at,))
+
+        rows = PoliticalParty.objects.values_list("pk", "updated_at", named=True)
+        fragments = fragment_cache.get_many(rows, render_missing=lambda rows: OutputSerializer(load(rows), many=True).data)
+        return PreRenderedOKResponse(data_fragments=fragments)
+    """
+
+    def __init__(self, name, get_versions):
+        self.name = name
+        self.get_versions = get_versions
+
+    @property
+    def enabled(self):
+        return settings.JSON_FRAGMENT_CACHE_ENABLED
+
+    def get_key(self, row):
+        versions = "|".join(str(version) for version in self.get_versions(row))
+        digest = hashlib.md5(versions.encode()).hexdigest()
+        return f"{FRAGMENT_KEY_PREFIX}:{self.name}:{row.pk}:{digest}"
+
+    def set(self, row, data):
+        """
+        Caches the output `data` of the version row, for example after the row is updated and its output has already been serialized.
+        """
+        if not self.enabled:
+            return
+        cache.set(
+            self.get_key(row),
+            render_json(data),
+            timeout=settings.JSON_FRAGMENT_CACHE_TIMEOUT,
+        )
+
+    def get_many(self, rows, render_missing):
+        """
+        Returns the rendered output of each version row, in the same order.
+
+        :param render_missing: called with the version rows whose fragment is not cached, returns their output data (for example serializer.data) in the same order. Rendered fragments are cached.
+        """
+        # NOTE: render_missing loads the rows and measures its own serialization, only rendering is measured here
+        if not self.enabled:
+            data = render_missing(rows)
+            with measure_serialization():
+                return [render_json(item) for item in data]
+
+        keys = [self.get_key(row) for row in rows]
+        fragments = cache.get_many(keys)
+
+        missing = [(key, row) for key, row in zip(keys, rows) if key not in fragments]
+        record_cache_lookups("json_fragment", hits=len(fragments), misses=len(missing))
+        if missing:
+            data = render_missing([row for _, row in missing])
+            with measure_serialization():
+                rendered = {
+                    key: render_json(item) for (key, _), item in zip(missing, data)
+                }
+            cache.set_many(rendered, timeout=settings.JSON_FRAGMENT_CACHE_TIMEOUT)
+            fragments.update(rendered)
+
+        return [fragments[key] for key in keys]
@@ -0,0 +1,120 @@
+"""
+Incremental parsing of large JSON files (for example imports), so that they are never loaded into memory at once.
+Only the standard library's decoder is used: items are decoded one by one with raw_decode() from a buffer that is refilled as they are consumed.
+"""
+
+import json
+
+# characters read from the file at a time
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# characters that can follow a value in valid json
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class _Buffer:
+    def __init__(self, file, read_size):
+        self.file = file
+        self.read_size = read_size
+        self.text = ""
+        self.position = 0
+
+    def fill(self):
+        """
+        Reads more of the file, dropping what has already been consumed. Returns False at the end of the file.
+        """
+        data = self.file.read(self.read_size)
+        if not data:
+            return False
+        self.text = self.text[self.position :] + data
+        self.position = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character, or "" at the end of the file.
+        """
+        while True:
+            while (
+                self.position < len(self.text)
+                and self.text[self.position] in _WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise json.JSONDecodeError(
+                f"Expecting {character!r}", self.text, self.position
+            )
+        self.position += 1
+
+    def skip(self, character):
+        """
+        Consumes the next character if it is `character`, returns whether it was.
+        """
+        if self.peek() == character:
+            self.position += 1
+            return True
+        return False
+
+    def decode(self):
+        """
+        Decodes the value at the position, reading more of the file until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number cut by the end of the buffer is decoded without its rest (for example "4." as 4), so make sure the value is followed by a delimiter
+            if (
+                end == len(self.text) or self.text[end] not in _DELIMITERS
+            ) and self.fill():
+                continue
+            self.position = end
+            return value
+
+
+def iter_object_items(file, read_size=READ_SIZE):
+    """
+    Yields (key, item) for each item of the arrays of the file's top level object, in the order of the file.
+    For example ("users", {...}), ("users", {...}), ("political_parties", {...}) for {"users": [{...}, {...}], "political_parties": [{...}]}. Values that are not arrays are yielded as (key, value).
+
+    Memory use is bounded by the largest item instead of the size of the file.
+
+    :param file: file opened in text mode
+    :raises json.JSONDecodeError: if the file is not a valid json object
+    """
+    buffer = _Buffer(file, read_size)
+    buffer.expect("{")
+    if buffer.skip("}"):
+        return
+
+    while True:
+        key = buffer.decode()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting a key", buffer.text, buffer.position)
+        buffer.expect(":")
+
+        if buffer.skip("["):
+            if not buffer.skip("]"):
+                while True:
+                    yield key, buffer.decode()
+                    if not buffer.skip(","):
+                        buffer.expect("]")
+                        break
+        else:
+            yield key, buffer.decode()
+
+        if not buffer.skip(","):
+            buffer.expect("}")
+            return
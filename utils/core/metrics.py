@@ -0,0 +1,209 @@
+"""
+Prometheus metrics of requests, see MetricsMiddleware and metrics_view() (exposed on /metrics).
+
+Per request, labelled by method and URL name (the `name=` of the route, "unresolved" for 404s), so that labels don't grow with ids in paths:
+- http_request_duration_seconds: latency histogram
+- http_responses_total: responses by status code
+- http_request_db_queries, http_request_db_seconds: queries and time in the database
+- http_request_serialization_seconds: time serializing and rendering output (see measure_serialization()), queries made meanwhile excluded
+- http_requests_in_progress: requests being handled
+And cache_lookups_total of the response and JSON fragment caches by result (hit or miss), for hit ratios.
+
+With gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory so that the metrics of every worker are aggregated (see gunicorn.conf.py), otherwise /metrics only shows the metrics of the worker that handled the scrape.
+
+NOTE: the part of a streamed response sent after the view returns is not included in the request's latency, queries or serialization time.
+"""
+
+import os
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# other methods are counted as "other", so that requests can't add labels
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+DB_QUERIES_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+# finer than the default buckets, the time of most requests is a few milliseconds
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, until the view returns",
+    ["method", "url_name"],
+    buckets=SECONDS_BUCKETS,
+)
+RESPONSES = Counter(
+    "http_responses", "Responses by status code", ["method", "url_name", "status"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    multiprocess_mode="livesum",
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries of a request",
+    ["method", "url_name"],
+    buckets=DB_QUERIES_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time of a request in the database",
+    ["method", "url_name"],
+    buckets=SECONDS_BUCKETS,
+)
+REQUEST_SERIALIZATION_SECONDS = Histogram(
+    "http_request_serialization_seconds",
+    "Time of a request in serializers and rendering output, queries they make excluded",
+    ["method", "url_name"],
+    buckets=SECONDS_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups", "Cache lookups by cache and result", ["cache", "result"]
+)
+
+
+class RequestMetrics:
+    """
+    Accumulates the queries and serialization time of the current request, see MetricsMiddleware.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.serializing = False
+
+    def record_query(self, execute, sql, params, many, context):
+        # execution wrapper, see connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+_request_metrics = ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def measure_serialization():
+    """
+    Adds the time of the block to the serialization time of the current request, minus the time of the queries made in it (lazily loaded relations, etc.). Nested blocks are only counted once, and it does nothing outside of a request.
+    """
+    request_metrics = _request_metrics.get()
+    if request_metrics is None or request_metrics.serializing:
+        yield
+        return
+
+    request_metrics.serializing = True
+    started = time.perf_counter()
+    db_seconds = request_metrics.db_seconds
+    try:
+        yield
+    finally:
+        request_metrics.serialization_seconds += (time.perf_counter() - started) - (
+            request_metrics.db_seconds - db_seconds
+        )
+        request_metrics.serializing = False
+
+
+def record_cache_lookups(cache, hits=0, misses=0):
+    """
+    :param cache: name of the cache, for example "response"
+    """
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+def get_url_name(request):
+    resolver_match = request.resolver_match
+    if resolver_match is None or not resolver_match.view_name:
+        return "unresolved"
+    return resolver_match.view_name
+
+
+class MetricsMiddleware:
+    """
+    Records the metrics of every request, see the module docstring.
+    Not used unless METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = RequestMetrics()
+        token = _request_metrics.set(request_metrics)
+        REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            _request_metrics.reset(token)
+        duration = time.perf_counter() - started
+
+        method = request.method if request.method in METHODS else "other"
+        url_name = get_url_name(request)
+        REQUEST_DURATION.labels(method, url_name).observe(duration)
+        RESPONSES.labels(method, url_name, str(response.status_code)).inc()
+        REQUEST_DB_QUERIES.labels(method, url_name).observe(request_metrics.queries)
+        REQUEST_DB_SECONDS.labels(method, url_name).observe(request_metrics.db_seconds)
+        REQUEST_SERIALIZATION_SECONDS.labels(method, url_name).observe(
+            request_metrics.serialization_seconds
+        )
+        return response
+
+
+def is_internal_request(request):
+    # NOTE: requests through the reverse proxy come from its address (often 127.0.0.1), but with X-Forwarded-For
+    return (
+        request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+        and "HTTP_X_FORWARDED_FOR" not in request.META
+    )
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # metrics of every worker, from the files they write
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """
+    Metrics in the Prometheus text format, only for internal requests (see METRICS_ALLOWED_IPS) and if METRICS_ENABLED, 404 otherwise.
+    """
+    if not settings.METRICS_ENABLED or not is_internal_request(request):
+        raise Http404
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
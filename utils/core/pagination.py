@@ -0,0 +1,234 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from drf_spectacular.utils import OpenApiParameter
+
+from utils.core.exceptions import ApplicationError
+
+
+class BasePagination:
+    """
+    Common page size handling, use KeysetPagination or PageNumberPagination
+    """
+
+    default_page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = self.default_page_size
+        self.next = None
+        self.previous = None
+
+    @classmethod
+    def get_page_size_schema_parameter(cls):
+        return OpenApiParameter(
+            name=cls.page_size_query_param,
+            type=int,
+            required=False,
+            description=f"Number of items per page (default {cls.default_page_size}, max {cls.max_page_size})",
+        )
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size is None:
+            return self.default_page_size
+
+        try:
+            page_size = int(page_size)
+        except ValueError:
+            raise ApplicationError(
+                "Invalid page size",
+                extra={self.page_size_query_param: "Must be an integer"},
+            )
+
+        if page_size < 1:
+            raise ApplicationError(
+                "Invalid page size",
+                extra={self.page_size_query_param: "Must be greater than 0"},
+            )
+
+        # silently clamp instead of raising so that clients asking for "everything" still get a bounded response
+        return min(page_size, self.max_page_size)
+
+    def get_pagination_data(self):
+        return {
+            "next": self.next,
+            "previous": self.previous,
+            "page_size": self.page_size,
+        }
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on (created_at, id), newest first.
+
+    Instead of OFFSET, each page filters on the (created_at, id) of the last row of the previous page, so deep pages cost the same as the first one.
+    The cursor sent to the client is opaque (urlsafe base64 of a small json) and should be passed back as is.
+
+    Usage:
+        paginator = KeysetPagination()
+        rows = paginator.paginate_queryset(queryset, request)
+        ...
+        return OKResponse(data=serializer.data, pagination=paginator.get_pagination_data())
+    """
+
+    cursor_query_param = "cursor"
+
+    # NOTE: the queryset should have an index matching this ordering, see PoliticalFigure.Meta.indexes
+    ordering = ("-created_at", "-id")
+    # attributes the paginated rows must have, for example the leading lookups of values_list(..., named=True) rows
+    cursor_fields = ("pk", "created_at")
+
+    @classmethod
+    def get_schema_parameters(cls):
+        """
+        Query parameters for drf-spectacular's extend_schema(parameters=...)
+        """
+        return [
+            OpenApiParameter(
+                name=cls.cursor_query_param,
+                type=str,
+                required=False,
+                description="Opaque cursor from `pagination.next` or `pagination.previous` of a previous response",
+            ),
+            cls.get_page_size_schema_parameter(),
+        ]
+
+    @staticmethod
+    def encode_cursor(created_at, pk, reverse=False):
+        payload = {"c": created_at.isoformat(), "i": pk, "r": int(reverse)}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        """
+        Returns (created_at, pk, reverse) or None if no cursor was sent.
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        try:
+            # add back the stripped padding
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            created_at = datetime.fromisoformat(payload["c"])
+            pk = int(payload["i"])
+            reverse = bool(payload.get("r", 0))
+        except (ValueError, TypeError, KeyError):
+            raise ApplicationError(
+                "Invalid cursor",
+                extra={self.cursor_query_param: "Cursor is malformed"},
+            )
+
+        return created_at, pk, reverse
+
+    def paginate_queryset(self, queryset, request):
+        """
+        Returns the list of rows for the requested page, ordered newest first.
+        """
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        reverse = False
+        if cursor is None:
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            created_at, pk, reverse = cursor
+            if reverse:
+                # walking backwards: rows newer than the cursor, oldest first, flipped below
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                ).order_by("created_at", "id")
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                ).order_by(*self.ordering)
+
+        # fetch one extra row to know if there's another page without a COUNT query
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        if reverse:
+            rows.reverse()
+
+        self.next = None
+        self.previous = None
+
+        if rows:
+            first, last = rows[0], rows[-1]
+            # going forward, there's a next page only if we got the extra row; going backwards, we came from the next page so it always exists
+            if (not reverse and has_more) or reverse:
+                self.next = self.encode_cursor(last.created_at, last.pk)
+            # going backwards, there's a previous page only if we got the extra row; going forward, there's one if we started from a cursor
+            if (reverse and has_more) or (not reverse and cursor is not None):
+                self.previous = self.encode_cursor(
+                    first.created_at, first.pk, reverse=True
+                )
+
+        return rows
+
+
+class PageNumberPagination(BasePagination):
+    """
+    Page number pagination for results that can't be ordered by a key, for example search results ordered by rank.
+    It is fine as long as clients don't go deep, so prefer KeysetPagination wherever possible.
+
+    Usage:
+        paginator = PageNumberPagination()
+        offset, limit = paginator.get_offset_and_limit(request)
+        rows = fetch(offset=offset, limit=limit)
+        rows = paginator.paginate_rows(rows)
+    """
+
+    page_query_param = "page"
+
+    @classmethod
+    def get_schema_parameters(cls):
+        """
+        Query parameters for drf-spectacular's extend_schema(parameters=...)
+        """
+        return [
+            OpenApiParameter(
+                name=cls.page_query_param,
+                type=int,
+                required=False,
+                description="Page number, starting from 1",
+            ),
+            cls.get_page_size_schema_parameter(),
+        ]
+
+    def get_page(self, request):
+        page = request.query_params.get(self.page_query_param, 1)
+        try:
+            page = int(page)
+        except ValueError:
+            page = 0
+
+        if page < 1:
+            raise ApplicationError(
+                "Invalid page",
+                extra={self.page_query_param: "Must be an integer greater than 0"},
+            )
+        return page
+
+    def get_offset_and_limit(self, request):
+        """
+        Returns (offset, limit). limit is one more than the page size so that paginate_rows() knows if there's a next page without a COUNT query.
+        """
+        self.page_size = self.get_page_size(request)
+        self.page = self.get_page(request)
+        return (self.page - 1) * self.page_size, self.page_size + 1
+
+    def paginate_rows(self, rows):
+        rows = list(rows)
+        has_more = len(rows) > self.page_size
+
+        self.next = self.page + 1 if has_more else None
+        self.previous = self.page - 1 if self.page > 1 else None
+
+        return rows[: self.page_size]
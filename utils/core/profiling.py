@@ -0,0 +1,194 @@
+"""
+On-demand profiling of single requests, see ProfilingMiddleware and `python manage.py profiles`.
+
+A request is profiled when it carries a signed X-Profile header (see get_profile_token()), or for a sampled fraction (PROFILING_SAMPLE_RATE) of requests. Profiles are written to PROFILING_DIR (under logs/):
+- "sampling" profiles record the stack of the request's thread every millisecond, written as collapsed stacks ("frame;frame;frame count" lines), the input of flamegraph tools (flamegraph.pl, speedscope) and of `profiles flamegraph`
+- "cprofile" profiles record every call with cProfile, written as pstats files
+
+NOTE: the middleware is not used at all unless PROFILING_ENABLED, so that it costs nothing when disabled. The part of a streamed response sent after the view returns is not profiled.
+"""
+
+import contextlib
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+# name of the profile file, sent back on profiled responses
+PROFILE_NAME_HEADER = "X-Profile-Name"
+
+_TOKEN_SALT = "utils.core.profiling"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that started it from a background thread, so the overhead doesn't depend on the number of calls.
+    """
+
+    extension = "collapsed"
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+
+    def start(self):
+        thread_id = threading.get_ident()
+        self._thread = threading.Thread(
+            target=self._sample, args=(thread_id,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self.stacks[get_collapsed_stack(frame)] += 1
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.items():
+                file.write(f"{stack} {count}\n")
+
+
+class CProfiler:
+    """
+    Deterministic profiler, with call counts, but slows every call down.
+    """
+
+    extension = "pstats"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+PROFILERS = {"sampling": SamplingProfiler, "cprofile": CProfiler}
+
+
+def get_frame_name(code):
+    # ";" separates frames in collapsed stacks, the count is after the last space
+    filename = os.path.relpath(code.co_filename, settings.BASE_DIR)
+    if filename.startswith(".."):
+        # libraries, from their package on
+        filename = code.co_filename.rsplit("site-packages" + os.sep, 1)[-1]
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def get_collapsed_stack(frame):
+    """
+    The stack of the frame as a collapsed stack line, outermost frame first.
+    """
+    names = []
+    while frame is not None:
+        names.append(get_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def get_profile_token(profiler="sampling"):
+    """
+    Value of the X-Profile header to profile a request with the profiler, valid for PROFILING_TOKEN_MAX_AGE seconds.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler {profiler}, use one of {list(PROFILERS)}")
+    return signing.TimestampSigner(salt=_TOKEN_SALT).sign(profiler)
+
+
+def get_requested_profiler(request):
+    """
+    Name of the profiler the request should be profiled with, None to not profile it.
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        try:
+            return signing.TimestampSigner(salt=_TOKEN_SALT).unsign(
+                token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+            )
+        except signing.BadSignature:
+            logger.warning(f"Invalid or expired {PROFILE_HEADER} header")
+            return None
+
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        return settings.PROFILING_PROFILER
+    return None
+
+
+def get_profile_name(request, duration, extension):
+    # <time>-<method>-<url name>-<duration>ms.<extension>, see utils/command_helpers/profiles.py:parse_profile_name()
+    url_name = "unresolved"
+    if request.resolver_match is not None and request.resolver_match.view_name:
+        url_name = request.resolver_match.view_name.replace(":", ".")
+    created = timezone.now().strftime("%Y%m%dT%H%M%S.%f")
+    return f"{created}-{request.method}-{url_name}-{duration * 1000:.0f}ms.{extension}"
+
+
+def remove_old_profiles(directory, keep):
+    names = sorted(os.listdir(directory))
+    for name in names[: max(len(names) - keep, 0)]:
+        # may have been removed by another worker already
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, name))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests with a signed X-Profile header or sampled ones, see the module docstring.
+    Not used unless PROFILING_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler_name = get_requested_profiler(request)
+        if profiler_name is None:
+            return self.get_response(request)
+
+        profiler = PROFILERS[profiler_name]()
+        try:
+            profiler.start()
+        except ValueError:
+            # cProfile is already profiling another request of this process (one at a time since python 3.12)
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration = time.perf_counter() - started
+
+        name = get_profile_name(request, duration, profiler.extension)
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        profiler.write(os.path.join(settings.PROFILING_DIR, name))
+        remove_old_profiles(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+        response[PROFILE_NAME_HEADER] = name
+        return response
@@ -0,0 +1,129 @@
+"""
+Query budgets and N+1 detection, enabled in DEBUG and tests, see QueryBudgetMiddleware.
+
+Views declare the most queries a request may make with `query_budget` (see BaseAPIView). Every query of a request (transaction control statements aside) is recorded with an execution wrapper, and the request is flagged if it makes more queries than the budget of its view, or the same query (same SQL, whatever the parameters) QUERY_REPEAT_LIMIT times or more, which is usually a lazy lookup in a loop (N+1).
+Flagged requests log a warning with the stack of the offending query, or fail in tests (QUERY_BUDGET_RAISE).
+
+NOTE: queries made while a streamed response is sent (after the view has returned) are not counted.
+"""
+
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# "IN (%s, %s, %s)" of any length is the same query
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+# not counted, they depend on the backend (BEGIN on sqlite) and on the enclosing transaction (savepoints in tests)
+_TRANSACTION_CONTROL = re.compile(
+    r"^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE SAVEPOINT)\b", re.IGNORECASE
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised instead of logging a warning when QUERY_BUDGET_RAISE is set (in tests), so that the test fails.
+    """
+
+
+def get_query_shape(sql):
+    return _PLACEHOLDER_LIST.sub("(...)", sql)
+
+
+def _get_stack():
+    # frames of the project only, without django's and libraries'
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+class QueryRecorder:
+    """
+    Execution wrapper (see connection.execute_wrapper()) counting the queries of a request, and keeping the stack of the query over the budget and of repeated queries.
+    """
+
+    def __init__(self, budget=None, repeat_limit=3):
+        self.budget = budget
+        self.repeat_limit = repeat_limit
+        self.count = 0
+        self.shapes = Counter()
+        # (sql, stack) of the first query over the budget
+        self.over_budget = None
+        # {shape: stack of the query that reached the repeat limit}
+        self.repeated = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if _TRANSACTION_CONTROL.match(sql):
+            return execute(sql, params, many, context)
+
+        self.count += 1
+        if self.budget is not None and self.count == self.budget + 1:
+            self.over_budget = (sql, _get_stack())
+
+        shape = get_query_shape(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.repeat_limit:
+            self.repeated[shape] = _get_stack()
+
+        return execute(sql, params, many, context)
+
+    def get_problems(self):
+        problems = []
+        if self.budget is not None and self.count > self.budget:
+            sql, stack = self.over_budget
+            problems.append(
+                f"{self.count} queries, over the budget of {self.budget}. "
+                f"First query over the budget:\n{sql}\n{stack}"
+            )
+        for shape, stack in self.repeated.items():
+            problems.append(
+                f"Same query made {self.shapes[shape]} times (N+1?):\n{shape}\n{stack}"
+            )
+        return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    Checks the queries of every request against the `query_budget` of its view and for N+1, see the module docstring.
+    Not used unless QUERY_BUDGET_ENABLED (DEBUG and tests by default).
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(repeat_limit=settings.QUERY_REPEAT_LIMIT)
+        # the budget is set by process_view(), once the view is resolved
+        request.query_recorder = recorder
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        problems = recorder.get_problems()
+        if problems:
+            message = f"{request.method} {request.path}: " + "\n".join(problems)
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        request.query_recorder.budget = getattr(view_class, "query_budget", None)
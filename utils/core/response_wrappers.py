@@ -1,19 +1,137 @@
 # responses.py
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework import status
 
+from utils.core.compiled_serializers import render_native_json
+from utils.core.json_fragments import render_json
+
 
 class OKResponse(Response):
-    def __init__(self, *, message="Success", data=None, **kwargs):
+    def __init__(
+        self, *, message="Success", data=None, pagination=None, facets=None, **kwargs
+    ):
         status_code = status.HTTP_200_OK
         response_data = {
             "data": data,
             "message": message,
             # "status": status_code,
         }
+        # only paginated list views send this, see utils/core/pagination.py
+        if pagination is not None:
+            response_data["pagination"] = pagination
+        # only when facet counts are requested, see utils/core/facets.py
+        if facets is not None:
+            response_data["facets"] = facets
         super().__init__(data=response_data, status=status_code, **kwargs)
 
 
+class PreRenderedOKResponse(HttpResponse):
+    """
+    Same body as OKResponse rendered by DRF's JSONRenderer, byte for byte, but `data` is a list assembled from already rendered JSON fragments (see utils/core/json_fragments.py) instead of being serialized and rendered again.
+
+    NOTE: It is always JSON, so only use it when the request's accepted renderer is a JSONRenderer, and OKResponse otherwise (browsable API, etc.)
+    """
+
+    def __init__(
+        self,
+        *,
+        message="Success",
+        data_fragments=(),
+        pagination=None,
+        facets=None,
+        **kwargs,
+    ):
+        parts = [
+            b'{"data":[',
+            b",".join(data_fragments),
+            b'],"message":',
+            render_json(message),
+        ]
+        if pagination is not None:
+            parts += [b',"pagination":', render_json(pagination)]
+        if facets is not None:
+            parts += [b',"facets":', render_json(facets)]
+        parts.append(b"}")
+
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=b"".join(parts), status=status.HTTP_200_OK, **kwargs)
+
+
+class FastOKResponse(HttpResponse):
+    """
+    Same arguments and body as OKResponse rendered by DRF's JSONRenderer, byte for byte, rendered directly without going through DRF's rendering.
+    `data` must only contain json native types, for example the output of a CompiledSerializer (see utils/core/compiled_serializers.py).
+
+    NOTE: It is always JSON, so only use it when the request's accepted renderer is a JSONRenderer, and OKResponse otherwise (browsable API, etc.)
+    """
+
+    def __init__(
+        self, *, message="Success", data=None, pagination=None, facets=None, **kwargs
+    ):
+        response_data = {"data": data, "message": message}
+        if pagination is not None:
+            response_data["pagination"] = pagination
+        if facets is not None:
+            response_data["facets"] = facets
+
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(
+            content=render_native_json(response_data),
+            status=status.HTTP_200_OK,
+            **kwargs,
+        )
+
+
+class StreamingOKResponse(StreamingHttpResponse):
+    """
+    Same body as FastOKResponse, but `data` is rendered and sent a chunk at a time while the response is being sent, so the whole list is never in memory.
+
+    Args:
+        data_chunks (iterable): of lists of json native data, for example CompiledSerializer.serialize_chunks(). Consumed lazily, after the view has returned.
+
+    NOTE: It is always JSON, so only use it when the request's accepted renderer is a JSONRenderer, and OKResponse otherwise (browsable API, etc.)
+    NOTE: Errors while streaming can't change the status code anymore, they cut the body short instead.
+    """
+
+    def __init__(
+        self,
+        *,
+        message="Success",
+        data_chunks=(),
+        pagination=None,
+        facets=None,
+        **kwargs,
+    ):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(
+            streaming_content=self._render(message, data_chunks, pagination, facets),
+            status=status.HTTP_200_OK,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _render(message, data_chunks, pagination, facets):
+        yield b'{"data":['
+        first = True
+        for chunk in data_chunks:
+            if not chunk:
+                continue
+            if not first:
+                yield b","
+            first = False
+            # rendered list without its brackets
+            yield render_native_json(chunk)[1:-1]
+
+        closing = [b'],"message":', render_native_json(message)]
+        if pagination is not None:
+            closing += [b',"pagination":', render_native_json(pagination)]
+        if facets is not None:
+            closing += [b',"facets":', render_native_json(facets)]
+        closing.append(b"}")
+        yield b"".join(closing)
+
+
 class CreatedResponse(Response):
     def __init__(self, *, message="Created", data=None, **kwargs):
         status_code = status.HTTP_201_CREATED
@@ -42,7 +160,7 @@ class BadResponse(Response):
         message="Bad Request",
         errors=None,
         status_code=status.HTTP_400_BAD_REQUEST,
-        **kwargs
+        **kwargs,
     ):
         errors = errors or {}
         response_data = {
@@ -59,7 +177,7 @@ class UnauthorizedResponse(Response):
         message="Unauthorized",
         errors=None,
         status_code=status.HTTP_401_UNAUTHORIZED,
-        **kwargs
+        **kwargs,
     ):
         errors = errors or {}
         response_data = {
@@ -0,0 +1,155 @@
+"""
+Slug allocation for many rows at once: every existing slug that could clash with the new ones is fetched in a single query, and numeric suffixes ("ram-bahadur", "ram-bahadur-2", "ram-bahadur-3", ...) are assigned in memory.
+
+Slugs are not checked before saving: rows are saved with the allocated slugs, and if another request took one of them in the meantime the unique constraint raises IntegrityError and the slugs are allocated again.
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+# allocations tried before giving up, each one only fails if a concurrent request took the same slug
+MAX_ATTEMPTS = 5
+
+# values of a query, sqlite's limit of variables in a query is 999 in older versions
+CHUNK_SIZE = 500
+
+# longest numeric suffix that fits without cutting into the part of the base slug used as the LIKE prefix ("-999999")
+SUFFIX_ROOM = 7
+
+
+def get_base_slug(value, model, max_length=50):
+    """
+    Returns the slug of `value` (for example a name) that numeric suffixes are added to, or the model name if it has no latin characters (for example a name in Devanagari).
+    """
+    return slugify(value)[:max_length] or model._meta.model_name[:max_length]
+
+
+def _get_stem(base_slug, max_length):
+    # every candidate of the base slug starts with this, even when the base is cut to make room for the suffix
+    return base_slug[: max_length - SUFFIX_ROOM]
+
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), CHUNK_SIZE):
+        yield values[i : i + CHUNK_SIZE]
+
+
+def get_existing_slugs(model, base_slugs, slug_field="slug", max_length=50):
+    """
+    Returns the set of existing slugs allocate_slugs() needs to know: the base slugs that are taken, and every slug that starts like a base slug that is taken or repeated (so it gets a suffix).
+    Soft deleted rows are included since the unique constraint covers them too.
+
+    NOTE: free base slugs are looked up by equality instead of prefix, they are used as they are. It keeps a load of many new rows to a few indexed queries.
+    """
+    manager = model._base_manager
+    counts = Counter(base_slugs)
+    taken = set()
+    for chunk in _chunks(counts):
+        taken.update(
+            manager.filter(**{f"{slug_field}__in": chunk}).values_list(
+                slug_field, flat=True
+            )
+        )
+
+    stems = {
+        _get_stem(base_slug, max_length)
+        for base_slug, count in counts.items()
+        if count > 1 or base_slug in taken
+    }
+    for chunk in _chunks(stems):
+        condition = Q()
+        for stem in chunk:
+            condition |= Q(**{f"{slug_field}__startswith": stem})
+        taken.update(manager.filter(condition).values_list(slug_field, flat=True))
+    return taken
+
+
+def allocate_slugs(model, base_slugs, slug_field="slug", max_length=50):
+    """
+    Returns a unique slug for each base slug, in the same order. The base slug itself if it is free, otherwise the base slug with the lowest free numeric suffix.
+    Base slugs repeated in `base_slugs` get different slugs.
+
+    Usage:
+        slugs = allocate_slugs(PoliticalFigure, [get_base_slug(name, PoliticalFigure) for name in names])
+    """
+    taken = get_existing_slugs(model, base_slugs, slug_field, max_length)
+    # next suffix to try for each base slug, so that a base repeated many times doesn't start over from 2
+    next_suffix = {}
+    slugs = []
+
+    for base_slug in base_slugs:
+        slug = base_slug
+        if slug in taken:
+            suffix = next_suffix.get(base_slug, 2)
+            while True:
+                ending = f"-{suffix}"
+                slug = f"{base_slug[: max_length - len(ending)]}{ending}"
+                if slug not in taken:
+                    break
+                suffix += 1
+            next_suffix[base_slug] = suffix + 1
+
+        taken.add(slug)
+        slugs.append(slug)
+
+    return slugs
+
+
+def _is_slug_conflict(model, slugs, slug_field):
+    # the IntegrityError may come from another constraint, only retry if one of the slugs has been taken
+    return model._base_manager.filter(**{f"{slug_field}__in": slugs}).exists()
+
+
+def save_with_unique_slug(instance, base_slug, save, slug_field="slug", max_length=50):
+    """
+    Sets a unique slug allocated from `base_slug` on the new instance and saves it with `save` (usually the model's super().save), allocating again if the slug is taken concurrently.
+
+    Usage (in Model.save()):
+        if not self.pk and not self.slug:
+            return save_with_unique_slug(self, get_base_slug(self.name, PoliticalParty), functools.partial(super().save, *args, **kwargs))
+
+    :raises IntegrityError: if it is not caused by the slug, or the slug is still taken after MAX_ATTEMPTS
+    """
+    model = type(instance)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        slug = allocate_slugs(model, [base_slug], slug_field, max_length)[0]
+        setattr(instance, slug_field, slug)
+        try:
+            # savepoint, so that the surrounding transaction can go on after an IntegrityError
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS or not _is_slug_conflict(
+                model, [slug], slug_field
+            ):
+                raise
+
+
+def bulk_create_with_unique_slugs(
+    model, instances, base_slugs, slug_field="slug", max_length=50, batch_size=None
+):
+    """
+    Sets a unique slug allocated from each base slug (in the same order) on the instances, and bulk_create()s them, allocating every slug again if any of them is taken concurrently.
+
+    :raises IntegrityError: if it is not caused by the slugs, or a slug is still taken after MAX_ATTEMPTS
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        slugs = allocate_slugs(model, base_slugs, slug_field, max_length)
+        for instance, slug in zip(instances, slugs):
+            setattr(instance, slug_field, slug)
+        try:
+            with transaction.atomic():
+                return model.objects.bulk_create(instances, batch_size=batch_size)
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS or not _is_slug_conflict(
+                model, slugs, slug_field
+            ):
+                raise
+            # earlier batches were rolled back with the savepoint, but their instances got a pk
+            for instance in instances:
+                instance.pk = None
+                instance._state.adding = True
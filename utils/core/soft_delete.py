@@ -0,0 +1,119 @@
+"""
+Set based soft delete: safedelete's SOFT_DELETE_CASCADE loads every related row and save()s them one by one, soft_delete() does the same with a few UPDATE statements per model, no matter how many rows are deleted.
+"""
+
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models.deletion import ProtectedError, get_candidate_relations_to_delete
+from django.utils import timezone
+from safedelete.config import DELETED_BY_CASCADE_FIELD_NAME, FIELD_NAME
+from safedelete.models import is_safedelete_cls
+
+# rows of the querysets passed to soft_delete() are updated this many at a time
+ROOT_CHUNK_SIZE = 500
+
+
+def _get_pks(queryset):
+    # fetched once, since the rows don't match a `deleted IS NULL` filter anymore once they are deleted (querysets passed together can depend on each other, like addresses of the figures)
+    return list(
+        queryset.filter(**{f"{FIELD_NAME}__isnull": True}).values_list("pk", flat=True)
+    )
+
+
+def soft_delete(*querysets, user=None):
+    """
+    Soft deletes the non deleted rows of the querysets, and applies on_delete of the foreign keys pointing to them the same way safedelete's SOFT_DELETE_CASCADE does:
+    - CASCADE: rows of safedelete models are soft deleted as well (with deleted_by_cascade set), recursively. Rows of other models are left as they are.
+    - PROTECT: raises ProtectedError if any non deleted row (that isn't deleted as well) points to them, nothing is written then
+    - SET_NULL: the foreign key is set to null (on soft deleted rows as well), updated_at of these rows is not changed
+    - DO_NOTHING: nothing
+
+    Rows deleted together (for example a political figure and its addresses) keep their foreign keys to each other, like they do when they are deleted one after the other.
+    Deleted rows get updated_at (and updated_by, if `user` is given) like save() would set them, so that conditional GET validators, caches and the autocomplete index see the change.
+
+    Related rows are never loaded: every row deleted by a call gets the same `deleted` timestamp, and rows related to them are found with a subquery on it (`deleted` is indexed).
+
+    NOTE: save() of the rows is not called and safedelete's pre_softdelete/post_softdelete signals are not sent.
+
+    Usage:
+        soft_delete(PoliticalParty.objects.filter(pk=pk), user=get_current_authenticated_user())
+
+    :returns: (number of deleted rows, {model label: number of deleted rows}) like Model.delete()
+    :raises ProtectedError: if a PROTECT foreign key points to the rows
+    :raises NotImplementedError: for on_delete other than CASCADE, PROTECT, SET_NULL and DO_NOTHING
+    """
+    now = timezone.now()
+    values = {FIELD_NAME: now, "updated_at": now}
+    if user:
+        values["updated_by"] = user
+
+    def deleted_now(model):
+        return model._base_manager.filter(**{FIELD_NAME: now})
+
+    counter = Counter()
+    with transaction.atomic():
+        roots = [(queryset.model, _get_pks(queryset)) for queryset in querysets]
+        for model, pks in roots:
+            for i in range(0, len(pks), ROOT_CHUNK_SIZE):
+                counter[model._meta.label] += model._base_manager.filter(
+                    pk__in=pks[i : i + ROOT_CHUNK_SIZE],
+                    **{f"{FIELD_NAME}__isnull": True},
+                ).update(**values)
+
+        # models whose rows were deleted, in order. Rows deleted by cascade are deleted_now() as well, so a model is only processed again when more of its rows were deleted
+        pending = [model for model, _ in roots]
+        reached = []
+        while pending:
+            model = pending.pop(0)
+            if model not in reached:
+                reached.append(model)
+            for relation in get_candidate_relations_to_delete(model._meta):
+                related_model = relation.related_model
+                field = relation.field
+                if field.remote_field.on_delete is not models.CASCADE:
+                    continue
+                if not is_safedelete_cls(related_model):
+                    continue
+                # safedelete only sets deleted_by_cascade of rows deleted by cascade
+                count = related_model._base_manager.filter(
+                    **{
+                        f"{FIELD_NAME}__isnull": True,
+                        f"{field.name}__in": deleted_now(model),
+                    }
+                ).update(**values, **{DELETED_BY_CASCADE_FIELD_NAME: True})
+                if count:
+                    counter[related_model._meta.label] += count
+                    pending.append(related_model)
+
+        for model in reached:
+            for relation in get_candidate_relations_to_delete(model._meta):
+                related_model = relation.related_model
+                field = relation.field
+                on_delete = field.remote_field.on_delete
+                related = related_model._base_manager.filter(
+                    **{f"{field.name}__in": deleted_now(model)}
+                )
+
+                if on_delete is models.CASCADE:
+                    # done above, rows of other models are left as they are
+                    continue
+                elif on_delete is models.PROTECT:
+                    if is_safedelete_cls(related_model):
+                        related = related.filter(**{f"{FIELD_NAME}__isnull": True})
+                    if related.exists():
+                        # NOTE: rolls back what was written so far
+                        raise ProtectedError(
+                            f"Cannot delete some instances of model {model.__name__!r} because they are referenced through protected foreign keys: {related_model.__name__}.{field.name}",
+                            set(related),
+                        )
+                elif on_delete is models.SET_NULL:
+                    if is_safedelete_cls(related_model):
+                        related = related.exclude(**{FIELD_NAME: now})
+                    related.update(**{field.name: None})
+                elif on_delete is not models.DO_NOTHING:
+                    raise NotImplementedError(
+                        f"soft_delete() does not support on_delete of {related_model.__name__}.{field.name}"
+                    )
+
+    return sum(counter.values()), dict(counter)
@@ -0,0 +1,96 @@
+from drf_spectacular.utils import OpenApiParameter
+
+from utils.core.exceptions import ApplicationError
+
+FIELDS_QUERY_PARAM = "fields"
+EXCLUDE_QUERY_PARAM = "exclude"
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Allows passing `fields` to a serializer to only output those fields.
+    Use get_requested_fields() to get `fields` from the request's ?fields= and ?exclude= query params.
+
+    Usage:
+        class OutputSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+            ...
+
+        serializer = OutputSerializer(instance, fields=["id", "slug"])
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+def _parse_query_param(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [field.strip() for field in value.split(",") if field.strip()]
+
+
+def get_requested_fields(request, serializer_class):
+    """
+    Returns the list of output fields requested using either ?fields=a,b or ?exclude=c,d, in the order of serializer_class.Meta.fields.
+    Returns None if neither is sent, which means all fields.
+
+    :raises ApplicationError: if an unknown field is requested, or if both are sent
+    """
+    fields = _parse_query_param(request, FIELDS_QUERY_PARAM)
+    exclude = _parse_query_param(request, EXCLUDE_QUERY_PARAM)
+
+    if fields is None and exclude is None:
+        return None
+
+    if fields is not None and exclude is not None:
+        raise ApplicationError(
+            "Invalid fields",
+            extra={
+                EXCLUDE_QUERY_PARAM: f"Can't be used together with {FIELDS_QUERY_PARAM}"
+            },
+        )
+
+    available_fields = list(serializer_class.Meta.fields)
+
+    errors = {}
+    for param, requested in (
+        (FIELDS_QUERY_PARAM, fields),
+        (EXCLUDE_QUERY_PARAM, exclude),
+    ):
+        unknown = [field for field in requested or [] if field not in available_fields]
+        if unknown:
+            errors[param] = f"Unknown field(s): {', '.join(unknown)}"
+    if errors:
+        raise ApplicationError("Invalid fields", extra=errors)
+
+    if fields is not None:
+        selected = set(fields)
+    else:
+        selected = set(available_fields) - set(exclude)
+
+    return [field for field in available_fields if field in selected]
+
+
+def get_sparse_fieldset_schema_parameters(serializer_class):
+    """
+    Query parameters for drf-spectacular's extend_schema(parameters=...)
+    """
+    available_fields = ", ".join(serializer_class.Meta.fields)
+    return [
+        OpenApiParameter(
+            name=FIELDS_QUERY_PARAM,
+            type=str,
+            required=False,
+            description=f"Comma separated fields to include. Available: {available_fields}",
+        ),
+        OpenApiParameter(
+            name=EXCLUDE_QUERY_PARAM,
+            type=str,
+            required=False,
+            description=f"Comma separated fields to exclude, instead of {FIELDS_QUERY_PARAM}",
+        ),
+    ]
@@ -0,0 +1,45 @@
+"""
+Streamed JSON responses for lists too large to build in memory (a full table, for example), see utils/core/response_wrappers.py:StreamingOKResponse.
+
+Rows are read with a server-side cursor (QuerySet.iterator()) and rendered a chunk at a time while the response is being sent, so memory use depends on the chunk size, not on the number of rows.
+"""
+
+from drf_spectacular.utils import OpenApiParameter
+
+from utils.core.exceptions import ApplicationError
+from utils.core.facets import parse_bool
+
+STREAM_QUERY_PARAM = "stream"
+
+# rows fetched from the database and rendered at a time
+STREAM_CHUNK_SIZE = 2000
+
+
+def should_stream(request, default=False):
+    """
+    Whether the response should be streamed, with ?stream=1 (or ?stream=0 to not stream a view that streams by default).
+
+    :param default: whether the view streams when ?stream= is not sent
+    :raises ApplicationError: if ?stream= is not a boolean
+    """
+    value = request.query_params.get(STREAM_QUERY_PARAM)
+    if value is None:
+        return default
+    try:
+        return parse_bool(value)
+    except ValueError as e:
+        raise ApplicationError("Invalid stream", extra={STREAM_QUERY_PARAM: str(e)})
+
+
+def get_stream_schema_parameters():
+    """
+    Query parameters for drf-spectacular's extend_schema(parameters=...)
+    """
+    return [
+        OpenApiParameter(
+            name=STREAM_QUERY_PARAM,
+            type=bool,
+            required=False,
+            description="Stream every row (not paginated) as it is read from the database, for very large lists. Only for JSON responses",
+        )
+    ]
@@ -1,12 +1,173 @@
+from apps.core.models import Address
+from apps.core.serializers import (
+    BulkDeleteSerializer,
+    BulkUpdateSerializer,
+    GetAddressSerializer,
+)
 from apps.political_figure.models import PoliticalFigure
+from apps.political_party.models import PoliticalParty
 from apps.political_figure.serializers import (
+    BulkCreatePoliticalFigureItemSerializer,
+    BulkCreatePoliticalFigureSerializer,
+    BulkUpdatePoliticalFigureItemSerializer,
     CreatePoliticalFigureSerializer,
     UpdatePoliticalFigureSerializer,
 )
+import sys
+import uuid
+
 from django.db import transaction
+from django.db.models import Max, Q
+from django_countries import countries
+from django_currentuser.middleware import get_current_authenticated_user
+from rest_framework import serializers
 
 from utils.core.address_util import AddressUtil
-from utils.core.general import update_model_instance
+from utils.core.autocomplete import AutocompleteIndex, get_suffix_keys
+from utils.core.bulk import (
+    bulk_update_changed,
+    get_item_errors,
+    validate_bulk_update,
+    validate_items,
+)
+from utils.core.bulk_load import load_rows, load_rows_with_unique_slugs
+from utils.core.cache import bump_model_generation_on_commit, get_model_generation
+from utils.core.export import ExportDataset
+from utils.core.facets import (
+    Facet,
+    choice_parser,
+    filter_by_facets,
+    get_facet_counts,
+    parse_bool,
+    parse_int,
+)
+from utils.core.full_text_search import (
+    POLITICAL_FIGURE_DOCUMENT,
+    refresh_search_documents,
+    search,
+)
+from utils.core.fuzzy_search import fuzzy_search, normalize_name
+from utils.core.json_fragments import JSONFragmentCache
+from utils.core.soft_delete import soft_delete
+from utils.core.slugs import bulk_create_with_unique_slugs, get_base_slug
+from utils.core.general import (
+    get_model_validators,
+    make_etag,
+    update_model_instance,
+)
+
+
+class PoliticalFigureAutocompleteIndex(AutocompleteIndex):
+    """
+    Figures by full name or slug first, then by any later word of the full name (so "deuba" finds "Sher Bahadur Deuba"), then by any word of the party name or the abbreviation.
+    payload: (slug, full_name, party name, party id)
+    """
+
+    tiers = 3
+
+    def get_generations(self):
+        return (
+            get_model_generation(PoliticalFigure),
+            get_model_generation(PoliticalParty),
+        )
+
+    def get_db_watermark(self):
+        # NOTE: answered from the (updated_at, deleted) index of each table
+        watermarks = [
+            model.all_objects.aggregate(watermark=Max("updated_at"))["watermark"]
+            for model in (PoliticalFigure, PoliticalParty)
+        ]
+        return max(filter(None, watermarks), default=None)
+
+    @staticmethod
+    def get_keys(full_name, slug, party_keys=()):
+        """
+        Returns keys of each tier, see AutocompleteIndex. party_keys are from get_party_keys().
+        """
+        name_keys = get_suffix_keys(full_name)
+        slug_key = normalize_name(slug)
+        first_tier = tuple(dict.fromkeys(filter(None, [*name_keys[:1], slug_key])))
+        second_tier = tuple(
+            key for key in dict.fromkeys(name_keys[1:]) if key not in first_tier
+        )
+        return first_tier, second_tier, party_keys
+
+    @staticmethod
+    def get_party_keys(party_name, party_abbreviation):
+        keys = [*get_suffix_keys(party_name), normalize_name(party_abbreviation)]
+        return tuple(dict.fromkeys(filter(None, keys)))
+
+    def fetch_documents(self, since):
+        # soft deleted rows are needed as well, to remove them
+        political_figures = PoliticalFigure.all_objects.all()
+
+        if since is not None:
+            changed_party_ids = set(
+                PoliticalParty.all_objects.filter(updated_at__gte=since).values_list(
+                    "id", flat=True
+                )
+            )
+            # NOTE: when a party is deleted, the foreign key of its figures is set to NULL without changing their updated_at, so use the party we have in memory
+            member_ids = [
+                pk
+                for pk, (_, payload) in self.documents.items()
+                if payload[3] in changed_party_ids
+            ]
+            political_figures = political_figures.filter(
+                Q(updated_at__gte=since)
+                | Q(political_party_id__in=changed_party_ids)
+                | Q(id__in=member_ids)
+            )
+
+        rows = political_figures.values_list(
+            "id",
+            "slug",
+            "full_name",
+            "deleted",
+            "updated_at",
+            "political_party_id",
+            "political_party__name",
+            "political_party__abbreviation",
+            "political_party__deleted",
+            "political_party__updated_at",
+        )
+
+        documents, watermark = {}, None
+        # the keys of a party are shared by all of its figures instead of being copied for each one
+        party_keys = {}
+        for (
+            pk,
+            slug,
+            full_name,
+            deleted,
+            updated_at,
+            party_id,
+            party_name,
+            party_abbreviation,
+            party_deleted,
+            party_updated_at,
+        ) in rows.iterator(chunk_size=2000):
+            watermark = max(filter(None, (watermark, updated_at, party_updated_at)))
+
+            if deleted is not None:
+                documents[pk] = None
+                continue
+            if party_deleted is not None:
+                party_id = party_name = party_abbreviation = None
+
+            if party_id is not None and party_id not in party_keys:
+                party_keys[party_id] = self.get_party_keys(
+                    party_name, party_abbreviation
+                )
+            keys = self.get_keys(full_name, slug, party_keys.get(party_id, ()))
+            party_name = sys.intern(party_name) if party_name else None
+            documents[pk] = (keys, (slug, full_name, party_name, party_id))
+
+        return documents, watermark
+
+
+# NOTE: one per worker process, see utils/core/autocomplete.py
+political_figure_autocomplete_index = PoliticalFigureAutocompleteIndex()
 
 
 class PoliticalFigureUtil:
@@ -16,6 +177,249 @@ class PoliticalFigureUtil:
 
     create_serializer = CreatePoliticalFigureSerializer
     update_serializer = UpdatePoliticalFigureSerializer
+    bulk_create_serializer = BulkCreatePoliticalFigureSerializer
+    bulk_create_item_serializer = BulkCreatePoliticalFigureItemSerializer
+    bulk_update_serializer = BulkUpdateSerializer
+    bulk_update_item_serializer = BulkUpdatePoliticalFigureItemSerializer
+    bulk_delete_serializer = BulkDeleteSerializer
+
+    # columns always loaded, created_at is needed for keyset pagination
+    required_read_fields = ["id", "created_at"]
+    # columns read by GetPoliticalFigureDetailAPI.OutputSerializer, named the same as the output fields
+    read_fields = [
+        "uuid",
+        "slug",
+        "full_name",
+        "date_of_birth",
+        "gender",
+        "biography",
+        "photo",
+        "contact_number",
+        "website",
+        "facebook_url",
+        "twitter_url",
+        "instagram_url",
+        "is_active",
+    ]
+    read_address_relations = ["home_address", "current_address"]
+    read_address_fields = GetAddressSerializer.Meta.fields
+    # output field -> political party column
+    read_party_fields = {
+        "political_party_name": "name",
+        "political_party_slug": "slug",
+    }
+
+    # filters of the list API, see utils/core/facets.py
+    facets = [
+        Facet(
+            "political_party",
+            "political_party_id",
+            parse=parse_int,
+            label_field="political_party__name",
+        ),
+        Facet(
+            "gender",
+            "gender",
+            parse=choice_parser(PoliticalFigure.Gender),
+            get_label=lambda value: PoliticalFigure.Gender(value).label,
+        ),
+        Facet("is_active", "is_active", parse=parse_bool),
+        *[
+            Facet(f"{prefix}_{field}", f"{prefix}_address__{field}", **extra)
+            for prefix in ("home", "current")
+            for field, extra in (
+                ("country", {"get_label": countries.name}),
+                ("region", {}),
+                ("city", {}),
+            )
+        ],
+    ]
+
+    # relations in the output, their updated_at is a part of the version of a political figure's output
+    output_relations = ["home_address", "current_address", "political_party"]
+
+    @staticmethod
+    def get_version_queryset():
+        """
+        Returns rows (named tuples, not model instances, since this is about the cheapest query that can be done for a page) of pk, created_at (for keyset pagination) and the updated_at of the political figure and of every related row in its output, to look up its pre-rendered output (see fragment_cache) before loading every column.
+        """
+        return PoliticalFigure.objects.values_list(
+            "pk",
+            "created_at",
+            "updated_at",
+            *[
+                f"{relation}__updated_at"
+                for relation in PoliticalFigureUtil.output_relations
+            ],
+            named=True,
+        )
+
+    # rendered GetPoliticalFigureDetailAPI.OutputSerializer output of each political figure, see utils/core/json_fragments.py
+    # versions are the updated_at columns of get_version_queryset() rows
+    fragment_cache = JSONFragmentCache("political_figure", lambda row: row[2:])
+
+    # full dataset exports, see utils/core/export.py. Addresses and party are flattened into columns
+    export_dataset = ExportDataset(
+        name="political_figures",
+        get_queryset=lambda: PoliticalFigure.objects.all(),
+        columns={
+            **{
+                field: field
+                for field in [
+                    "id",
+                    *read_fields,
+                    "political_party_id",
+                    "created_at",
+                    "updated_at",
+                ]
+            },
+            "political_party_name": "political_party__name",
+            "political_party_slug": "political_party__slug",
+            "political_party_abbreviation": "political_party__abbreviation",
+            **{
+                f"{relation}_{field}": f"{relation}__{field}"
+                for relation in read_address_relations
+                # NOTE: not read_address_fields, class attributes other than the first iterable aren't visible in a comprehension
+                for field in GetAddressSerializer.Meta.fields
+            },
+        },
+    )
+
+    @staticmethod
+    def filter_political_figures(queryset, filters):
+        """
+        :param filters: from utils/core/facets.py:get_facet_filters() with PoliticalFigureUtil.facets
+        """
+        return filter_by_facets(queryset, PoliticalFigureUtil.facets, filters)
+
+    @staticmethod
+    def get_facet_counts(filters, requested_facets):
+        """
+        Returns counts of each value of the requested facets among political figures matching the other filters, one grouped query per facet.
+        """
+        return get_facet_counts(
+            PoliticalFigure.objects.all(),
+            PoliticalFigureUtil.facets,
+            filters,
+            requested_facets,
+        )
+
+    @staticmethod
+    def get_read_queryset(fields=None):
+        """
+        Returns political figure queryset for read views.
+        Addresses and political party are joined (select_related) instead of fetched in separate queries, and only the columns needed by the output serializer are selected, so it is always a single query regardless of the number of rows.
+
+        :param fields: output fields of GetPoliticalFigureDetailAPI.OutputSerializer that will be serialized (see utils/core/sparse_fieldsets.py), defaults to None (all fields). Relations that are not needed are not joined.
+        """
+
+        def is_requested(field):
+            return fields is None or field in fields
+
+        only_fields = list(PoliticalFigureUtil.required_read_fields)
+        only_fields.extend(
+            field for field in PoliticalFigureUtil.read_fields if is_requested(field)
+        )
+
+        relations = [
+            (relation, PoliticalFigureUtil.read_address_fields)
+            for relation in PoliticalFigureUtil.read_address_relations
+            if is_requested(relation)
+        ]
+        party_fields = [
+            column
+            for field, column in PoliticalFigureUtil.read_party_fields.items()
+            if is_requested(field)
+        ]
+        if party_fields:
+            relations.append(("political_party", party_fields))
+
+        # NOTE: the foreign key itself must not be deferred if it is traversed with select_related
+        for relation, relation_fields in relations:
+            only_fields.append(relation)
+            only_fields.extend(f"{relation}__{field}" for field in relation_fields)
+
+        return (
+            PoliticalFigure.objects.all()
+            .select_related(*[relation for relation, _ in relations])
+            .only(*only_fields)
+        )
+
+    @staticmethod
+    def search_political_figures(query, limit, offset=0, fields=None):
+        """
+        Returns political figures matching the full text search query (full name, biography, party name and abbreviation), best match first.
+
+        :param fields: see get_read_queryset()
+        """
+        ids = search(POLITICAL_FIGURE_DOCUMENT, query, limit=limit, offset=offset)
+        political_figures = PoliticalFigureUtil.get_read_queryset(
+            fields=fields
+        ).in_bulk(ids)
+        # keep the order of the ranked ids
+        return [political_figures[pk] for pk in ids if pk in political_figures]
+
+    @staticmethod
+    def fuzzy_search_political_figures(query, limit, fields=None):
+        """
+        Returns political figures whose full name is the most similar to the query (typos, spacing, romanization variations and Devanagari are tolerated), best match first.
+        Each political figure has a `similarity` attribute between 0 and 1.
+
+        :param fields: see get_read_queryset()
+        """
+        scores = dict(fuzzy_search(PoliticalFigure._meta.db_table, query, limit=limit))
+        political_figures = PoliticalFigureUtil.get_read_queryset(
+            fields=fields
+        ).in_bulk(scores)
+        results = []
+        for pk, score in scores.items():
+            if pk in political_figures:
+                political_figures[pk].similarity = score
+                results.append(political_figures[pk])
+        return results
+
+    @staticmethod
+    def autocomplete_political_figures(query, limit):
+        """
+        Returns [{id, slug, full_name, party}, ...] of up to `limit` political figures for search as you type, from the in-process index (no database query unless the index has to be refreshed).
+        """
+        return [
+            {"id": pk, "slug": slug, "full_name": full_name, "party": party_name}
+            for pk, (
+                slug,
+                full_name,
+                party_name,
+                _,
+            ) in political_figure_autocomplete_index.search(query, limit=limit)
+        ]
+
+    @staticmethod
+    def get_list_validators():
+        """
+        Returns (etag, last_modified) for the political figure list, see utils/core/base_views.py:ConditionalGetMixin
+        """
+        # list contains political party name and slug as well
+        return get_model_validators(PoliticalFigure, PoliticalParty)
+
+    @staticmethod
+    def get_detail_validators(pk):
+        """
+        Returns (etag, last_modified) for a political figure, using updated_at of the figure and every related row in its output, or (None, None) if it does not exist.
+        """
+        row = (
+            PoliticalFigure.objects.filter(pk=pk)
+            .values_list(
+                "updated_at",
+                "home_address__updated_at",
+                "current_address__updated_at",
+                "political_party__updated_at",
+            )
+            .first()
+        )
+        if row is None:
+            return None, None
+
+        return make_etag(*row), max(updated_at for updated_at in row if updated_at)
 
     @staticmethod
     def create_political_figure(data):
@@ -48,8 +452,218 @@ class PoliticalFigureUtil:
             political_figure = PoliticalFigure(**political_figure_data)
             political_figure.save()
 
+            bump_model_generation_on_commit(PoliticalFigure)
+
         return political_figure
 
+    @staticmethod
+    def validate_political_figures(items):
+        """
+        Validates many political figures to create, with one query for all of their political parties.
+
+        :param items: list of create serializer input (dicts)
+        :returns: (list of validated data or None, list of errors or None), both in the order of items
+        """
+        party_ids = set()
+        for item in items:
+            try:
+                party_ids.add(int(item.get("political_party")))
+            except (TypeError, ValueError):
+                # null, missing or invalid, reported by the serializer
+                pass
+        context = {"political_parties": PoliticalParty.objects.in_bulk(party_ids)}
+
+        return validate_items(
+            PoliticalFigureUtil.bulk_create_item_serializer(context=context), items
+        )
+
+    @staticmethod
+    def bulk_create_political_figures(items, allow_partial=False, batch_size=500):
+        """
+        Creates many political figures in one transaction, with a few queries per batch instead of a few per figure: items are validated together, slugs are allocated at once and addresses and figures are inserted with bulk_create().
+
+        :param items: list of create serializer input (dicts)
+        :param allow_partial: if True, valid items are created and the errors of invalid items are returned. Otherwise nothing is created if any item is invalid.
+        :returns: (created political figures, [{"index", "errors"}, ...] of the invalid items)
+        :raises ValidationError: if an item is invalid and allow_partial is False, with the errors of each item under `items` ({} for valid ones, like DRF's many=True serializers)
+        """
+        validated, errors = PoliticalFigureUtil.validate_political_figures(items)
+        item_errors = get_item_errors(errors, allow_partial)
+        validated = [data for data in validated if data is not None]
+        if not validated:
+            return [], item_errors
+
+        political_figures = PoliticalFigureUtil.insert_political_figures(
+            validated, batch_size=batch_size
+        )
+        return political_figures, item_errors
+
+    @staticmethod
+    def insert_political_figures(validated, batch_size=500):
+        """
+        Inserts political figures from validated data of the create serializer (with political_party or political_party_id) in one transaction, see bulk_create_political_figures().
+        NOTE: address data is popped from the dicts of `validated`.
+
+        :returns: created political figures, in the order of validated
+        """
+        if not validated:
+            return []
+
+        user = get_current_authenticated_user()
+
+        with transaction.atomic():
+            # validated address data is popped so that the rest is the figure's fields
+            address_pairs = [
+                (
+                    Address(**data.pop("home_address")),
+                    Address(**data.pop("current_address")),
+                )
+                for data in validated
+            ]
+            addresses = [address for pair in address_pairs for address in pair]
+            for address in addresses:
+                address.set_user_audit_fields(user)
+            Address.objects.bulk_create(addresses, batch_size=batch_size)
+
+            political_figures = []
+            for data, (home_address, current_address) in zip(validated, address_pairs):
+                # same as PoliticalFigure.save() does for a single figure, slugs are set below
+                political_figure = PoliticalFigure(
+                    **data,
+                    search_key=normalize_name(data["full_name"]),
+                    home_address=home_address,
+                    current_address=current_address,
+                )
+                political_figure.set_user_audit_fields(user)
+                political_figures.append(political_figure)
+            bulk_create_with_unique_slugs(
+                PoliticalFigure,
+                political_figures,
+                [
+                    get_base_slug(data["full_name"], PoliticalFigure)
+                    for data in validated
+                ],
+                batch_size=batch_size,
+            )
+
+            refresh_search_documents(
+                POLITICAL_FIGURE_DOCUMENT,
+                ids=[political_figure.pk for political_figure in political_figures],
+            )
+            bump_model_generation_on_commit(PoliticalFigure)
+
+        return political_figures
+
+    @staticmethod
+    def load_political_figures(validated):
+        """
+        Same as insert_political_figures(), with the bulk loader (see utils/core/bulk_load.py) instead of bulk_create(): a few statements no matter how many figures, for imports of large datasets.
+
+        :param validated: validated data of the create serializer (with political_party or political_party_id), the dicts are not changed
+        :returns: ids of the created political figures, in the order of validated
+        """
+        if not validated:
+            return []
+
+        user = get_current_authenticated_user()
+        addresses, rows = [], []
+        for data in validated:
+            row = dict(data)
+            if "political_party" in row:
+                political_party = row.pop("political_party")
+                row["political_party_id"] = political_party and political_party.pk
+            # addresses are referenced by their uuid until they have an id, see load_rows()
+            for field in ("home_address", "current_address"):
+                address = {**row.pop(field), "uuid": uuid.uuid4()}
+                addresses.append(address)
+                row[f"{field}_id"] = address["uuid"]
+            row["search_key"] = normalize_name(row["full_name"])
+            rows.append(row)
+
+        with transaction.atomic():
+            load_rows(Address, addresses, user=user)
+            ids = load_rows_with_unique_slugs(
+                PoliticalFigure,
+                rows,
+                [get_base_slug(row["full_name"], PoliticalFigure) for row in rows],
+                references={"home_address_id": Address, "current_address_id": Address},
+                search_document=POLITICAL_FIGURE_DOCUMENT,
+                user=user,
+            )
+            bump_model_generation_on_commit(PoliticalFigure)
+
+        return ids
+
+    @staticmethod
+    def bulk_update_political_figures(items, allow_partial=False, batch_size=500):
+        """
+        Partially updates many political figures in one transaction: figures (with their addresses) and their new political parties are loaded with one query each, changes are validated with the update serializer and written with bulk_update(), one UPDATE for each set of changed columns.
+
+        :param items: list of {"id", "changes"}, changes are the update serializer input (without photo)
+        :param allow_partial: if True, valid items are updated and the errors of invalid items are returned. Otherwise nothing is updated if any item is invalid.
+        :returns: (updated political figures, [{"index", "errors"}, ...] of the invalid items)
+        :raises ValidationError: if an item is invalid and allow_partial is False
+        """
+        party_ids = set()
+        for item in items:
+            try:
+                party_ids.add(int(item["changes"].get("political_party")))
+            except (TypeError, ValueError):
+                # not changed, null or invalid, reported by the serializer
+                pass
+
+        political_figures = PoliticalFigure.objects.select_related(
+            "home_address", "current_address"
+        ).in_bulk([item["id"] for item in items])
+        context = {"political_parties": PoliticalParty.objects.in_bulk(party_ids)}
+
+        validated, errors = validate_bulk_update(
+            items,
+            political_figures,
+            PoliticalFigureUtil.bulk_update_item_serializer,
+            context=context,
+        )
+        item_errors = get_item_errors(errors, allow_partial)
+        validated = [pair for pair in validated if pair is not None]
+        if not validated:
+            return [], item_errors
+
+        figure_changes, address_changes = [], []
+        for political_figure, data in validated:
+            data = dict(data)
+            for field in ["home_address", "current_address"]:
+                address_data = data.pop(field, None)
+                if address_data:
+                    address_changes.append(
+                        (getattr(political_figure, field), address_data)
+                    )
+            # same as PoliticalFigure.save() does for a single figure
+            if "full_name" in data:
+                data["search_key"] = normalize_name(data["full_name"])
+            # figures with only address changes get a new updated_at as well, like update_political_figure()
+            figure_changes.append((political_figure, data))
+
+        user = get_current_authenticated_user()
+
+        with transaction.atomic():
+            bulk_update_changed(Address, address_changes, user, batch_size=batch_size)
+            bulk_update_changed(
+                PoliticalFigure, figure_changes, user, batch_size=batch_size
+            )
+
+            # party name and abbreviation are a part of the search documents as well
+            refresh_search_documents(
+                POLITICAL_FIGURE_DOCUMENT,
+                ids=[
+                    political_figure.pk
+                    for political_figure, data in figure_changes
+                    if data.keys() & {"full_name", "biography", "political_party"}
+                ],
+            )
+            bump_model_generation_on_commit(PoliticalFigure)
+
+        return [political_figure for political_figure, _ in figure_changes], item_errors
+
     @staticmethod
     def update_political_figure(political_figure: PoliticalFigure, data):
         """
@@ -92,6 +706,8 @@ class PoliticalFigureUtil:
 
             update_model_instance(political_figure, **political_figure_data)
 
+            bump_model_generation_on_commit(PoliticalFigure)
+
             # handle image deletion
             # Handle photo logic before updating the model
             # handle image deletion / replacement
@@ -121,10 +737,48 @@ class PoliticalFigureUtil:
 
     @staticmethod
     def delete_political_figure(political_figure: PoliticalFigure):
+        PoliticalFigureUtil.delete_political_figures([political_figure.pk])
+
+    @staticmethod
+    def delete_political_figures(ids):
+        """
+        Soft deletes the political figures and their addresses with a fixed number of queries, no matter how many there are (see utils/core/soft_delete.py).
+
+        :returns: number of deleted political figures
+        """
+        political_figures = PoliticalFigure.objects.filter(pk__in=ids)
+        addresses = Address.objects.filter(
+            Q(pk__in=political_figures.values("home_address"))
+            | Q(pk__in=political_figures.values("current_address"))
+        )
+
         with transaction.atomic():
-            home_address = political_figure.home_address
-            current_address = political_figure.current_address
+            _, deleted = soft_delete(
+                political_figures, addresses, user=get_current_authenticated_user()
+            )
+
+            bump_model_generation_on_commit(PoliticalFigure)
+
+        return deleted.get(PoliticalFigure._meta.label, 0)
+
+    @staticmethod
+    def bulk_delete_political_figures(ids):
+        """
+        Soft deletes the political figures and their addresses, see delete_political_figures().
+
+        :raises ValidationError: if any of the political figures does not exist, nothing is deleted then
+        """
+        ids = set(ids)
+        missing = ids - set(
+            PoliticalFigure.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError(
+                {
+                    "ids": [
+                        f"Political figures do not exist: {', '.join(map(str, sorted(missing)))}"
+                    ]
+                }
+            )
 
-            home_address.delete()
-            current_address.delete()
-            political_figure.delete()
+        return PoliticalFigureUtil.delete_political_figures(ids)
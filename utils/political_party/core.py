@@ -1,8 +1,34 @@
+from apps.core.serializers import BulkUpdateSerializer
+from apps.political_figure.models import PoliticalFigure
 from apps.political_party.models import PoliticalParty
 from apps.political_party.serializers import (
     CreatePoliticalPartySerializer,
     UpdatePoliticalPartySerializer,
 )
+from django.db import transaction
+from django_currentuser.middleware import get_current_authenticated_user
+
+from utils.core.bulk import (
+    bulk_update_changed,
+    get_item_errors,
+    validate_bulk_update,
+    validate_items,
+)
+from utils.core.bulk_load import load_rows_with_unique_slugs
+from utils.core.cache import bump_model_generation_on_commit
+from utils.core.export import ExportDataset
+from utils.core.full_text_search import (
+    POLITICAL_FIGURE_DOCUMENT,
+    POLITICAL_FIGURE_WITHOUT_PARTY_DOCUMENT,
+    POLITICAL_PARTY_DOCUMENT,
+    refresh_search_documents,
+    search,
+)
+from utils.core.fuzzy_search import fuzzy_search, normalize_name
+from utils.core.general import get_model_validators, make_etag
+from utils.core.json_fragments import JSONFragmentCache
+from utils.core.slugs import bulk_create_with_unique_slugs, get_base_slug
+from utils.core.soft_delete import soft_delete
 
 
 class PoliticalPartyUtil:
@@ -12,6 +38,116 @@ class PoliticalPartyUtil:
 
     create_serializer = CreatePoliticalPartySerializer
     update_serializer = UpdatePoliticalPartySerializer
+    bulk_update_serializer = BulkUpdateSerializer
+
+    # columns always loaded, created_at is needed for ordering
+    required_read_fields = ["id", "created_at"]
+
+    @staticmethod
+    def get_version_queryset():
+        """
+        Returns rows (named tuples) of pk, created_at and updated_at, to look up pre-rendered output (see fragment_cache) before loading every column.
+        """
+        return PoliticalParty.objects.values_list(
+            "pk", "created_at", "updated_at", named=True
+        )
+
+    # rendered GetPoliticalPartyDetailAPI.OutputSerializer output of each political party, see utils/core/json_fragments.py
+    fragment_cache = JSONFragmentCache("political_party", lambda row: row[2:])
+
+    # full dataset exports, see utils/core/export.py
+    export_dataset = ExportDataset(
+        name="political_parties",
+        get_queryset=lambda: PoliticalParty.objects.all(),
+        columns={
+            field: field
+            for field in [
+                "id",
+                "uuid",
+                "name",
+                "slug",
+                "abbreviation",
+                "founded_date",
+                "dissolved_date",
+                "description",
+                "ideology",
+                "hq_location",
+                "website",
+                "logo_url",
+                "created_at",
+                "updated_at",
+            ]
+        },
+    )
+
+    @staticmethod
+    def get_read_queryset(fields=None):
+        """
+        Returns political party queryset for read views.
+
+        :param fields: output fields of GetPoliticalPartyDetailAPI.OutputSerializer that will be serialized (see utils/core/sparse_fieldsets.py), defaults to None (all fields). Other columns are deferred.
+        """
+        queryset = PoliticalParty.objects.all()
+        if fields is None:
+            return queryset
+
+        # output fields of the party serializer are named the same as the model fields
+        return queryset.only(*PoliticalPartyUtil.required_read_fields, *fields)
+
+    @staticmethod
+    def search_political_parties(query, limit, offset=0, fields=None):
+        """
+        Returns political parties matching the full text search query (name, abbreviation, ideology and description), best match first.
+
+        :param fields: see get_read_queryset()
+        """
+        ids = search(POLITICAL_PARTY_DOCUMENT, query, limit=limit, offset=offset)
+        political_parties = PoliticalPartyUtil.get_read_queryset(fields=fields).in_bulk(
+            ids
+        )
+        # keep the order of the ranked ids
+        return [political_parties[pk] for pk in ids if pk in political_parties]
+
+    @staticmethod
+    def fuzzy_search_political_parties(query, limit, fields=None):
+        """
+        Returns political parties whose name is the most similar to the query (typos, spacing, romanization variations and Devanagari are tolerated), best match first.
+        Each political party has a `similarity` attribute between 0 and 1.
+
+        :param fields: see get_read_queryset()
+        """
+        scores = dict(fuzzy_search(PoliticalParty._meta.db_table, query, limit=limit))
+        political_parties = PoliticalPartyUtil.get_read_queryset(fields=fields).in_bulk(
+            scores
+        )
+        results = []
+        for pk, score in scores.items():
+            if pk in political_parties:
+                political_parties[pk].similarity = score
+                results.append(political_parties[pk])
+        return results
+
+    @staticmethod
+    def get_list_validators():
+        """
+        Returns (etag, last_modified) for the political party list, see utils/core/base_views.py:ConditionalGetMixin
+        """
+        return get_model_validators(PoliticalParty)
+
+    @staticmethod
+    def get_detail_validators(pk):
+        """
+        Returns (etag, last_modified) for a political party, or (None, None) if it does not exist.
+        """
+        updated_at = (
+            PoliticalParty.objects.filter(pk=pk)
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return None, None
+
+        return make_etag(updated_at), updated_at
 
     @staticmethod
     def create_political_party(data):
@@ -26,8 +162,95 @@ class PoliticalPartyUtil:
 
         political_party = serializer.save()
 
+        bump_model_generation_on_commit(PoliticalParty)
+
         return political_party
 
+    @staticmethod
+    def bulk_create_political_parties(items, allow_partial=False, batch_size=500):
+        """
+        Creates many political parties in one transaction, with a few queries per batch: items are validated with the create serializer (which needs no query), slugs are allocated at once and parties are inserted with bulk_create().
+
+        :param items: list of create serializer input (dicts)
+        :param allow_partial: if True, valid items are created and the errors of invalid items are returned. Otherwise nothing is created if any item is invalid.
+        :returns: (created political parties, [{"index", "errors"}, ...] of the invalid items)
+        :raises ValidationError: if an item is invalid and allow_partial is False
+        """
+        validated, errors = validate_items(
+            PoliticalPartyUtil.create_serializer(), items
+        )
+        item_errors = get_item_errors(errors, allow_partial)
+        validated = [data for data in validated if data is not None]
+        if not validated:
+            return [], item_errors
+
+        political_parties = PoliticalPartyUtil.insert_political_parties(
+            validated, batch_size=batch_size
+        )
+        return political_parties, item_errors
+
+    @staticmethod
+    def insert_political_parties(validated, batch_size=500):
+        """
+        Inserts political parties from validated data of the create serializer in one transaction, see bulk_create_political_parties().
+
+        :returns: created political parties, in the order of validated
+        """
+        if not validated:
+            return []
+
+        user = get_current_authenticated_user()
+
+        with transaction.atomic():
+            political_parties = []
+            for data in validated:
+                # same as PoliticalParty.save() does for a single party, slugs are set below
+                political_party = PoliticalParty(
+                    **data, search_key=normalize_name(data["name"])
+                )
+                political_party.set_user_audit_fields(user)
+                political_parties.append(political_party)
+            bulk_create_with_unique_slugs(
+                PoliticalParty,
+                political_parties,
+                [get_base_slug(data["name"], PoliticalParty) for data in validated],
+                batch_size=batch_size,
+            )
+
+            refresh_search_documents(
+                POLITICAL_PARTY_DOCUMENT,
+                ids=[political_party.pk for political_party in political_parties],
+            )
+            bump_model_generation_on_commit(PoliticalParty)
+
+        return political_parties
+
+    @staticmethod
+    def load_political_parties(validated):
+        """
+        Same as insert_political_parties(), with the bulk loader (see utils/core/bulk_load.py) instead of bulk_create().
+
+        :param validated: validated data of the create serializer, the dicts are not changed
+        :returns: ids of the created political parties, in the order of validated
+        """
+        if not validated:
+            return []
+
+        rows = [
+            {**data, "search_key": normalize_name(data["name"])} for data in validated
+        ]
+        with transaction.atomic():
+            ids = load_rows_with_unique_slugs(
+                PoliticalParty,
+                rows,
+                [get_base_slug(row["name"], PoliticalParty) for row in rows],
+                search_document=POLITICAL_PARTY_DOCUMENT,
+                user=get_current_authenticated_user(),
+            )
+            bump_model_generation_on_commit(PoliticalParty)
+
+        return ids
+
     @staticmethod
     def update_political_party(political_party: PoliticalParty, data):
         """
@@ -42,8 +265,85 @@ class PoliticalPartyUtil:
 
         political_party = serializer.save()
 
+        bump_model_generation_on_commit(PoliticalParty)
+
         return political_party
 
+    @staticmethod
+    def bulk_update_political_parties(items, allow_partial=False, batch_size=500):
+        """
+        Partially updates many political parties in one transaction: parties are loaded with one query, changes are validated with the update serializer and written with bulk_update(), one UPDATE for each set of changed columns.
+
+        :param items: list of {"id", "changes"}, changes are the update serializer input
+        :param allow_partial: if True, valid items are updated and the errors of invalid items are returned. Otherwise nothing is updated if any item is invalid.
+        :returns: (updated political parties, [{"index", "errors"}, ...] of the invalid items)
+        :raises ValidationError: if an item is invalid and allow_partial is False
+        """
+        political_parties = PoliticalParty.objects.in_bulk(
+            [item["id"] for item in items]
+        )
+        validated, errors = validate_bulk_update(
+            items, political_parties, PoliticalPartyUtil.update_serializer
+        )
+        item_errors = get_item_errors(errors, allow_partial)
+        changes = [
+            (political_party, dict(data))
+            for political_party, data in filter(None, validated)
+        ]
+        if not changes:
+            return [], item_errors
+
+        for political_party, data in changes:
+            # same as PoliticalParty.save() does for a single party
+            if "name" in data:
+                data["search_key"] = normalize_name(data["name"])
+
+        with transaction.atomic():
+            bulk_update_changed(
+                PoliticalParty,
+                changes,
+                get_current_authenticated_user(),
+                batch_size=batch_size,
+            )
+
+            # keep full text search documents in sync, see utils/core/full_text_search.py
+            refresh_search_documents(
+                POLITICAL_PARTY_DOCUMENT,
+                ids=[
+                    political_party.pk
+                    for political_party, data in changes
+                    if data.keys() & PoliticalParty.PARTY_DOCUMENT_FIELDS
+                ],
+            )
+            # documents of their figures contain party name and abbreviation as well
+            refresh_search_documents(
+                POLITICAL_FIGURE_DOCUMENT,
+                ids=[
+                    political_party.pk
+                    for political_party, data in changes
+                    if data.keys() & PoliticalParty.FIGURE_DOCUMENT_FIELDS
+                ],
+                column="political_party_id",
+            )
+            bump_model_generation_on_commit(PoliticalParty)
+
+        return [political_party for political_party, _ in changes], item_errors
+
     @staticmethod
     def delete_political_party(political_party: PoliticalParty):
-        political_party.delete()
+        with transaction.atomic():
+            # party name is not a part of the search documents of its figures anymore
+            # NOTE: refreshed before the party is deleted, its figures can't be told apart from others once political_party is null
+            refresh_search_documents(
+                POLITICAL_FIGURE_WITHOUT_PARTY_DOCUMENT,
+                ids=[political_party.pk],
+                column="political_party_id",
+            )
+
+            # political_party of its figures is set to null (on_delete=SET_NULL) in the same few queries, see utils/core/soft_delete.py
+            soft_delete(
+                PoliticalParty.objects.filter(pk=political_party.pk),
+                user=get_current_authenticated_user(),
+            )
+
+            bump_model_generation_on_commit(PoliticalParty, PoliticalFigure)